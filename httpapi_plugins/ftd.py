@@ -29,6 +29,11 @@ short_description: HttpApi Plugin for Cisco ASA Firepower device
 description:
   - This HttpApi plugin provides methods to connect to Cisco ASA firepower
     devices over a HTTP(S)-based api.
+  - Modules execute a whole operation (e.g., an upsert of a list of objects, or bringing objects to the desired
+    state) in a single call to the connection, so the operation must complete within the command timeout of
+    the persistent connection (C(ansible_command_timeout), 30 seconds by default). Before sending writes, the
+    operation estimates their time from the requests sent so far, and fails without sending them if the timeout
+    would be exceeded.
 version_added: "2.7"
 options:
   token_path:
@@ -44,25 +49,118 @@ options:
     default: '/apispec/ngfw.json'
     vars:
       - name: ansible_httpapi_ftd_spec_path
+  spec_file:
+    type: path
+    description:
+      - Specifies the path to a local copy of the api spec of the FTD device (e.g., previously downloaded
+        from C(/apispec/ngfw.json)). When set, the api spec is not downloaded from the device.
+    vars:
+      - name: ansible_httpapi_ftd_spec_file
+  spec_cache_dir:
+    type: path
+    description:
+      - Specifies the directory where parsed api specs are cached between connections. Cached specs are keyed
+        by the device build version and the spec content hash, so devices running the same build share
+        a single cache entry. Cache entries are memory-mapped in read-only mode, so connection processes
+        share a single copy of the spec in memory.
+      - Set to an empty string to disable caching.
+    default: '~/.ansible/ftd_spec_cache'
+    vars:
+      - name: ansible_httpapi_ftd_spec_cache_dir
+  page_size:
+    type: int
+    description:
+      - Specifies the number of objects requested per page when modules iterate over lists of objects (e.g., when
+        looking for an object by filters). The value can be overridden by the C(page_size) option of a task.
+    default: 10
+    vars:
+      - name: ansible_httpapi_ftd_page_size
+  adaptive_paging:
+    type: bool
+    description:
+      - When enabled, the page size grows toward the largest value accepted by the device while iterating over
+        lists of objects, starting from C(page_size). The value can be overridden by the C(adaptive_paging)
+        option of a task.
+    default: False
+    vars:
+      - name: ansible_httpapi_ftd_adaptive_paging
+  max_concurrent_pages:
+    type: int
+    description:
+      - Specifies the maximum number of pages requested concurrently while iterating over lists of objects. Pages
+        are requested concurrently only when the device reports the total number of objects in the list, and never
+        for lists of jobs and action results. The value can be overridden by the C(max_concurrent_pages) option
+        of a task.
+    default: 1
+    vars:
+      - name: ansible_httpapi_ftd_max_concurrent_pages
+  object_cache:
+    type: bool
+    description:
+      - When enabled, lists of objects fetched to find existing objects (e.g., by C(upsert) operations) are cached by
+        the connection and indexed by name, so that following tasks do not fetch the same list again. Successful
+        create, update and delete operations are applied to the cached lists.
+      - Use the C(invalidateObjectCache) operation of the C(ftd_configuration) module to drop cached lists after
+        objects are changed by other means.
+    default: False
+    vars:
+      - name: ansible_httpapi_ftd_object_cache
+  object_cache_ttl:
+    type: int
+    description:
+      - Specifies the number of seconds cached lists of objects are valid for.
+    default: 300
+    vars:
+      - name: ansible_httpapi_ftd_object_cache_ttl
+  object_cache_max_objects:
+    type: int
+    description:
+      - Specifies the maximum number of cached objects. The least recently used lists are dropped when the limit is
+        exceeded.
+    default: 50000
+    vars:
+      - name: ansible_httpapi_ftd_object_cache_max_objects
+  connection_pool_size:
+    type: int
+    description:
+      - Specifies the maximum number of idle HTTP(S) connections to the device kept open by the connection, so that
+        subsequent requests reuse them instead of connecting and negotiating TLS again. Connections closed by
+        the device are detected and replaced.
+      - Set to 0 to open a new connection for every request. Connections are not pooled when a proxy is configured
+        for the device in the environment.
+    default: 4
+    vars:
+      - name: ansible_httpapi_ftd_connection_pool_size
 """
 
 import json
 import os
 import re
+import threading
 
 from ansible import __version__ as ansible_version
 
 from ansible.module_utils.basic import to_text
+from ansible.module_utils._text import to_bytes
 from ansible.errors import AnsibleConnectionFailure
+from ansible.module_utils.six import BytesIO
 from ansible.module_utils.six.moves.urllib.error import HTTPError
-from ansible.module_utils.six.moves.urllib.parse import urlencode
+from ansible.module_utils.six.moves.urllib.parse import urlencode, urlparse
+from ansible.module_utils.six.moves.urllib.request import getproxies, proxy_bypass
 from ansible.plugins.httpapi import HttpApiBase
 from urllib3 import encode_multipart_formdata
 from urllib3.fields import RequestField
 from ansible.module_utils.connection import ConnectionError
 
-from module_utils.fdm_swagger_client import FdmSwaggerParser, SpecProp, FdmSwaggerValidator
+from module_utils.fdm_swagger_client import FdmSwaggerParser, SpecProp, FdmSwaggerValidator, OperationField, \
+    get_operation_roles
 from module_utils.common import HTTPMethod, ResponseParams
+from module_utils.configuration import BaseConfigurationResource, OperationResultField, serialize_operation_error
+from module_utils.connection_pool import HTTPConnectionPool, ConnectionPoolError
+from module_utils.desired_state import DesiredStateResource
+from module_utils.object_cache import ObjectCache
+from module_utils.spec_cache import SpecCache, get_spec_hash, get_spec_stream_hash, get_spec_stats, \
+    get_memory_usage
 
 BASE_HEADERS = {
     'Content-Type': 'application/json',
@@ -74,6 +172,10 @@ TOKEN_EXPIRATION_STATUS_CODE = 408
 UNAUTHORIZED_STATUS_CODE = 401
 API_TOKEN_PATH_OPTION_NAME = 'token_path'
 TOKEN_PATH_TEMPLATE = '/api/fdm/{0}/fdm/token'
+TOKEN_PATH_API_VERSION_REGEX = r'^/api/fdm/([^/]+)/'
+SYSTEM_INFO_PATH_TEMPLATE = '/api/fdm/{0}/operational/systeminfo/default'
+# starting an upgrade changes the software installed on the device, so cached system information becomes stale
+UPGRADE_ACTION_PATH_REGEX = r'^/api/fdm/[^/]+/action/upgrade$'
 GET_API_VERSIONS_PATH = '/api/versions'
 DEFAULT_API_VERSIONS = ['v2', 'v1']
 
@@ -98,7 +200,14 @@ class HttpApi(HttpApiBase):
         self.refresh_token = None
         self._api_spec = None
         self._api_validator = None
-        self._ignore_http_errors = False
+        # requests are sent concurrently (e.g., pages and bulk writes), so the token is refreshed by one thread at
+        # a time, and details of the request needed by `handle_httperror` are kept per thread
+        self._login_lock = threading.RLock()
+        self._request_context = threading.local()
+        self._object_cache = None
+        self._system_info = None
+        self._connection_pool = None
+        self._model_names_by_type = None
 
     def login(self, username, password):
         def request_token_payload(username, password):
@@ -180,10 +289,13 @@ class HttpApi(HttpApiBase):
         url = self._get_api_token_path()
 
         self._display(HTTPMethod.POST, 'logout', url)
+        if self._api_spec is not None:
+            self._display_api_spec_stats('usage')
 
         self._send_auth_request(url, json.dumps(auth_payload), method=HTTPMethod.POST, headers=BASE_HEADERS)
         self.refresh_token = None
         self.access_token = None
+        self._close_connection_pool()
 
     def _send_auth_request(self, path, data, **kwargs):
         error_msg_prefix = 'Server returned an error during authentication request'
@@ -191,15 +303,12 @@ class HttpApi(HttpApiBase):
 
     def _send_service_request(self, path, error_msg_prefix, data=None, **kwargs):
         try:
-            self._ignore_http_errors = True
-            return self.connection.send(path, data, **kwargs)
+            return self._send(path, data, ignore_http_errors=True, **kwargs)
         except HTTPError as e:
             # HttpApi connection does not read the error response from HTTPError, so we do it here and wrap it up in
             # ConnectionError, so the actual error message is displayed to the user.
             error_msg = json.loads(to_text(e.read()))
             raise ConnectionError('%s: %s' % (error_msg_prefix, error_msg), http_code=e.code)
-        finally:
-            self._ignore_http_errors = False
 
     def update_auth(self, response, response_data):
         # With tokens, authentication should not be checked and updated on each request
@@ -213,10 +322,12 @@ class HttpApi(HttpApiBase):
             if data:
                 self._display(http_method, 'data', data)
 
-            response, response_data = self.connection.send(url, data, method=http_method, headers=BASE_HEADERS)
+            response, response_data = self._send(url, data, method=http_method, headers=BASE_HEADERS)
 
             value = self._get_response_value(response_data)
             self._display(http_method, 'response', value)
+            if http_method == HTTPMethod.POST and re.match(UPGRADE_ACTION_PATH_REGEX, url_path):
+                self.invalidate_system_information()
 
             return {
                 ResponseParams.SUCCESS: True,
@@ -246,7 +357,7 @@ class HttpApi(HttpApiBase):
             headers['Content-Type'] = content_type
             headers['Content-Length'] = len(body)
 
-            dummy, response_data = self.connection.send(url, data=body, method=HTTPMethod.POST, headers=headers)
+            dummy, response_data = self._send(url, body, method=HTTPMethod.POST, headers=headers)
             value = self._get_response_value(response_data)
             self._display(HTTPMethod.POST, 'upload:response', value)
             return self._response_to_json(value)
@@ -254,7 +365,7 @@ class HttpApi(HttpApiBase):
     def download_file(self, from_url, to_path, path_params=None):
         url = construct_url_path(from_url, path_params=path_params)
         self._display(HTTPMethod.GET, 'download', url)
-        response, response_data = self.connection.send(url, data=None, method=HTTPMethod.GET, headers=BASE_HEADERS)
+        response, response_data = self._send(url, None, method=HTTPMethod.GET, headers=BASE_HEADERS)
 
         if os.path.isdir(to_path):
             filename = extract_filename_from_headers(response.info())
@@ -264,14 +375,100 @@ class HttpApi(HttpApiBase):
             output_file.write(response_data.getvalue())
         self._display(HTTPMethod.GET, 'downloaded', to_path)
 
+    def _send(self, path, data, method=HTTPMethod.GET, headers=None, ignore_http_errors=False):
+        """
+        Sends the request over a pooled persistent connection (see `connection_pool`), handling authentication
+        and HTTP errors the same way as the `send` method of the HttpApi connection does. Without the pool,
+        the request is sent by the HttpApi connection itself.
+
+        :param ignore_http_errors: if True, authentication errors are raised instead of refreshing the token
+            (e.g., for the token requests themselves)
+        :type ignore_http_errors: bool
+        :return: the response and the buffer with the response body
+        :rtype: tuple
+        """
+        pool = self.connection_pool
+        if pool is None:
+            return self._send_over_connection(path, data, method, headers, ignore_http_errors)
+
+        request_headers = dict(headers or {})
+        auth = self.connection._auth
+        if auth:
+            request_headers.update(auth)
+        url = self.connection._url + path
+        try:
+            response = pool.request(method, path, to_bytes(data) if data is not None else None, request_headers)
+        except ConnectionPoolError as e:
+            raise AnsibleConnectionFailure('Could not connect to {0}: {1}'.format(url, e))
+
+        if response.status >= 400:
+            error = HTTPError(url, response.status, response.reason, response.headers, BytesIO(response.body))
+            if not ignore_http_errors and self._refresh_auth(error, auth):
+                return self._send(path, data, method=method, headers=headers)
+            raise error
+        return response, BytesIO(response.body)
+
+    def _send_over_connection(self, path, data, method, headers, ignore_http_errors):
+        # the HttpApi connection calls `handle_httperror` without request details, so they are kept for the thread
+        context = self._request_context
+        outer_request = getattr(context, 'ignore_http_errors', False), getattr(context, 'auth', None)
+        context.ignore_http_errors, context.auth = ignore_http_errors, self.connection._auth
+        try:
+            return self.connection.send(path, data, method=method, headers=headers)
+        finally:
+            context.ignore_http_errors, context.auth = outer_request
+
+    @property
+    def connection_pool(self):
+        if self._connection_pool is None and self.get_option('connection_pool_size') and \
+                not _uses_proxy(self.connection._url):
+            self._connection_pool = HTTPConnectionPool(self.connection._url,
+                                                       max_size=self.get_option('connection_pool_size'),
+                                                       timeout=self.connection.get_option('timeout'),
+                                                       validate_certs=self.connection.get_option('validate_certs'))
+        return self._connection_pool
+
+    def get_connection_pool_stats(self):
+        """
+        Reports how often requests reused persistent connections ('hits') or had to open new ones ('misses'), and
+        how many connections were closed by the device or after errors ('discarded'), so that
+        `connection_pool_size` can be tuned.
+
+        :return: the statistics or None if connections are not pooled
+        :rtype: dict
+        """
+        return self._connection_pool.get_stats() if self._connection_pool is not None else None
+
+    def _close_connection_pool(self):
+        if self._connection_pool is not None:
+            display.vvvv('REST:connection pool: %s' % self._connection_pool.get_stats())
+            self._connection_pool.close()
+            self._connection_pool = None
+
     def handle_httperror(self, exc):
-        is_auth_related_code = exc.code == TOKEN_EXPIRATION_STATUS_CODE or exc.code == UNAUTHORIZED_STATUS_CODE
-        if not self._ignore_http_errors and is_auth_related_code:
-            self.connection._auth = None
-            self.login(self.connection.get_option('remote_user'), self.connection.get_option('password'))
-            return True
-        # False means that the exception will be passed further to the caller
-        return False
+        context = self._request_context
+        if getattr(context, 'ignore_http_errors', False):
+            # False means that the exception will be passed further to the caller
+            return False
+        return self._refresh_auth(exc, getattr(context, 'auth', None))
+
+    def _refresh_auth(self, exc, request_auth):
+        """
+        Logs in again if the request failed because of the expired token. Concurrent requests failing with the same
+        token wait for the first one to log in, and are retried with the new token instead of logging in again.
+
+        :param request_auth: authentication headers the request was sent with
+        :return: True if the request should be retried, False if the error should be raised
+        """
+        if exc.code != TOKEN_EXPIRATION_STATUS_CODE and exc.code != UNAUTHORIZED_STATUS_CODE:
+            return False
+        with self._login_lock:
+            current_auth = self.connection._auth
+            # another request that failed with the same token might have logged in already
+            if request_auth is None or current_auth is None or current_auth == request_auth:
+                self.connection._auth = None
+                self.login(self.connection.get_option('remote_user'), self.connection.get_option('password'))
+        return True
 
     def _display(self, http_method, title, msg=''):
         display.vvvv('REST:{0}:{1}:{2}\n{3}'.format(http_method, self.connection._url, title, msg))
@@ -283,6 +480,13 @@ class HttpApi(HttpApiBase):
     def _get_api_spec_path(self):
         return self.get_option('spec_path')
 
+    def _get_api_spec_file(self):
+        return self.get_option('spec_file')
+
+    def _get_spec_cache(self):
+        cache_dir = self.get_option('spec_cache_dir')
+        return SpecCache(cache_dir) if cache_dir else None
+
     def _get_known_token_paths(self):
         """Generate list of token generation urls based on list of versions supported by device(if exposed via API) or
         default list of API versions.
@@ -338,10 +542,24 @@ class HttpApi(HttpApiBase):
 
     def get_operation_specs_by_model_name(self, model_name):
         if model_name:
-            return self.api_spec[SpecProp.MODEL_OPERATIONS].get(model_name, None)
+            operations = self.api_spec[SpecProp.MODEL_OPERATIONS].get(model_name, None)
+            # a spec loaded from the cache returns read-only views, which cannot be sent to the module as JSON
+            return dict(operations) if operations is not None else None
         else:
             return None
 
+    def get_model_roles(self, model_name):
+        """
+        Returns names of operations playing CRUD roles for the model, see `get_operation_roles`.
+        Models that are not in the spec do not play any role.
+
+        :rtype: dict
+        """
+        model_roles = self.api_spec.get(SpecProp.MODEL_ROLES, {}).get(model_name)
+        if model_roles is None:
+            model_roles = get_operation_roles(self.get_operation_specs_by_model_name(model_name) or {})
+        return model_roles
+
     def get_model_spec(self, model_name):
         return self.api_spec[SpecProp.MODELS].get(model_name, None)
 
@@ -354,25 +572,281 @@ class HttpApi(HttpApiBase):
     def validate_path_params(self, operation_name, params):
         return self.api_validator.validate_path_params(operation_name, params)
 
+    def execute_operation(self, op_name, params, check_mode=False):
+        """
+        Executes the configuration operation (see BaseConfigurationResource.execute_operation) inside the connection
+        process, next to the API spec and the HTTP session, so that the module needs a single call over the
+        persistent connection per task.
+
+        :return: a dict with 'changed', 'response', 'metrics' and 'diff' keys if the operation succeeds, or a dict with
+            the 'error' key containing the serialized error (see serialize_operation_error) if the operation fails
+        :rtype: dict
+        """
+        resource = self._create_configuration_resource(check_mode)
+        try:
+            response = resource.execute_operation(op_name, params)
+        except Exception as e:
+            error = serialize_operation_error(e)
+            if error is None:
+                raise
+            return {OperationResultField.ERROR: error}
+        return {
+            OperationResultField.CHANGED: resource.config_changed,
+            OperationResultField.RESPONSE: response,
+            OperationResultField.METRICS: resource.metrics,
+            OperationResultField.DIFF: resource.diff
+        }
+
+    def apply_desired_state(self, state, prune=False, check_mode=False, max_concurrent_requests=None):
+        """
+        Brings objects to the desired state (see DesiredStateResource.run) inside the connection process. Requests
+        of the module process are handled by the connection one at a time, so current objects can be fetched and
+        independent writes can be sent concurrently only here.
+
+        :return: a dict with 'changed', 'plan' and 'summary' keys if the writes are executed, even if some of them fail
+            (see get_failed_plan_steps), or a dict with the 'error' key containing the serialized error
+            (see serialize_operation_error) otherwise
+        :rtype: dict
+        """
+        # current objects are fetched in check mode too, only writes are skipped
+        resource = DesiredStateResource(self._create_configuration_resource(),
+                                        max_concurrent_requests=max_concurrent_requests)
+        try:
+            return resource.run(state, prune, check_mode)
+        except Exception as e:
+            error = serialize_operation_error(e)
+            if error is None:
+                raise
+            return {OperationResultField.ERROR: error}
+
+    def _create_configuration_resource(self, check_mode=False):
+        return BaseConfigurationResource(self, check_mode, page_size=self.get_option('page_size'),
+                                         adaptive_paging=self.get_option('adaptive_paging'),
+                                         max_concurrent_pages=self.get_option('max_concurrent_pages'),
+                                         object_cache=self.object_cache,
+                                         command_timeout=self._get_command_timeout())
+
+    def _get_command_timeout(self):
+        # the persistent connection aborts every call from the module after this number of seconds
+        try:
+            return self.connection.get_option('persistent_command_timeout')
+        except KeyError:
+            return None
+
+    def get_model_name_by_type(self, obj_type):
+        """
+        Returns the name of the model whose objects have the given type. Types of objects are lowercase names
+        of their models (e.g., 'networkobject' of NetworkObject), so models are matched case-insensitively.
+
+        :rtype: str
+        """
+        if self._model_names_by_type is None:
+            self._model_names_by_type = dict((name.lower(), name) for name in self.api_spec[SpecProp.MODELS])
+        return self._model_names_by_type.get(obj_type.lower())
+
+    def invalidate_object_cache(self, model_name=None):
+        """
+        Drops cached lists of objects of the given model or all cached lists.
+
+        :return: number of dropped lists
+        :rtype: int
+        """
+        return self.object_cache.invalidate(model_name) if self.object_cache is not None else 0
+
+    def get_object_cache_stats(self):
+        return self.object_cache.get_stats() if self.object_cache is not None else None
+
+    @property
+    def object_cache(self):
+        if self._object_cache is None and self.get_option('object_cache'):
+            self._object_cache = ObjectCache(ttl=self.get_option('object_cache_ttl'),
+                                             max_objects=self.get_option('object_cache_max_objects'))
+        return self._object_cache
+
+    def validate_request(self, operation_name, data=None, query_params=None, path_params=None):
+        """
+        Validates query params, path params and, for POST and PUT operations, data of the request at once, so that
+        modules need a single call over the persistent connection instead of three.
+
+        :return: validation reports for invalid parts of the request keyed by the part name ('query_params',
+            'path_params' or 'data'). A report is either the result of FdmSwaggerValidator or an error message if
+            the part could not be validated. An empty dict means the request is valid.
+        :rtype: dict
+        """
+        reports = {}
+
+        def validate(validation_method, part_name, params):
+            try:
+                is_valid, validation_report = validation_method(operation_name, params)
+                if not is_valid:
+                    reports[part_name] = validation_report
+            except Exception as e:
+                reports[part_name] = to_text(e)
+
+        validate(self.validate_query_params, 'query_params', query_params)
+        validate(self.validate_path_params, 'path_params', path_params)
+        op_spec = self.get_operation_spec(operation_name)
+        if op_spec and op_spec[OperationField.METHOD] in (HTTPMethod.POST, HTTPMethod.PUT):
+            validate(self.validate_data, 'data', data)
+        return reports
+
     @property
     def api_spec(self):
         if self._api_spec is None:
-            spec_path_url = self._get_api_spec_path()
-            response = self.send_request(url_path=spec_path_url, http_method=HTTPMethod.GET)
-            if response[ResponseParams.SUCCESS]:
-                self._api_spec = FdmSwaggerParser().parse_spec(response[ResponseParams.RESPONSE])
-            else:
-                raise ConnectionError('Failed to download API specification. Status code: %s. Response: %s' % (
-                    response[ResponseParams.STATUS_CODE], response[ResponseParams.RESPONSE]))
+            self._api_spec = self._load_api_spec()
+            self._display_api_spec_stats('loaded')
         return self._api_spec
 
+    def _load_api_spec(self):
+        """
+        Loads the API specification from the pre-seeded spec file, the spec cache or the device (in that order).
+        Downloaded and pre-seeded specs are parsed once and stored in the cache, so subsequent connections to
+        devices with the same build can skip both downloading and parsing.
+
+        :return: data from FdmSwaggerParser().parse_spec()
+        :rtype: dict
+        """
+        spec_cache = self._get_spec_cache()
+        spec_file = self._get_api_spec_file()
+
+        if spec_file:
+            self._display(HTTPMethod.GET, 'spec:file', spec_file)
+            with open(spec_file, 'rb') as spec_stream:
+                return self._parse_api_spec(spec_stream, spec_cache)
+
+        build_key = None
+        if spec_cache:
+            build_key = self._get_spec_cache_build_key()
+            spec = spec_cache.get_by_build(build_key) if build_key else None
+            if spec is not None:
+                self._display(HTTPMethod.GET, 'spec:cache', build_key)
+                return spec
+        return self._parse_api_spec(self._download_api_spec(), spec_cache, build_key)
+
+    def _parse_api_spec(self, spec_stream, spec_cache, build_key=None):
+        spec_hash = get_spec_stream_hash(spec_stream)
+        spec = spec_cache.get_by_hash(spec_hash) if spec_cache else None
+        if spec is None:
+            try:
+                # the spec is parsed directly from the stream, so its raw text is never decoded as a whole
+                spec = FdmSwaggerParser().parse_spec_stream(spec_stream)
+            except ValueError as e:
+                raise ConnectionError('Invalid API specification: %s' % e)
+            if spec_cache and self._store_api_spec(spec_cache, spec_hash, spec, build_key):
+                # the parsed spec is replaced with the shared read-only copy, so its private memory can be freed
+                spec = spec_cache.get_by_hash(spec_hash) or spec
+        elif build_key:
+            self._store_api_spec(spec_cache, spec_hash, None, build_key)
+        return spec
+
+    def _download_api_spec(self):
+        spec_path_url = self._get_api_spec_path()
+        self._display(HTTPMethod.GET, 'url', spec_path_url)
+        try:
+            dummy, response_data = self._send(spec_path_url, None, method=HTTPMethod.GET, headers=BASE_HEADERS)
+            response_data.seek(0)
+            return response_data
+        except HTTPError as e:
+            raise ConnectionError('Failed to download API specification. Status code: %s. Response: %s' % (
+                e.code, to_text(e.read())))
+
+    def _store_api_spec(self, spec_cache, spec_hash, spec, build_key):
+        try:
+            if spec is None:
+                spec_cache.link_build(build_key, spec_hash)
+            else:
+                spec_cache.put(spec_hash, spec, build_key)
+            return True
+        except (IOError, OSError) as e:
+            # the cache is an optimization only, so failing to update it must not break the connection
+            display.vvvv('Failed to store API specification in %s: %s' % (spec_cache.cache_dir, e))
+            return False
+
+    def _get_spec_cache_build_key(self):
+        """
+        Identifies the API specification served by the device without downloading it. The spec is determined by
+        the build version of the device and the URL it is downloaded from.
+
+        :return: the cache key or None if the build version cannot be fetched
+        :rtype: str
+        """
+        build_version = self._get_device_build_version()
+        if not build_version:
+            return None
+        return '%s-%s' % (build_version, get_spec_hash(self._get_api_spec_path())[:8])
+
+    def _get_device_build_version(self):
+        try:
+            return self.get_system_information()['databaseInfo']['buildVersion']
+        except (ConnectionError, KeyError, TypeError, ValueError) as e:
+            display.vvvv('REST:failed to fetch build version: {0}'.format(e))
+            return None
+
+    def get_system_information(self):
+        """
+        Returns system information of the device (e.g., the build version and the platform model). The information
+        is fetched once and kept for the lifetime of the connection, as it changes only when the device software
+        is installed or upgraded (see `invalidate_system_information`).
+
+        :rtype: dict
+        """
+        if self._system_info is None:
+            self._system_info = self._fetch_system_information()
+        return self._system_info
+
+    def invalidate_system_information(self):
+        """
+        Drops cached system information, so that it is fetched again on the next request.
+        """
+        self._system_info = None
+
+    def _fetch_system_information(self):
+        token_path = self._get_api_token_path()
+        match = re.match(TOKEN_PATH_API_VERSION_REGEX, token_path or '')
+        if not match:
+            raise ConnectionError("Can't fetch system information: API version is unknown")
+
+        url = SYSTEM_INFO_PATH_TEMPLATE.format(match.group(1))
+        response, response_data = self._send_service_request(
+            path=url,
+            error_msg_prefix="Can't fetch system information",
+            method=HTTPMethod.GET,
+            headers=BASE_HEADERS
+        )
+        return self._response_to_json(self._get_response_value(response_data))
+
+    def get_api_spec_stats(self):
+        """
+        Reports how much of the API specification is used by the connection and the memory usage of
+        the connection process. When the spec is loaded from the spec cache, it is memory-mapped and shared
+        by all connection processes, so only decoded operations and models take private memory.
+
+        :return: spec and memory usage statistics
+        :rtype: dict
+        """
+        return {
+            'spec': get_spec_stats(self._api_spec) if self._api_spec is not None else None,
+            'memory': get_memory_usage()
+        }
+
+    def _display_api_spec_stats(self, title):
+        # collecting memory usage requires reading process info, so it is done only when the output is displayed
+        if display.verbosity > 3:
+            display.vvvv('REST:api spec %s: %s' % (title, self.get_api_spec_stats()))
+
     @property
     def api_validator(self):
         if self._api_validator is None:
-            self._api_validator = FdmSwaggerValidator(self.api_spec)
+            # the validator lives as long as the connection, so compiling models pays off after a few validations
+            self._api_validator = FdmSwaggerValidator(self.api_spec, compiled=True)
         return self._api_validator
 
 
+def _uses_proxy(url):
+    parsed_url = urlparse(url)
+    return parsed_url.scheme in getproxies() and not proxy_bypass(parsed_url.hostname)
+
+
 def construct_url_path(path, path_params=None, query_params=None):
     url = path
     if path_params:
@@ -40,12 +40,26 @@ options:
     description:
       - The name of the operation to execute. Commonly, the operation starts with 'add', 'edit', 'get', 'upsert'
        or 'delete' verbs, but can have an arbitrary name too.
+      - The 'invalidateObjectCache' operation drops lists of objects cached by the connection (see the
+        C(ansible_httpapi_ftd_object_cache) inventory variable), or only lists of the model given in C(data.model).
     required: true
     type: string
   data:
     description:
-      - Key-value pairs that should be sent as body parameters in a REST API call
-    type: dict
+      - Key-value pairs that should be sent as body parameters in a REST API call. A string is converted as for
+        options of the C(dict) type (JSON or C(k1=v1 k2=v2)), and a string containing a JSON array is converted
+        into a list.
+      - For 'add' and 'upsert' operations, a list of objects of the same model can be given instead. Existing objects
+        of the model are listed once, and only objects that do not exist or differ from the existing ones with the
+        same name are sent to the device. The response contains the name, the status ('created', 'updated' or
+        'unchanged') and the resulting object for every item, along with the changed fields of updated items.
+      - When the device rejects some of the objects, the remaining objects are still sent. The module fails naming
+        the rejected objects, whose status is 'failed' and whose C(error) describes the reason, and reports the
+        objects that have been written.
+      - All objects are sent within a single call to the connection, which must complete within
+        C(ansible_command_timeout). The module fails before sending any object if the requests are not expected to
+        complete in time.
+    type: raw
   query_params:
     description:
       - Key-value pairs that should be sent as query parameters in a REST API call.
@@ -62,7 +76,32 @@ options:
     description:
       - Key-value dict that represents equality filters. Every key is a property name and value is its desired value.
         If multiple filters are present, they are combined with logical operator AND.
+      - Filters supported by the device (e.g., C(name)) are sent in the C(filter) query param unless it is set in
+        C(query_params), so that fewer objects are transferred.
     type: dict
+  page_size:
+    description:
+      - The number of objects requested per page when iterating over a list of objects (e.g., when looking for
+        objects by C(filters) or for an existing object during C(upsert) operations). Defaults to the
+        C(ansible_httpapi_ftd_page_size) inventory variable. Ignored when C(limit) is set in C(query_params).
+    type: int
+  adaptive_paging:
+    description:
+      - Grows the page size toward the largest value accepted by the device while iterating over a list of
+        objects, so that long lists are fetched with fewer requests. Defaults to the
+        C(ansible_httpapi_ftd_adaptive_paging) inventory variable.
+    type: bool
+  max_concurrent_pages:
+    description:
+      - The maximum number of pages requested concurrently while iterating over a list of objects. Objects are
+        still returned in the order of the device. Lists of jobs and action results are always fetched page by page.
+        Defaults to the C(ansible_httpapi_ftd_max_concurrent_pages) inventory variable.
+    type: int
+  max_concurrent_requests:
+    description:
+      - The maximum number of objects created or updated concurrently when C(data) is a list of objects.
+        Defaults to 4.
+    type: int
 """
 
 EXAMPLES = """
@@ -79,6 +118,43 @@ EXAMPLES = """
       isSystemDefined: false
     register_as: "hostNetwork"
 
+- name: Create or update multiple network objects at once
+  ftd_configuration:
+    operation: "upsertNetworkObject"
+    data:
+      - name: "Ansible-network-1"
+        subType: "HOST"
+        value: "192.168.3.1"
+        type: "networkobject"
+      - name: "Ansible-network-2"
+        subType: "HOST"
+        value: "192.168.3.2"
+        type: "networkobject"
+    page_size: 500
+    max_concurrent_requests: 8
+
+- name: Find application objects by their category in large pages
+  ftd_configuration:
+    operation: "getApplicationList"
+    filters:
+      appCategories: "{{ category }}"
+    page_size: 100
+    adaptive_paging: true
+
+- name: Find network objects by their value fetching up to 4 pages at once
+  ftd_configuration:
+    operation: "getNetworkObjectList"
+    filters:
+      value: "192.168.2.0"
+    page_size: 500
+    max_concurrent_pages: 4
+
+- name: Drop cached network objects after they were changed outside of Ansible
+  ftd_configuration:
+    operation: "invalidateObjectCache"
+    data:
+      model: "NetworkObject"
+
 - name: Delete the network object
   ftd_configuration:
     operation: "deleteNetworkObject"
@@ -88,46 +164,142 @@ EXAMPLES = """
 
 RETURN = """
 response:
-  description: HTTP response returned from the API call.
+  description: HTTP response returned from the API call, or reports on every object when C(data) is a list.
+  returned: success, or when some of the objects in C(data) are rejected by the device
+  type: raw
+metrics:
+  description: Statistics of the requests sent to execute the operation.
   returned: success
   type: dict
+  contains:
+    pages_fetched:
+      description: The number of pages fetched while iterating over lists of objects.
+      type: int
+    objects_fetched:
+      description: The number of objects transferred while iterating over lists of objects (e.g., when looking for
+        an existing object during C(upsert) operations).
+      type: int
+    server_filters:
+      description: Keys of C(filters) that were applied by the device. Remaining filters are applied to returned
+        objects only.
+      type: list
+object_diff:
+  description: Fields of the existing object that differ from C(data) when the object is edited or upserted.
+    Changes of arrays of references list C(added) and C(removed) references, other changes list the C(before) and
+    C(after) values. The list is empty when the existing object already matches C(data).
+  returned: when an existing object is compared with C(data)
+  type: list
+  contains:
+    path:
+      description: Path to the changed field, e.g., C(rules[0].action) or C(interface.name).
+      type: str
+    before:
+      description: Value of the field in the existing object.
+      type: raw
+    after:
+      description: Value of the field in C(data).
+      type: raw
+    added:
+      description: References present in C(data) only.
+      type: list
+    removed:
+      description: References present in the existing object only.
+      type: list
 """
+import json
+
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.connection import Connection
+from ansible.module_utils.common.validation import check_type_dict
+from ansible.module_utils.connection import Connection, ConnectionError
+from ansible.module_utils.six import string_types
 
 try:
     from ansible.module_utils.configuration import BaseConfigurationResource, CheckModeException, \
-        FtdInvalidOperationNameError
+        FtdInvalidOperationNameError, OperationResultField, METHOD_NOT_FOUND_ERROR_CODE, raise_operation_error, \
+        get_failed_bulk_items
     from ansible.module_utils.fdm_swagger_client import ValidationError
     from ansible.module_utils.common import construct_ansible_facts, FtdConfigurationError, \
         FtdServerError, FtdUnexpectedResponse
 except ImportError:
-    from module_utils.configuration import BaseConfigurationResource, CheckModeException, FtdInvalidOperationNameError
+    from module_utils.configuration import BaseConfigurationResource, CheckModeException, \
+        FtdInvalidOperationNameError, OperationResultField, METHOD_NOT_FOUND_ERROR_CODE, raise_operation_error, \
+        get_failed_bulk_items
     from module_utils.fdm_swagger_client import ValidationError
     from module_utils.common import construct_ansible_facts, FtdConfigurationError, \
         FtdServerError, FtdUnexpectedResponse
 
 
+def execute_operation(connection, op_name, params, check_mode):
+    try:
+        result = connection.execute_operation(op_name, params, check_mode)
+    except ConnectionError as e:
+        if getattr(e, 'code', None) != METHOD_NOT_FOUND_ERROR_CODE:
+            raise
+        # older connection plugins cannot execute operations, so the operation is executed in the module
+        resource = BaseConfigurationResource(connection, check_mode)
+        resp = resource.execute_operation(op_name, params)
+        return resource.config_changed, resp, resource.metrics, resource.diff
+
+    if OperationResultField.ERROR in result:
+        raise_operation_error(result[OperationResultField.ERROR])
+    return result[OperationResultField.CHANGED], result[OperationResultField.RESPONSE], \
+        result.get(OperationResultField.METRICS, {}), result.get(OperationResultField.DIFF)
+
+
+def parse_data(data):
+    """
+    Converts `data` given as a string (e.g., templated from a variable or passed as 'k1=v1 k2=v2') into a dict,
+    just like options of the 'dict' type, or into a list when the string contains a JSON array.
+
+    Raises TypeError if `data` is neither a dict nor a list, and cannot be converted into one.
+    """
+    if isinstance(data, string_types):
+        if data.lstrip().startswith('['):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                raise TypeError('unable to parse the string as a JSON array')
+        else:
+            data = check_type_dict(data)
+    if data is not None and not isinstance(data, (dict, list)):
+        raise TypeError('%s cannot be converted to a dict or a list' % type(data))
+    return data
+
+
 def main():
     fields = dict(
         operation=dict(type='str', required=True),
-        data=dict(type='dict'),
+        data=dict(type='raw'),
         query_params=dict(type='dict'),
         path_params=dict(type='dict'),
         register_as=dict(type='str'),
-        filters=dict(type='dict')
+        filters=dict(type='dict'),
+        page_size=dict(type='int'),
+        adaptive_paging=dict(type='bool'),
+        max_concurrent_pages=dict(type='int'),
+        max_concurrent_requests=dict(type='int')
     )
     module = AnsibleModule(argument_spec=fields,
                            supports_check_mode=True)
     params = module.params
+    try:
+        params['data'] = parse_data(params['data'])
+    except TypeError:
+        module.fail_json(msg='Data must be a dictionary or a list of dictionaries')
 
     connection = Connection(module._socket_path)
-    resource = BaseConfigurationResource(connection, module.check_mode)
     op_name = params['operation']
     try:
-        resp = resource.execute_operation(op_name, params)
-        module.exit_json(changed=resource.config_changed, response=resp,
-                         ansible_facts=construct_ansible_facts(resp, module.params))
+        changed, resp, metrics, diff = execute_operation(connection, op_name, params, module.check_mode)
+        failed_items = get_failed_bulk_items(resp) if isinstance(params['data'], list) else []
+        if failed_items:
+            module.fail_json(msg='Failed to execute %s operation for data items: %s'
+                                 % (op_name, ', '.join(failed_items)), changed=changed, response=resp, metrics=metrics)
+        result = dict(changed=changed, response=resp, metrics=metrics,
+                      ansible_facts=construct_ansible_facts(resp, module.params))
+        if diff is not None:
+            result['object_diff'] = diff
+        module.exit_json(**result)
     except FtdInvalidOperationNameError as e:
         module.fail_json(msg='Invalid operation name provided: %s' % e.operation_name)
     except FtdConfigurationError as e:
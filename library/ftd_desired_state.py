@@ -0,0 +1,190 @@
+#!/usr/bin/python
+
+# Copyright (c) 2020 Cisco and/or its affiliates.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'network'}
+
+DOCUMENTATION = """
+---
+module: ftd_desired_state
+short_description: Brings objects of multiple models on Cisco FTD devices to the desired state
+description:
+  - Compares objects described in a single desired-state document with objects existing on the device and
+    creates, updates and, optionally, deletes objects to match the document.
+  - Current objects of all models are fetched concurrently. Writes are ordered by references between objects
+    (e.g., network objects are created before network groups referring to them), and independent writes are
+    sent concurrently. Requests are sent by the connection plugin, so lists are fetched with the paging and object
+    cache settings of the inventory (e.g., C(ansible_httpapi_ftd_page_size)).
+  - In check mode, the module returns the plan without sending any write.
+  - The state is reached within a single call to the connection, which must complete within
+    C(ansible_command_timeout). The module fails before sending any write if the plan is not expected to be applied
+    in time.
+version_added: "2.8"
+author: "Cisco Systems, Inc."
+options:
+  state:
+    description:
+      - Desired objects keyed by the model name (e.g., C(NetworkObject)). Every value is either a list of objects,
+        or a dict with the list in C(objects) and path params of the model in C(path_params) (e.g., C(parentId)
+        of access rules).
+      - Objects are identified by their names within the model. An object can refer to another object by a dict
+        containing its C(type) and C(name) only; the reference is completed with the id of the existing or created
+        object. Objects of models missing in C(state) are looked up on the device by their name, unless the list of
+        their model depends on path params (e.g., access rules); such objects must be given in C(state) to be
+        referred to by name.
+    required: true
+    type: dict
+  prune:
+    description:
+      - Deletes objects of the models given in C(state) that are not present in the document. System-defined
+        objects are never deleted.
+    type: bool
+    default: false
+  max_concurrent_requests:
+    description:
+      - The maximum number of requests sent concurrently, both when fetching current objects and when writing
+        independent objects. Defaults to 4.
+    type: int
+"""
+
+EXAMPLES = """
+- name: Configure networks and a group referring to them
+  ftd_desired_state:
+    state:
+      NetworkObject:
+        - name: "Ansible-network-1"
+          subType: "HOST"
+          value: "192.168.3.1"
+          type: "networkobject"
+        - name: "Ansible-network-2"
+          subType: "HOST"
+          value: "192.168.3.2"
+          type: "networkobject"
+      NetworkObjectGroup:
+        - name: "Ansible-networks"
+          objects:
+            - name: "Ansible-network-1"
+              type: "networkobject"
+            - name: "Ansible-network-2"
+              type: "networkobject"
+          type: "networkobjectgroup"
+
+- name: Show access rules that would be changed or deleted
+  ftd_desired_state:
+    state:
+      AccessRule:
+        path_params:
+          parentId: "{{ accessPolicy['id'] }}"
+        objects: "{{ access_rules }}"
+    prune: true
+  check_mode: true
+"""
+
+RETURN = """
+plan:
+  description: Writes in the order of execution. Every write contains the action ('create', 'update' or 'delete'),
+    the model and the name of the object, and the resulting object (the existing one in check mode). Updates also
+    contain the changed fields of the existing object (see the C(object_diff) result of M(ftd_configuration)).
+    When a write fails, writes of the same wave are still sent, but the ones depending on them are not; the plan
+    then contains only the executed writes, and the failed ones contain the C(error).
+  returned: success or failed writes
+  type: list
+summary:
+  description: The number of created, updated, deleted and unchanged objects.
+  returned: success or failed writes
+  type: dict
+"""
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.connection import Connection, ConnectionError
+
+try:
+    from ansible.module_utils.configuration import BaseConfigurationResource, OperationResultField, \
+        METHOD_NOT_FOUND_ERROR_CODE, raise_operation_error
+    from ansible.module_utils.desired_state import DesiredStateResource, DesiredStateResultField, \
+        get_failed_plan_steps
+    from ansible.module_utils.fdm_swagger_client import ValidationError
+    from ansible.module_utils.common import FtdConfigurationError, FtdServerError, FtdUnexpectedResponse
+except ImportError:
+    from module_utils.configuration import BaseConfigurationResource, OperationResultField, \
+        METHOD_NOT_FOUND_ERROR_CODE, raise_operation_error
+    from module_utils.desired_state import DesiredStateResource, DesiredStateResultField, get_failed_plan_steps
+    from module_utils.fdm_swagger_client import ValidationError
+    from module_utils.common import FtdConfigurationError, FtdServerError, FtdUnexpectedResponse
+
+
+def apply_desired_state(connection, params, check_mode):
+    try:
+        result = connection.apply_desired_state(params['state'], params['prune'], check_mode,
+                                                params['max_concurrent_requests'])
+    except ConnectionError as e:
+        if getattr(e, 'code', None) != METHOD_NOT_FOUND_ERROR_CODE:
+            raise
+        # older connection plugins cannot bring objects to the desired state, so it is done by the module
+        resource = DesiredStateResource(BaseConfigurationResource(connection),
+                                        max_concurrent_requests=params['max_concurrent_requests'])
+        return resource.run(params['state'], params['prune'], check_mode)
+
+    if OperationResultField.ERROR in result:
+        raise_operation_error(result[OperationResultField.ERROR])
+    return result
+
+
+def main():
+    fields = dict(
+        state=dict(type='dict', required=True),
+        prune=dict(type='bool', default=False),
+        max_concurrent_requests=dict(type='int')
+    )
+    module = AnsibleModule(argument_spec=fields,
+                           supports_check_mode=True)
+    params = module.params
+    if params['max_concurrent_requests'] is not None and params['max_concurrent_requests'] < 1:
+        module.fail_json(msg='Maximum number of concurrent requests must be a positive integer')
+
+    connection = Connection(module._socket_path)
+    try:
+        result = apply_desired_state(connection, params, module.check_mode)
+        failed_steps = get_failed_plan_steps(result[DesiredStateResultField.PLAN])
+        if failed_steps:
+            module.fail_json(msg='Failed to bring objects to the desired state. Writes failed for: %s'
+                                 % ', '.join(failed_steps), changed=result[DesiredStateResultField.CHANGED],
+                             plan=result[DesiredStateResultField.PLAN],
+                             summary=result[DesiredStateResultField.SUMMARY])
+        module.exit_json(changed=result[DesiredStateResultField.CHANGED], plan=result[DesiredStateResultField.PLAN],
+                         summary=result[DesiredStateResultField.SUMMARY])
+    except FtdConfigurationError as e:
+        module.fail_json(msg='Failed to bring objects to the desired state because of the configuration error: %s'
+                             % e.msg)
+    except FtdServerError as e:
+        module.fail_json(msg='Server returned an error trying to bring objects to the desired state. '
+                             'Status code: %s. Server response: %s' % (e.code, e.response))
+    except FtdUnexpectedResponse as e:
+        module.fail_json(msg=e.args[0])
+    except ValidationError as e:
+        module.fail_json(msg=e.args[0])
+
+
+if __name__ == '__main__':
+    main()
@@ -186,22 +186,21 @@ msg:
     type: string
 """
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.connection import Connection
+from ansible.module_utils.connection import Connection, ConnectionError
 from enum import Enum
 from six import iteritems
 
 try:
-    from ansible.module_utils.configuration import BaseConfigurationResource, ParamName, PATH_PARAMS_FOR_DEFAULT_OBJ
+    from ansible.module_utils.configuration import BaseConfigurationResource, ParamName, METHOD_NOT_FOUND_ERROR_CODE
     from ansible.module_utils.device import HAS_KICK, FtdPlatformFactory, FtdModel
 except ImportError:
-    from module_utils.configuration import BaseConfigurationResource, ParamName, PATH_PARAMS_FOR_DEFAULT_OBJ
+    from module_utils.configuration import BaseConfigurationResource, ParamName, METHOD_NOT_FOUND_ERROR_CODE
     from module_utils.device import HAS_KICK, FtdPlatformFactory, FtdModel
 
 REQUIRED_PARAMS_FOR_LOCAL_CONNECTION = ['device_ip', 'device_netmask', 'device_gateway', 'device_model', 'dns_server']
 
 
 class FtdOperations(Enum):
-    GET_SYSTEM_INFO = 'getSystemInformation'
     GET_MANAGEMENT_IP_LIST = 'getManagementIPList'
     GET_DNS_SETTING_LIST = 'getDeviceDNSSettingsList'
     GET_DNS_SERVER_GROUP = 'getDNSServerGroup'
@@ -245,7 +244,7 @@ def main():
     else:
         connection = Connection(module._socket_path)
         resource = BaseConfigurationResource(connection, module.check_mode)
-        system_info = get_system_info(resource)
+        system_info = resource.get_system_info()
 
         platform_model = module.params['device_model'] or system_info['platformModel']
         check_that_model_is_supported(module, platform_model)
@@ -254,6 +253,8 @@ def main():
 
     ftd_platform = FtdPlatformFactory.create(platform_model, module.params)
     ftd_platform.install_ftd_image(module.params)
+    if not use_local_connection:
+        invalidate_system_info(connection)
 
     module.exit_json(changed=True,
                      msg='Successfully installed FTD image %s on the firewall device.' % module.params["image_version"])
@@ -267,10 +268,13 @@ def check_required_params_for_local_connection(module, params):
         module.fail_json(msg=message)
 
 
-def get_system_info(resource):
-    path_params = {ParamName.PATH_PARAMS: PATH_PARAMS_FOR_DEFAULT_OBJ}
-    system_info = resource.execute_operation(FtdOperations.GET_SYSTEM_INFO.value, path_params)
-    return system_info
+def invalidate_system_info(connection):
+    try:
+        connection.invalidate_system_information()
+    except ConnectionError as e:
+        # older connection plugins do not cache system information
+        if getattr(e, 'code', None) != METHOD_NOT_FOUND_ERROR_CODE:
+            raise
 
 
 def check_that_model_is_supported(module, platform_model):
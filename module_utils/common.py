@@ -15,11 +15,6 @@
 # You should have received a copy of the GNU General Public License
 # along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
 #
-try:
-    from collections import OrderedDict
-except ImportError:
-    from ordereddict import OrderedDict
-
 import re
 from ansible.module_utils._text import to_text
 from ansible.module_utils.common.collections import is_string
@@ -43,6 +38,14 @@ class ResponseParams:
     RESPONSE = 'response'
 
 
+class DiffField:
+    PATH = 'path'
+    BEFORE = 'before'
+    AFTER = 'after'
+    ADDED = 'added'
+    REMOVED = 'removed'
+
+
 class FtdConfigurationError(Exception):
     def __init__(self, msg, obj=None):
         super(FtdConfigurationError, self).__init__(msg)
@@ -90,9 +93,7 @@ def is_object_ref(d):
     :type d: dict
     :return: True if passed dictionary is a reference object, otherwise False
     """
-    has_id = 'id' in d.keys() and d['id']
-    has_type = 'type' in d.keys() and d['type']
-    return has_id and has_type
+    return d.get('id') and d.get('type')
 
 
 def equal_object_refs(d1, d2):
@@ -116,14 +117,7 @@ def equal_lists(l1, l2):
     :type l2: list
     :return: True if passed lists, their elements and order of elements are equal. Otherwise, returns False.
     """
-    if len(l1) != len(l2):
-        return False
-
-    for v1, v2 in zip(l1, l2):
-        if not equal_values(v1, v2):
-            return False
-
-    return True
+    return equal_values(l1, l2)
 
 
 def equal_dicts(d1, d2, compare_by_reference=True):
@@ -136,51 +130,28 @@ def equal_dicts(d1, d2, compare_by_reference=True):
     :param compare_by_reference: if True, dictionaries referencing objects are compared using `equal_object_refs` method
     :return: True if passed dicts are equal. Otherwise, returns False.
     """
-    if compare_by_reference and is_object_ref(d1) and is_object_ref(d2):
-        return equal_object_refs(d1, d2)
+    if compare_by_reference:
+        return equal_values(d1, d2)
 
-    if len(d1) != len(d2):
-        return False
-
-    for key, v1 in d1.items():
-        if key not in d2:
-            return False
-
-        v2 = d2[key]
-        if not equal_values(v1, v2):
-            return False
-
-    return True
+    stack = []
+    return _compare_dict_items(stack, d1, d2, dedupe_refs=False, schema=None) and _compare_pending_values(stack)
 
 
 def equal_values(v1, v2):
     """
-    Checks whether types and content of two values are the same. In case of complex objects, the method might be
-    called recursively.
+    Checks whether types and content of two values are the same. Complex values are walked iteratively, and
+    the comparison stops at the first difference.
 
     :param v1: first value
     :param v2: second value
     :return: True if types and content of passed values are equal. Otherwise, returns False.
     :rtype: bool
     """
-
-    # string-like values might have same text but different types, so checking them separately
-    if is_string(v1) and is_string(v2):
-        return to_text(v1) == to_text(v2)
-
-    if type(v1) != type(v2):
-        return False
-    value_type = type(v1)
-
-    if value_type == list:
-        return equal_lists(v1, v2)
-    elif value_type == dict:
-        return equal_dicts(v1, v2)
-    else:
-        return v1 == v2
+    stack = []
+    return _compare_or_push(stack, v1, v2, dedupe_refs=False) and _compare_pending_values(stack)
 
 
-def equal_objects(d1, d2, compare_common_fields_only=True):
+def equal_objects(d1, d2, compare_common_fields_only=True, schema=None):
     """
     Checks whether two objects are equal. Ignores special object properties (e.g. 'id', 'version') and
     properties with None and empty values. In case properties contains a reference to the other object,
@@ -189,26 +160,282 @@ def equal_objects(d1, d2, compare_common_fields_only=True):
 
     Use compare_common_fields_only to specify if only common fields should be compared.
 
+    When the comparison schema of the model is given (see `fdm_swagger_client.get_comparison_schema`), the order of
+    references in arrays of references is ignored, and fields having their default values are treated as missing,
+    as the server fills them anyway.
+
+    Objects are compared in place: properties are filtered and reference duplicates are skipped while walking
+    the objects, so that no filtered copies are built, and the comparison stops at the first difference.
+
     :type d1: dict
     :type d2: dict
     :type compare_common_fields_only: bool
+    :param schema: the comparison schema of the model of compared objects
+    :type schema: fdm_swagger_client.ComparisonSchema
     :return: True if passed objects and their properties are equal. Otherwise, returns False.
     """
 
-    def prepare_data_for_comparison(d, keys):
-        d = dict((k, v) for k, v in d.items() if k not in NON_COMPARABLE_PROPERTIES and v)
-        d = delete_ref_duplicates(d)
+    # when objects have no common fields, all fields are compared
+    common_fields_only = compare_common_fields_only and any(k in d2 for k in d1)
 
-        if keys:
-            d = dict((k, v) for k, v in d.items() if k in keys)
+    def is_comparable(key, value, other_obj):
+        return key not in NON_COMPARABLE_PROPERTIES and value and (not common_fields_only or key in other_obj) and \
+            not _is_default_value(schema, key, value)
 
-        return d
+    stack = []
+    compared_count = 0
+    for key, v1 in d1.items():
+        if not is_comparable(key, v1, d2):
+            continue
+        if key not in d2 or not is_comparable(key, d2[key], d1):
+            return False
+        compared_count += 1
+        if not _compare_field_values(stack, key, v1, d2[key], True, schema):
+            return False
+
+    if compared_count != sum(1 for key, v2 in d2.items() if is_comparable(key, v2, d1)):
+        return False
+    return _compare_pending_values(stack)
+
+
+def _compare_or_push(stack, v1, v2, dedupe_refs, schema=None, unordered=False):
+    """
+    Compares simple values right away and pushes lists and dicts to the stack to be compared later.
 
-    common_keys = set(d1.keys()) & set(d2.keys()) if compare_common_fields_only else None
+    :return: False if values are known to be different, otherwise True
+    """
+    value_type = type(v1)
+    if value_type is not type(v2):
+        # string-like values might have same text but different types, so checking them separately
+        return is_string(v1) and is_string(v2) and to_text(v1) == to_text(v2)
+    elif value_type is list or value_type is dict:
+        stack.append((v1, v2, dedupe_refs, schema, unordered))
+        return True
+    else:
+        return v1 == v2
+
+
+def _compare_field_values(stack, key, v1, v2, dedupe_refs, schema):
+    if schema is None:
+        return _compare_or_push(stack, v1, v2, dedupe_refs)
+    return _compare_or_push(stack, v1, v2, dedupe_refs, schema.nested.get(key), key in schema.unordered_fields)
 
-    d1 = prepare_data_for_comparison(d1, common_keys)
-    d2 = prepare_data_for_comparison(d2, common_keys)
-    return equal_dicts(d1, d2, compare_by_reference=False)
+
+def _compare_pending_values(stack):
+    """
+    Compares lists and dicts from the stack until the first difference is found. Reference duplicates are skipped
+    in arrays of nested objects pushed with `dedupe_refs`, as `delete_ref_duplicates` does. Dicts pushed with
+    a schema are compared following the schema, and lists are pushed with the schema of their items.
+
+    :return: True if all values are equal, otherwise False
+    """
+    while stack:
+        v1, v2, dedupe_refs, schema, unordered = stack.pop()
+        if type(v1) is dict:
+            if is_object_ref(v1) and is_object_ref(v2):
+                if not equal_object_refs(v1, v2):
+                    return False
+            elif not _compare_dict_items(stack, v1, v2, dedupe_refs, schema):
+                return False
+        else:
+            refs1, positions1 = _dedupe_refs(v1) if dedupe_refs or unordered else (None, None)
+            refs2, positions2 = _dedupe_refs(v2) if dedupe_refs or unordered else (None, None)
+            if refs1 is not None and refs2 is not None:
+                if not _equal_ref_positions(positions1, positions2, unordered):
+                    return False
+            elif dedupe_refs and (refs1 is not None or refs2 is not None):
+                # a reference is never equal to other values, so a list of references cannot be equal to other lists
+                return False
+            elif len(v1) != len(v2):
+                return False
+            else:
+                for item1, item2 in zip(v1, v2):
+                    if not _compare_or_push(stack, item1, item2, False, schema):
+                        return False
+    return True
+
+
+def _compare_dict_items(stack, d1, d2, dedupe_refs, schema):
+    if schema is None or not schema.defaults:
+        if len(d1) != len(d2):
+            return False
+        for key, v1 in d1.items():
+            if key not in d2 or not _compare_field_values(stack, key, v1, d2[key], dedupe_refs, schema):
+                return False
+        return True
+
+    # a missing field is equal to the default value the server fills it with
+    for key, v1 in d1.items():
+        if key in d2:
+            if not _compare_field_values(stack, key, v1, d2[key], dedupe_refs, schema):
+                return False
+        elif not _is_default_value(schema, key, v1):
+            return False
+    return all(key in d1 or _is_default_value(schema, key, v2) for key, v2 in d2.items())
+
+
+def _is_default_value(schema, key, value):
+    return schema is not None and key in schema.defaults and equal_values(value, schema.defaults[key])
+
+
+def _dedupe_refs(values):
+    """
+    Removes reference duplicates from the list in a single pass, stopping at the first item that is not a reference.
+    Unique references keep the position of the first reference to their objects, and the list is copied only from
+    the first duplicate on, so that lists without duplicates (e.g., the ones returned by the device) are not copied.
+
+    :type values: list
+    :return: the list without reference duplicates and positions of unique references in it keyed by their ids and
+        types, or a pair of Nones if some of the items is not a reference
+    :rtype: tuple
+    """
+    unique_refs = values
+    positions = {}
+    for index, value in enumerate(values):
+        if type(value) is not dict:
+            return None, None
+        ref_id = value.get('id')
+        ref_type = value.get('type')
+        if not (ref_id and ref_type):
+            return None, None
+        unique_count = len(positions)
+        position = positions.setdefault((ref_id, ref_type), unique_count)
+        if position == unique_count:
+            if unique_refs is not values:
+                unique_refs.append(value)
+        else:
+            if unique_refs is values:
+                unique_refs = values[:index]
+            # the last duplicate replaces the first one, as it always did
+            unique_refs[position] = value
+    return unique_refs, positions
+
+
+def _equal_ref_positions(positions1, positions2, unordered):
+    if unordered:
+        return len(positions1) == len(positions2) and all(ref_key in positions2 for ref_key in positions1)
+    return positions1 == positions2
+
+
+def object_diff(existing_obj, obj, compare_common_fields_only=True, schema=None):
+    """
+    Finds fields of the object that differ from the existing object, following the rules of `equal_objects`, so that
+    objects are equal if and only if the diff is empty. Both objects are walked once, and only the innermost
+    differing fields are reported: nested objects are descended into, as well as arrays of the same length.
+
+    :param existing_obj: the object before the change (e.g., the one existing on the device)
+    :type existing_obj: dict
+    :param obj: the object after the change (e.g., the one given by the user)
+    :type obj: dict
+    :type compare_common_fields_only: bool
+    :param schema: the comparison schema of the model of compared objects
+    :type schema: fdm_swagger_client.ComparisonSchema
+    :return: changes sorted by field paths (e.g., 'urlFilter.urlObjects' or 'ports[1].name'). Every change contains
+        the path and either the field value before and after the change (None for a missing field), or unique
+        references added to and removed from the array of references.
+    :rtype: list
+    """
+    common_fields_only = compare_common_fields_only and any(k in obj for k in existing_obj)
+
+    def is_comparable(key, value, other_obj):
+        return key not in NON_COMPARABLE_PROPERTIES and value and (not common_fields_only or key in other_obj) and \
+            not _is_default_value(schema, key, value)
+
+    changes = []
+    stack = []
+    for key, v1 in existing_obj.items():
+        if not is_comparable(key, v1, obj):
+            continue
+        v2 = obj.get(key)
+        if key in obj and is_comparable(key, v2, existing_obj):
+            _diff_field_values(changes, stack, key, key, v1, v2, True, schema)
+        else:
+            changes.append(_value_change(key, v1, v2))
+    for key, v2 in obj.items():
+        v1 = existing_obj.get(key)
+        if is_comparable(key, v2, existing_obj) and (key not in existing_obj or not is_comparable(key, v1, obj)):
+            changes.append(_value_change(key, v1, v2))
+
+    _diff_pending_values(changes, stack)
+    return sorted(changes, key=lambda change: change[DiffField.PATH])
+
+
+def _value_change(path, before, after):
+    return {DiffField.PATH: path, DiffField.BEFORE: before, DiffField.AFTER: after}
+
+
+def _diff_or_push(changes, stack, path, v1, v2, dedupe_refs, schema=None, unordered=False):
+    value_type = type(v1)
+    if value_type is not type(v2):
+        if not (is_string(v1) and is_string(v2) and to_text(v1) == to_text(v2)):
+            changes.append(_value_change(path, v1, v2))
+    elif value_type is list or value_type is dict:
+        stack.append((path, v1, v2, dedupe_refs, schema, unordered))
+    elif v1 != v2:
+        changes.append(_value_change(path, v1, v2))
+
+
+def _diff_field_values(changes, stack, path, key, v1, v2, dedupe_refs, schema):
+    if schema is None:
+        _diff_or_push(changes, stack, path, v1, v2, dedupe_refs)
+    else:
+        _diff_or_push(changes, stack, path, v1, v2, dedupe_refs, schema.nested.get(key), key in schema.unordered_fields)
+
+
+def _diff_pending_values(changes, stack):
+    """
+    Walks lists and dicts from the stack the same way as `_compare_pending_values` does, recording all differences.
+    """
+    while stack:
+        path, v1, v2, dedupe_refs, schema, unordered = stack.pop()
+        if type(v1) is dict:
+            if is_object_ref(v1) and is_object_ref(v2):
+                if not equal_object_refs(v1, v2):
+                    changes.append(_value_change(path, v1, v2))
+            else:
+                _diff_dict_items(changes, stack, path, v1, v2, dedupe_refs, schema)
+        else:
+            refs1, positions1 = _dedupe_refs(v1) if dedupe_refs or unordered else (None, None)
+            refs2, positions2 = _dedupe_refs(v2) if dedupe_refs or unordered else (None, None)
+            if refs1 is not None and refs2 is not None:
+                if not _equal_ref_positions(positions1, positions2, unordered):
+                    _diff_refs(changes, path, v1, v2, (refs1, positions1), (refs2, positions2))
+            elif dedupe_refs and (refs1 is not None or refs2 is not None):
+                changes.append(_value_change(path, v1, v2))
+            elif len(v1) != len(v2):
+                changes.append(_value_change(path, v1, v2))
+            else:
+                for index, (item1, item2) in enumerate(zip(v1, v2)):
+                    _diff_or_push(changes, stack, '%s[%s]' % (path, index), item1, item2, False, schema)
+
+
+def _diff_dict_items(changes, stack, path, d1, d2, dedupe_refs, schema):
+    for key, v1 in d1.items():
+        key_path = '%s.%s' % (path, key)
+        if key in d2:
+            _diff_field_values(changes, stack, key_path, key, v1, d2[key], dedupe_refs, schema)
+        elif not _is_default_value(schema, key, v1):
+            changes.append(_value_change(key_path, v1, None))
+    for key, v2 in d2.items():
+        if key not in d1 and not _is_default_value(schema, key, v2):
+            changes.append(_value_change('%s.%s' % (path, key), None, v2))
+
+
+def _diff_refs(changes, path, refs1, refs2, deduped_refs1, deduped_refs2):
+    """
+    Records the change of an array of references, given along with the results of `_dedupe_refs` for both arrays.
+    """
+    unique_refs1, positions1 = deduped_refs1
+    unique_refs2, positions2 = deduped_refs2
+    if _equal_ref_positions(positions1, positions2, unordered=True):
+        # the same references in another order
+        changes.append(_value_change(path, refs1, refs2))
+    else:
+        changes.append({
+            DiffField.PATH: path,
+            DiffField.ADDED: [ref for ref in unique_refs2 if (ref['id'], ref['type']) not in positions1],
+            DiffField.REMOVED: [ref for ref in unique_refs1 if (ref['id'], ref['type']) not in positions2]
+        })
 
 
 def delete_ref_duplicates(d):
@@ -216,29 +443,28 @@ def delete_ref_duplicates(d):
     Removes reference duplicates from array fields: if an array contains multiple items and some of
     them refer to the same object, only unique references are preserved (duplicates are removed).
 
+    Dicts and lists are copied only when they contain duplicates, so the given dict is returned
+    when there is nothing to remove.
+
     :param d: dict with data
     :type d: dict
     :return: dict without reference duplicates
     """
-
-    def delete_ref_duplicates_from_list(refs):
-        if all(type(i) == dict and is_object_ref(i) for i in refs):
-            unique_reference_map = OrderedDict()
-            for i in refs:
-                unique_reference_map[(i['id'], i['type'])] = i
-            return list(unique_reference_map.values())
-        else:
-            return refs
-
     if not d:
         return d
 
-    modified_d = {}
+    modified_d = None
     for k, v in d.items():
-        if type(v) == list:
-            modified_d[k] = delete_ref_duplicates_from_list(v)
-        elif type(v) == dict:
-            modified_d[k] = delete_ref_duplicates(v)
+        if type(v) is list:
+            new_v, _ = _dedupe_refs(v)
+            if new_v is None:
+                continue
+        elif type(v) is dict:
+            new_v = delete_ref_duplicates(v)
         else:
-            modified_d[k] = v
-    return modified_d
+            continue
+        if new_v is not v:
+            if modified_d is None:
+                modified_d = dict(d)
+            modified_d[k] = new_v
+    return d if modified_d is None else modified_d
@@ -15,26 +15,43 @@
 # You should have received a copy of the GNU General Public License
 # along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
 #
-import copy
+import re
+import time
+from collections import deque
 from functools import partial
+from itertools import islice
+from multiprocessing.pool import ThreadPool
 
-from ansible.module_utils.six import iteritems
+from ansible.module_utils.common._collections_compat import Mapping
+from ansible.module_utils.connection import ConnectionError
+from ansible.module_utils.six import iteritems, integer_types, string_types
 
 try:
-    from ansible.module_utils.common import HTTPMethod, equal_objects, FtdConfigurationError, \
+    from ansible.module_utils.common import HTTPMethod, equal_objects, object_diff, FtdConfigurationError, \
         FtdServerError, ResponseParams, copy_identity_properties, FtdUnexpectedResponse
-    from ansible.module_utils.fdm_swagger_client import OperationField, ValidationError
+    from ansible.module_utils.fdm_swagger_client import OperationField, OperationRole, ValidationError, \
+        get_operation_roles, get_comparison_schema, get_server_filter_keys
 except ImportError:
-    from module_utils.common import HTTPMethod, equal_objects, FtdConfigurationError, \
+    from module_utils.common import HTTPMethod, equal_objects, object_diff, FtdConfigurationError, \
         FtdServerError, ResponseParams, copy_identity_properties, FtdUnexpectedResponse
-    from module_utils.fdm_swagger_client import OperationField, ValidationError
+    from module_utils.fdm_swagger_client import OperationField, OperationRole, ValidationError, \
+        get_operation_roles, get_comparison_schema, get_server_filter_keys
 
 DEFAULT_PAGE_SIZE = 10
 DEFAULT_OFFSET = 0
+# the adaptive paging does not grow the page size beyond this value, so a single response stays reasonably small
+MAX_ADAPTIVE_PAGE_SIZE = 1000
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
 
 NO_CONTENT_STATUS = 204
+BAD_REQUEST_STATUS = 400
 UNPROCESSABLE_ENTITY_STATUS = 422
 
+# JSON-RPC error code returned when the connection plugin does not implement the called method
+METHOD_NOT_FOUND_ERROR_CODE = -32601
+# the operation changes the software installed on the device, so cached system information becomes stale
+START_UPGRADE_OPERATION = 'startUpgrade'
+
 INVALID_UUID_ERROR_MESSAGE = "Validation failed due to an invalid UUID"
 DUPLICATE_NAME_ERROR_MESSAGE = "Validation failed due to a duplicate name"
 
@@ -50,9 +67,25 @@ ADD_OPERATION_NOT_SUPPORTED_ERROR = (
     "Cannot add a new object while executing an upsert request. "
     "Creation of objects with this type is not supported."
 )
+BULK_OPERATION_NOT_SUPPORTED_ERROR = "A list of data items is supported by add and upsert operations only."
+COMMAND_TIMEOUT_ERROR = (
+    "The remaining requests are expected to take the operation about %d seconds, which exceeds the command timeout "
+    "of the persistent connection (%s seconds). Increase the timeout with the `ansible_command_timeout` variable, "
+    "or split the objects across several tasks."
+)
 
 PATH_PARAMS_FOR_DEFAULT_OBJ = {'objId': 'default'}
 
+# a synthetic operation dropping object lists cached by the connection
+INVALIDATE_OBJECT_CACHE_OPERATION = 'invalidateObjectCache'
+
+NAME_FILTER_KEY = 'name'
+FILTER_CONDITION_SEPARATOR = ';'
+
+# items of these list endpoints (e.g., jobs and action results) can be added or reordered between requests,
+# so their pages are never fetched concurrently
+UNSTABLE_ORDER_URL_REGEX = re.compile(r'/(action|jobs|operational)(/|$)')
+
 
 class OperationNamePrefix:
     ADD = 'add'
@@ -71,6 +104,37 @@ class ParamName:
     PATH_PARAMS = 'path_params'
     DATA = 'data'
     FILTERS = 'filters'
+    PAGE_SIZE = 'page_size'
+    ADAPTIVE_PAGING = 'adaptive_paging'
+    MAX_CONCURRENT_PAGES = 'max_concurrent_pages'
+    MAX_CONCURRENT_REQUESTS = 'max_concurrent_requests'
+
+
+class PagingField:
+    PAGING = 'paging'
+    NEXT = 'next'
+    COUNT = 'count'
+
+
+class MetricName:
+    PAGES_FETCHED = 'pages_fetched'
+    OBJECTS_FETCHED = 'objects_fetched'
+    SERVER_FILTERS = 'server_filters'
+
+
+class BulkItemField:
+    NAME = 'name'
+    STATUS = 'status'
+    OBJECT = 'object'
+    DIFF = 'diff'
+    ERROR = 'error'
+
+
+class BulkItemStatus:
+    CREATED = 'created'
+    UPDATED = 'updated'
+    UNCHANGED = 'unchanged'
+    FAILED = 'failed'
 
 
 class CheckModeException(Exception):
@@ -83,6 +147,58 @@ class FtdInvalidOperationNameError(Exception):
         self.operation_name = operation_name
 
 
+class OperationResultField:
+    CHANGED = 'changed'
+    RESPONSE = 'response'
+    ERROR = 'error'
+    ERROR_TYPE = 'type'
+    ERROR_ARGS = 'args'
+    METRICS = 'metrics'
+    DIFF = 'diff'
+
+
+# errors that are expected while executing an operation, along with the arguments needed to recreate them
+OPERATION_ERRORS = {
+    'FtdInvalidOperationNameError': (FtdInvalidOperationNameError, lambda e: [e.operation_name]),
+    'FtdConfigurationError': (FtdConfigurationError, lambda e: [e.msg, e.obj]),
+    'FtdServerError': (FtdServerError, lambda e: [e.response, e.code]),
+    'FtdUnexpectedResponse': (FtdUnexpectedResponse, lambda e: list(e.args)),
+    'ValidationError': (ValidationError, lambda e: list(e.args)),
+    'CheckModeException': (CheckModeException, lambda e: list(e.args))
+}
+
+
+def serialize_operation_error(error):
+    """
+    Converts an error raised while executing an operation into a dict, so that it can be passed over the persistent
+    connection and raised again in the module with `raise_operation_error`.
+
+    :param error: error raised by BaseConfigurationResource
+    :type error: Exception
+    :return: serialized error or None if the error is not an expected operation error
+    :rtype: dict
+    """
+    error_type = type(error).__name__
+    if error_type not in OPERATION_ERRORS or not isinstance(error, OPERATION_ERRORS[error_type][0]):
+        return None
+    get_args = OPERATION_ERRORS[error_type][1]
+    return {
+        OperationResultField.ERROR_TYPE: error_type,
+        OperationResultField.ERROR_ARGS: get_args(error)
+    }
+
+
+def raise_operation_error(error):
+    """
+    Raises the error serialized by `serialize_operation_error`.
+
+    :param error: serialized error
+    :type error: dict
+    """
+    error_class = OPERATION_ERRORS[error[OperationResultField.ERROR_TYPE]][0]
+    raise error_class(*error[OperationResultField.ERROR_ARGS])
+
+
 class OperationChecker(object):
 
     @classmethod
@@ -209,14 +325,34 @@ class OperationChecker(object):
 
 class BaseConfigurationResource(object):
 
-    def __init__(self, conn, check_mode=False):
+    def __init__(self, conn, check_mode=False, page_size=None, adaptive_paging=False, max_concurrent_pages=None,
+                 object_cache=None, command_timeout=None):
         self._conn = conn
         self.config_changed = False
+        self.diff = None
+        self.metrics = {MetricName.PAGES_FETCHED: 0, MetricName.OBJECTS_FETCHED: 0}
         self._operation_spec_cache = {}
         self._models_operations_specs_cache = {}
+        self._model_roles_cache = {}
+        self._model_roles_supported = True
+        self._model_names_by_type = {}
+        self._model_name_lookup_supported = True
+        self._model_spec_cache = {}
+        self._comparison_schema_cache = {}
+        # list operations that rejected keys other than the name, so that only the name is pushed to them again
+        self._name_only_filter_operations = set()
         self._check_mode = check_mode
         self._operation_checker = OperationChecker
         self._system_info = None
+        self._system_info_rpc_supported = True
+        self._batched_validation_supported = True
+        self._page_size = page_size
+        self._adaptive_paging = adaptive_paging
+        self._max_concurrent_pages = max_concurrent_pages
+        self._object_cache = object_cache
+        self._command_timeout = command_timeout
+        self._started_at = time.time()
+        self._request_durations = []
 
     def execute_operation(self, op_name, params):
         """
@@ -230,11 +366,29 @@ class BaseConfigurationResource(object):
         :return: Result of the operation being executed
         :rtype: dict
         """
-        if self._operation_checker.is_upsert_operation(op_name):
+        if op_name == INVALIDATE_OBJECT_CACHE_OPERATION:
+            return self.invalidate_object_cache(params)
+        elif isinstance(params.get(ParamName.DATA), list):
+            return self.bulk_upsert_objects(op_name, params)
+        elif self._operation_checker.is_upsert_operation(op_name):
             return self.upsert_object(op_name, params)
         else:
             return self.crud_operation(op_name, params)
 
+    def invalidate_object_cache(self, params):
+        """
+        Drops lists of objects cached by the connection (see ObjectCache), so that the following lookups fetch them
+        from the device again.
+
+        :param params: params of the operation, `data` might contain the 'model' key to drop lists of a single model
+        :type params: dict
+        :return: number of dropped lists
+        :rtype: dict
+        """
+        model_name = (params.get(ParamName.DATA) or {}).get('model')
+        invalidated_lists = self._object_cache.invalidate(model_name) if self._object_cache is not None else 0
+        return {'invalidated_lists': invalidated_lists}
+
     def crud_operation(self, op_name, params):
         """
         Allow user request execution of simple operations(natively supported by API provider) only.
@@ -271,11 +425,105 @@ class BaseConfigurationResource(object):
         if model_name not in self._models_operations_specs_cache:
             model_op_specs = self._conn.get_operation_specs_by_model_name(model_name)
             self._models_operations_specs_cache[model_name] = model_op_specs
-            for op_name, op_spec in iteritems(model_op_specs):
+            for op_name, op_spec in iteritems(model_op_specs or {}):
                 self._operation_spec_cache.setdefault(op_name, op_spec)
         return self._models_operations_specs_cache[model_name]
 
+    def get_model_roles(self, model_name):
+        """
+        Returns names of operations playing CRUD roles for the model (see `get_operation_roles`) from the index
+        built when the spec is parsed, so that operations are not scanned on every lookup.
+
+        :param model_name: name of the model
+        :type model_name: str
+        :rtype: dict
+        """
+        if model_name not in self._model_roles_cache:
+            model_roles = None
+            if self._model_roles_supported:
+                try:
+                    model_roles = self._conn.get_model_roles(model_name)
+                except ConnectionError as e:
+                    if getattr(e, 'code', None) != METHOD_NOT_FOUND_ERROR_CODE:
+                        raise
+                    # older connection plugins do not index operations by roles
+                    self._model_roles_supported = False
+            if model_roles is None:
+                model_roles = get_operation_roles(self.get_operation_specs_by_model_name(model_name) or {})
+            self._model_roles_cache[model_name] = model_roles
+        return self._model_roles_cache[model_name]
+
+    def get_model_name_by_type(self, obj_type):
+        """
+        Returns the name of the model whose objects have the given type (e.g., 'NetworkObject' for 'networkobject'),
+        so that objects referred to by their type and name can be looked up.
+
+        :param obj_type: the type of objects
+        :type obj_type: str
+        :return: the model name, or None if no model matches the type or the connection cannot look models up
+        :rtype: str
+        """
+        if obj_type not in self._model_names_by_type:
+            model_name = None
+            if self._model_name_lookup_supported:
+                try:
+                    model_name = self._conn.get_model_name_by_type(obj_type)
+                except ConnectionError as e:
+                    if getattr(e, 'code', None) != METHOD_NOT_FOUND_ERROR_CODE:
+                        raise
+                    # older connection plugins cannot look models up by the object type
+                    self._model_name_lookup_supported = False
+            self._model_names_by_type[obj_type] = model_name
+        return self._model_names_by_type[obj_type]
+
+    def get_comparison_schema(self, model_name):
+        """
+        Returns the comparison schema of the model (see `get_comparison_schema`), so that objects are compared
+        knowing which arrays are sets of references and which fields have default values.
+
+        :param model_name: name of the model
+        :type model_name: str
+        :return: the schema, or None if the model is not in the spec
+        :rtype: ComparisonSchema
+        """
+        return get_comparison_schema(model_name, self._get_model_spec, self._comparison_schema_cache)
+
+    def _get_model_spec(self, model_name):
+        if model_name not in self._model_spec_cache:
+            self._model_spec_cache[model_name] = self._conn.get_model_spec(model_name)
+        return self._model_spec_cache[model_name]
+
+    def equal_to_existing_object(self, model_name, existing_obj, obj):
+        """
+        Checks whether the object given by the user equals to the existing one, comparing them by the schema
+        of the model, so that changes made by the server only (e.g., the reordered references or filled defaults)
+        do not cause updates.
+
+        :rtype: bool
+        """
+        return equal_objects(existing_obj, obj, schema=self.get_comparison_schema(model_name))
+
+    def diff_with_existing_object(self, model_name, existing_obj, obj):
+        """
+        Finds fields of the object given by the user that differ from the existing one (see `object_diff`),
+        following the same rules as `equal_to_existing_object`. The diff is also saved to `diff`, so that it is
+        returned to the user along with the result of the operation.
+
+        :return: list of changes, empty when the objects are equal
+        :rtype: list
+        """
+        self.diff = object_diff(existing_obj, obj, schema=self.get_comparison_schema(model_name))
+        return self.diff
+
     def get_objects_by_filter(self, operation_name, params):
+        pages = self._get_object_pages_by_filter(operation_name, params)
+        return (obj for objects in pages for obj in objects)
+
+    def _get_object_pages_by_filter(self, operation_name, params):
+        """
+        Does the same as `get_objects_by_filter`, but returns lists of matching objects page by page, so that
+        callers can stop before the next page is requested.
+        """
 
         def match_filters(filter_params, obj):
             for k, v in iteritems(filter_params):
@@ -284,18 +532,97 @@ class BaseConfigurationResource(object):
             return True
 
         _, query_params, path_params = _get_user_params(params)
-        # copy required params to avoid mutation of passed `params` dict
-        url_params = {ParamName.QUERY_PARAMS: dict(query_params), ParamName.PATH_PARAMS: dict(path_params)}
+        # query params are copied to avoid mutation of passed `params` dict, path params are never mutated
+        url_params = {ParamName.QUERY_PARAMS: dict(query_params), ParamName.PATH_PARAMS: path_params}
 
         filters = params.get(ParamName.FILTERS) or {}
-        if QueryParams.FILTER not in url_params[ParamName.QUERY_PARAMS] and 'name' in filters:
-            # most endpoints only support filtering by name, so remaining `filters` are applied on returned objects
-            url_params[ParamName.QUERY_PARAMS][QueryParams.FILTER] = self._stringify_name_filter(filters)
+        server_filters = {}
+        if QueryParams.FILTER not in url_params[ParamName.QUERY_PARAMS]:
+            server_filters = self.plan_server_filters(operation_name, filters)
+
+        page_size, adaptive_paging, max_concurrent_pages = self._get_paging_settings(params)
+        if UNSTABLE_ORDER_URL_REGEX.search(self.get_operation_spec(operation_name)[OperationField.URL]):
+            max_concurrent_pages = 1
+
+        def iterate(filters_to_push):
+            self.metrics[MetricName.SERVER_FILTERS] = sorted(filters_to_push)
+            page_params = url_params
+            if filters_to_push:
+                page_params = dict(url_params)
+                page_params[ParamName.QUERY_PARAMS] = dict(url_params[ParamName.QUERY_PARAMS])
+                page_params[ParamName.QUERY_PARAMS][QueryParams.FILTER] = self._stringify_filters(filters_to_push)
+            return iterate_over_pageable_resource_pages(
+                partial(self.send_general_request, operation_name=operation_name), page_params,
+                page_size=page_size, adaptive=adaptive_paging, metrics=self.metrics,
+                max_concurrent_pages=max_concurrent_pages
+            )
+
+        # the server might match filters less strictly (e.g., 'fts~' is a full-text search), so all `filters`
+        # are checked on returned objects, while filters applied on the server reduce the number of transferred ones
+        pages = _iterate_with_server_filters(iterate, server_filters,
+                                             on_rejected=lambda: self._name_only_filter_operations.add(operation_name))
+        return ([i for i in items if match_filters(filters, i)] for items in pages)
+
+    def plan_server_filters(self, operation_name, filters):
+        """
+        Selects `filters` that can be applied on the server side by the given list operation. The name filter is
+        supported by all list operations accepting the `filter` query param, other keys are derived from the API
+        spec of the device (see `get_server_filter_keys`) unless the operation has already rejected them. Values that
+        cannot be expressed in the FDM filter grammar (i.e., non-scalar values and strings containing the separator)
+        are applied on the client side only.
 
-        item_generator = iterate_over_pageable_resource(
-            partial(self.send_general_request, operation_name=operation_name), url_params
-        )
-        return (i for i in item_generator if match_filters(filters, i))
+        :param operation_name: name of the list operation
+        :type operation_name: str
+        :param filters: equality filters given by the user
+        :type filters: dict
+        :return: filters to be applied on the server side
+        :rtype: dict
+        """
+        op_spec = self.get_operation_spec(operation_name)
+        query_params_spec = (op_spec.get(OperationField.PARAMETERS) or {}).get('query')
+        if query_params_spec is not None and QueryParams.FILTER not in query_params_spec:
+            return {}
+
+        supported_keys = frozenset()
+        other_keys_given = any(k != NAME_FILTER_KEY for k in filters)
+        if other_keys_given and operation_name not in self._name_only_filter_operations:
+            model_name = op_spec.get(OperationField.MODEL_NAME)
+            model_spec = self._get_model_spec(model_name) if model_name else None
+            supported_keys = get_server_filter_keys(op_spec, model_spec) or frozenset()
+
+        return dict((k, v) for k, v in iteritems(filters)
+                    if (k == NAME_FILTER_KEY or k in supported_keys) and _is_server_filter_value(v))
+
+    def _stringify_filters(self, server_filters):
+        conditions = []
+        if NAME_FILTER_KEY in server_filters:
+            conditions.append(self._stringify_name_filter(server_filters))
+        conditions.extend('%s:%s' % (k, v) for k, v in sorted(iteritems(server_filters)) if k != NAME_FILTER_KEY)
+        return FILTER_CONDITION_SEPARATOR.join(conditions)
+
+    def _get_paging_settings(self, params):
+        """
+        Returns the page size, whether the adaptive paging is enabled and the maximum number of pages fetched
+        concurrently. Values given in the task `params` take precedence over the ones the resource was created with
+        (e.g., inventory settings of the connection).
+        """
+        def get_setting(name, resource_value, default_value):
+            value = params.get(name)
+            if value is None:
+                value = resource_value
+            return default_value if value is None else value
+
+        page_size = get_setting(ParamName.PAGE_SIZE, self._page_size, DEFAULT_PAGE_SIZE)
+        if int(page_size) < 1:
+            raise FtdConfigurationError('Page size must be a positive integer, got %s' % page_size)
+
+        max_concurrent_pages = get_setting(ParamName.MAX_CONCURRENT_PAGES, self._max_concurrent_pages, 1)
+        if int(max_concurrent_pages) < 1:
+            raise FtdConfigurationError(
+                'Maximum number of concurrent pages must be a positive integer, got %s' % max_concurrent_pages)
+
+        adaptive_paging = get_setting(ParamName.ADAPTIVE_PAGING, self._adaptive_paging, False)
+        return int(page_size), bool(adaptive_paging), int(max_concurrent_pages)
 
     def _stringify_name_filter(self, filters):
         build_version = self.get_build_version()
@@ -304,12 +631,29 @@ class BaseConfigurationResource(object):
         return "name:%s" % filters['name']
 
     def _fetch_system_info(self):
+        if not self._system_info and self._system_info_rpc_supported:
+            try:
+                self._system_info = self._conn.get_system_information()
+            except ConnectionError as e:
+                if getattr(e, 'code', None) != METHOD_NOT_FOUND_ERROR_CODE:
+                    raise
+                # older connection plugins do not cache system information
+                self._system_info_rpc_supported = False
         if not self._system_info:
             params = {ParamName.PATH_PARAMS: PATH_PARAMS_FOR_DEFAULT_OBJ}
             self._system_info = self.send_general_request('getSystemInformation', params)
 
         return self._system_info
 
+    def get_system_info(self):
+        """
+        Returns system information of the device. The connection plugin keeps it for the lifetime of the connection,
+        so the call does not reach the device unless the software has been installed or upgraded since.
+
+        :rtype: dict
+        """
+        return self._fetch_system_info()
+
     def get_build_version(self):
         system_info = self._fetch_system_info()
         return system_info['databaseInfo']['buildVersion']
@@ -341,7 +685,7 @@ class BaseConfigurationResource(object):
         existing_obj = self._find_object_matching_params(model_name, params)
 
         if existing_obj is not None:
-            if equal_objects(existing_obj, params[ParamName.DATA]):
+            if self.equal_to_existing_object(model_name, existing_obj, params[ParamName.DATA]):
                 return existing_obj
             else:
                 raise FtdConfigurationError(DUPLICATE_ERROR, existing_obj)
@@ -357,6 +701,15 @@ class BaseConfigurationResource(object):
         if not params.get(ParamName.FILTERS):
             params[ParamName.FILTERS] = {'name': data['name']}
 
+        if list(params[ParamName.FILTERS]) == [NAME_FILTER_KEY]:
+            if self._object_cache is not None and not params.get(ParamName.QUERY_PARAMS):
+                cached_objects = self._find_cached_objects_by_name(model_name, get_list_operation, params)
+                if cached_objects is not None:
+                    if len(cached_objects) > 1:
+                        raise FtdConfigurationError(MULTIPLE_DUPLICATES_FOUND_ERROR)
+                    return cached_objects[0] if cached_objects else None
+            return self._find_object_by_name(get_list_operation, params)
+
         obj = None
         filtered_objs = self.get_objects_by_filter(get_list_operation, params)
 
@@ -367,17 +720,60 @@ class BaseConfigurationResource(object):
 
         return obj
 
+    def _find_cached_objects_by_name(self, model_name, get_list_operation, params):
+        """
+        Looks for objects with the name given in `filters` in the object cache. The complete list of the model
+        is fetched and cached on the first lookup.
+
+        :return: matching objects or None if the list cannot be cached
+        :rtype: list
+        """
+        path_params = _get_list_path_params(params)
+        if not self._object_cache.is_loaded(model_name, path_params):
+            list_params = dict(params)
+            list_params[ParamName.FILTERS] = None
+            list_params[ParamName.PATH_PARAMS] = path_params
+            self._object_cache.load(model_name, list(self.get_objects_by_filter(get_list_operation, list_params)),
+                                    path_params)
+        return self._object_cache.find_by_name(model_name, params[ParamName.FILTERS][NAME_FILTER_KEY], path_params)
+
+    def _update_object_cache(self, operation_name, op_spec, params, response):
+        # successful writes are applied to the cached lists, so that following lookups see the changes
+        model_name = op_spec.get(OperationField.MODEL_NAME)
+        if self._object_cache is None or model_name is None or op_spec[OperationField.METHOD] == HTTPMethod.GET:
+            return
+
+        path_params = params.get(ParamName.PATH_PARAMS) or {}
+        is_add = self._operation_checker.is_add_operation(operation_name, op_spec)
+        is_edit = self._operation_checker.is_edit_operation(operation_name, op_spec)
+        if (is_add or is_edit) and isinstance(response, dict) and 'id' in response:
+            self._object_cache.put(model_name, response, _get_list_path_params(params))
+        elif self._operation_checker.is_delete_operation(operation_name, op_spec) and 'objId' in path_params:
+            self._object_cache.remove(model_name, path_params['objId'])
+        else:
+            # other operations might change objects of the model in an unknown way
+            self._object_cache.invalidate(model_name)
+
+    def _find_object_by_name(self, get_list_operation, params):
+        # names are unique within a model, so the lookup stops after the page containing the exact match instead of
+        # fetching all objects matching the name partially (e.g., 'fts~' returns every object whose name contains
+        # the given one). Duplicates are still detected within the fetched page.
+        pages = self._get_object_pages_by_filter(get_list_operation, params)
+        try:
+            for objects in pages:
+                if len(objects) > 1:
+                    raise FtdConfigurationError(MULTIPLE_DUPLICATES_FOUND_ERROR)
+                elif objects:
+                    return objects[0]
+        finally:
+            pages.close()
+        return None
+
     def _find_get_list_operation(self, model_name):
-        operations = self.get_operation_specs_by_model_name(model_name) or {}
-        return next((
-            op for op, op_spec in operations.items()
-            if self._operation_checker.is_get_list_operation(op, op_spec)), None)
+        return self.get_model_roles(model_name)[OperationRole.GET_LIST]
 
     def _find_get_operation(self, model_name):
-        operations = self.get_operation_specs_by_model_name(model_name) or {}
-        return next((
-            op for op, op_spec in operations.items()
-            if self._operation_checker.is_get_operation(op, op_spec)), None)
+        return self.get_model_roles(model_name)[OperationRole.GET]
 
     def delete_object(self, operation_name, params):
         def is_invalid_uuid_error(err):
@@ -391,7 +787,15 @@ class BaseConfigurationResource(object):
             else:
                 raise e
 
-    def edit_object(self, operation_name, params):
+    def edit_object(self, operation_name, params, existing_object=None):
+        """
+        Edits the object unless it already equals to the existing one. The existing object is fetched and compared
+        with `data` unless the caller gives the object it has already found to differ (see `upsert_object`).
+        """
+        if existing_object is not None:
+            new_object = self.send_general_request(operation_name, params)
+            return new_object if self.config_changed else existing_object
+
         existing_object, _, _ = data, _, path_params = _get_user_params(params)
 
         model_name = self.get_operation_spec(operation_name)[OperationField.MODEL_NAME]
@@ -401,7 +805,7 @@ class BaseConfigurationResource(object):
             existing_object = self.send_general_request(get_operation, {ParamName.PATH_PARAMS: path_params})
             if not existing_object:
                 raise FtdConfigurationError('Referenced object does not exist')
-            elif equal_objects(existing_object, data):
+            elif not self.diff_with_existing_object(model_name, existing_object, data):
                 return existing_object
 
         new_object = self.send_general_request(operation_name, params)
@@ -419,15 +823,21 @@ class BaseConfigurationResource(object):
         op_spec = self.get_operation_spec(operation_name)
         url, method = op_spec[OperationField.URL], op_spec[OperationField.METHOD]
 
-        return self._send_request(url, method, data, path_params, query_params)
+        response = self._send_request(url, method, data, path_params, query_params)
+        self._update_object_cache(operation_name, op_spec, params, response)
+        if operation_name == START_UPGRADE_OPERATION:
+            self._system_info = None
+        return response
 
     def _send_request(self, url_path, http_method, body_params=None, path_params=None, query_params=None):
         def raise_for_failure(resp):
             if not resp[ResponseParams.SUCCESS]:
                 raise FtdServerError(resp[ResponseParams.RESPONSE], resp[ResponseParams.STATUS_CODE])
 
+        started_at = time.time()
         response = self._conn.send_request(url_path=url_path, http_method=http_method, body_params=body_params,
                                            path_params=path_params, query_params=query_params)
+        self._request_durations.append(time.time() - started_at)
         raise_for_failure(response)
 
         is_unsafe_method = http_method != HTTPMethod.GET
@@ -436,47 +846,216 @@ class BaseConfigurationResource(object):
             self.config_changed = True
         return response[ResponseParams.RESPONSE]
 
+    def check_expected_run_time(self, sequential_requests):
+        """
+        Fails before sending more requests when they are not expected to complete within the command timeout of
+        the persistent connection, which aborts the operation executed by the connection plugin at any point.
+        The time of following requests is estimated from requests sent so far.
+
+        :param sequential_requests: the number of requests sent one after another (i.e., the number of requests
+            divided by the number of concurrent workers)
+        :type sequential_requests: int
+        """
+        if not self._command_timeout or not self._request_durations or not sequential_requests:
+            return
+        average_duration = sum(self._request_durations) / len(self._request_durations)
+        expected_run_time = time.time() - self._started_at + sequential_requests * average_duration
+        if expected_run_time > self._command_timeout:
+            raise FtdConfigurationError(COMMAND_TIMEOUT_ERROR % (expected_run_time, self._command_timeout))
+
     def validate_params(self, operation_name, params):
+        data, query_params, path_params = _get_user_params(params)
+        reports = None
+        if self._batched_validation_supported:
+            try:
+                reports = self._conn.validate_request(operation_name, data, query_params, path_params)
+            except ConnectionError as e:
+                if getattr(e, 'code', None) != METHOD_NOT_FOUND_ERROR_CODE:
+                    raise
+                # older connection plugins do not support batched validation
+                self._batched_validation_supported = False
+        if reports is None:
+            reports = self._validate_params_separately(operation_name, data, query_params, path_params)
+
         report = {}
+        for field_name in (ParamName.QUERY_PARAMS, ParamName.PATH_PARAMS, ParamName.DATA):
+            if field_name in reports:
+                report['Invalid %s provided' % field_name] = reports[field_name]
+        if report:
+            raise ValidationError(report)
+
+    def _validate_params_separately(self, operation_name, data, query_params, path_params):
+        reports = {}
         op_spec = self.get_operation_spec(operation_name)
-        data, query_params, path_params = _get_user_params(params)
 
         def validate(validation_method, field_name, user_params):
-            key = 'Invalid %s provided' % field_name
             try:
                 is_valid, validation_report = validation_method(operation_name, user_params)
                 if not is_valid:
-                    report[key] = validation_report
+                    reports[field_name] = validation_report
             except Exception as e:
-                report[key] = str(e)
-            return report
+                reports[field_name] = str(e)
 
         validate(self._conn.validate_query_params, ParamName.QUERY_PARAMS, query_params)
         validate(self._conn.validate_path_params, ParamName.PATH_PARAMS, path_params)
         if is_post_request(op_spec) or is_put_request(op_spec):
             validate(self._conn.validate_data, ParamName.DATA, data)
+        return reports
 
-        if report:
-            raise ValidationError(report)
-
-    @staticmethod
-    def _get_operation_name(checker, operations):
-        return next((op_name for op_name, op_spec in iteritems(operations) if checker(op_name, op_spec)), None)
-
-    def _add_upserted_object(self, model_operations, params):
-        add_op_name = self._get_operation_name(self._operation_checker.is_add_operation, model_operations)
+    def _add_upserted_object(self, model_roles, params):
+        add_op_name = model_roles[OperationRole.ADD]
         if not add_op_name:
             raise FtdConfigurationError(ADD_OPERATION_NOT_SUPPORTED_ERROR)
         return self.add_object(add_op_name, params)
 
-    def _edit_upserted_object(self, model_operations, existing_object, params):
-        edit_op_name = self._get_operation_name(self._operation_checker.is_edit_operation, model_operations)
+    def _edit_upserted_object(self, model_roles, existing_object, params):
+        edit_op_name = model_roles[OperationRole.EDIT]
         _set_default(params, 'path_params', {})
         _set_default(params, 'data', {})
 
         params['path_params']['objId'] = existing_object['id']
         copy_identity_properties(existing_object, params['data'])
-        return self.edit_object(edit_op_name, params)
+        # the object has just been compared with the existing one, so it is neither fetched nor compared again
+        return self.edit_object(edit_op_name, params, existing_object)
+
+    def bulk_upsert_objects(self, op_name, params):
+        """
+        Adds or updates multiple objects of the same model given as a list in `data`. Objects of the model are
+        listed once and every item is compared with the existing object of the same name in memory, so that only
+        objects that do not exist or differ are sent to the device. Requests are sent concurrently by at most
+        `max_concurrent_requests` workers.
+
+        Upsert operations update the existing objects, while add operations fail when an existing object
+        differs from the item, just like for a single object. All items are checked before any request is sent.
+        A request rejected by the device does not stop the others; the report of its item gets the 'failed' status
+        and the error, while the reports of other items show the objects written to the device.
+
+        :param op_name: name of the add or upsert operation
+        :type op_name: str
+        :param params: params of the operation with the list of objects in `data`
+        :type params: dict
+        :return: reports for every item in the order of `data`, each containing the item name, its status
+            ('created', 'updated', 'unchanged' or 'failed') and the resulting object; reports of updated items also
+            contain the fields that have changed (see `object_diff`), and reports of failed items contain the error
+        :rtype: list
+        """
+        model_name, is_upsert = self._get_bulk_operation_model_name(op_name)
+        model_roles = self.get_model_roles(model_name)
+        get_list_op_name = model_roles[OperationRole.GET_LIST]
+        if not get_list_op_name or (is_upsert and not model_roles[OperationRole.UPSERT]):
+            raise FtdInvalidOperationNameError(op_name)
+
+        items = params[ParamName.DATA]
+        _validate_bulk_items(items)
+        existing_objects = self._get_existing_objects_by_name(model_name, get_list_op_name, params)
+
+        reports = []
+        requests = []
+        for item in items:
+            report = {BulkItemField.NAME: item['name']}
+            reports.append(report)
+            existing_objs = existing_objects.get(item['name'], [])
+            if len(existing_objs) > 1:
+                raise FtdConfigurationError(MULTIPLE_DUPLICATES_FOUND_ERROR)
+            elif not existing_objs:
+                add_op_name = model_roles[OperationRole.ADD]
+                if not add_op_name:
+                    raise FtdConfigurationError(ADD_OPERATION_NOT_SUPPORTED_ERROR)
+                report[BulkItemField.STATUS] = BulkItemStatus.CREATED
+                report[BulkItemField.OBJECT] = None
+                requests.append((report, add_op_name, self._get_bulk_item_params(params, item)))
+                continue
+
+            diff = object_diff(existing_objs[0], item, schema=self.get_comparison_schema(model_name))
+            if not diff:
+                report[BulkItemField.STATUS] = BulkItemStatus.UNCHANGED
+                report[BulkItemField.OBJECT] = existing_objs[0]
+            elif not is_upsert:
+                raise FtdConfigurationError(DUPLICATE_ERROR, existing_objs[0])
+            else:
+                edit_op_name = model_roles[OperationRole.EDIT]
+                item_params = self._get_bulk_item_params(params, copy_identity_properties(existing_objs[0], dict(item)))
+                item_params[ParamName.PATH_PARAMS]['objId'] = existing_objs[0]['id']
+                report[BulkItemField.STATUS] = BulkItemStatus.UPDATED
+                report[BulkItemField.OBJECT] = existing_objs[0]
+                report[BulkItemField.DIFF] = diff
+                requests.append((report, edit_op_name, item_params))
+
+        def send_request(request):
+            report, request_op_name, request_params = request
+            try:
+                report[BulkItemField.OBJECT] = self.send_general_request(request_op_name, request_params)
+            except CheckModeException:
+                raise
+            except (FtdServerError, FtdUnexpectedResponse, FtdConfigurationError, ValidationError) as e:
+                report[BulkItemField.STATUS] = BulkItemStatus.FAILED
+                report[BulkItemField.ERROR] = format_request_error(e)
+
+        max_concurrent_requests = self._get_max_concurrent_requests(params)
+        if not self._check_mode:
+            self.check_expected_run_time(_count_sequential_requests(len(requests), max_concurrent_requests))
+        if max_concurrent_requests == 1 or len(requests) < 2:
+            for request in requests:
+                send_request(request)
+        else:
+            pool = ThreadPool(min(max_concurrent_requests, len(requests)))
+            try:
+                # every item records its own outcome, so the remaining items are sent when one of them fails
+                for _ in pool.imap_unordered(send_request, requests):
+                    pass
+            finally:
+                pool.terminate()
+        return reports
+
+    def _get_bulk_operation_model_name(self, op_name):
+        if self._operation_checker.is_upsert_operation(op_name):
+            model_name = op_name[len(OperationNamePrefix.UPSERT):]
+            if not self._get_model_spec(model_name):
+                raise FtdInvalidOperationNameError(op_name)
+            return model_name, True
+
+        op_spec = self.get_operation_spec(op_name)
+        if op_spec is None:
+            raise FtdInvalidOperationNameError(op_name)
+        if not self._operation_checker.is_add_operation(op_name, op_spec):
+            raise FtdConfigurationError(BULK_OPERATION_NOT_SUPPORTED_ERROR)
+        return op_spec[OperationField.MODEL_NAME], False
+
+    def _get_existing_objects_by_name(self, model_name, get_list_op_name, params):
+        path_params = _get_list_path_params(params)
+        list_params = {
+            ParamName.QUERY_PARAMS: params.get(ParamName.QUERY_PARAMS),
+            ParamName.PATH_PARAMS: path_params,
+            ParamName.PAGE_SIZE: params.get(ParamName.PAGE_SIZE),
+            ParamName.ADAPTIVE_PAGING: params.get(ParamName.ADAPTIVE_PAGING),
+            ParamName.MAX_CONCURRENT_PAGES: params.get(ParamName.MAX_CONCURRENT_PAGES)
+        }
+        objects = list(self.get_objects_by_filter(get_list_op_name, list_params))
+        if self._object_cache is not None and not params.get(ParamName.QUERY_PARAMS):
+            # the complete list was fetched anyway, so following lookups by name can use it
+            self._object_cache.load(model_name, objects, path_params)
+
+        objects_by_name = {}
+        for obj in objects:
+            objects_by_name.setdefault(obj.get('name'), []).append(obj)
+        return objects_by_name
+
+    @staticmethod
+    def _get_bulk_item_params(params, item):
+        return {
+            ParamName.DATA: item,
+            ParamName.QUERY_PARAMS: params.get(ParamName.QUERY_PARAMS),
+            ParamName.PATH_PARAMS: _get_list_path_params(params)
+        }
+
+    def _get_max_concurrent_requests(self, params):
+        max_concurrent_requests = params.get(ParamName.MAX_CONCURRENT_REQUESTS)
+        if max_concurrent_requests is None:
+            return DEFAULT_MAX_CONCURRENT_REQUESTS
+        if int(max_concurrent_requests) < 1:
+            raise FtdConfigurationError(
+                'Maximum number of concurrent requests must be a positive integer, got %s' % max_concurrent_requests)
+        return int(max_concurrent_requests)
 
     def upsert_object(self, op_name, params):
         """
@@ -493,23 +1072,90 @@ class BaseConfigurationResource(object):
         """
         def extract_and_validate_model():
             model = op_name[len(OperationNamePrefix.UPSERT):]
-            if not self._conn.get_model_spec(model):
+            if not self._get_model_spec(model):
                 raise FtdInvalidOperationNameError(op_name)
             return model
 
         model_name = extract_and_validate_model()
-        model_operations = self.get_operation_specs_by_model_name(model_name)
+        model_roles = self.get_model_roles(model_name)
 
-        if not self._operation_checker.is_upsert_operation_supported(model_operations):
+        if not model_roles[OperationRole.UPSERT]:
             raise FtdInvalidOperationNameError(op_name)
 
         existing_obj = self._find_object_matching_params(model_name, params)
         if existing_obj:
-            equal_to_existing_obj = equal_objects(existing_obj, params[ParamName.DATA])
-            return existing_obj if equal_to_existing_obj \
-                else self._edit_upserted_object(model_operations, existing_obj, params)
+            diff = self.diff_with_existing_object(model_name, existing_obj, params[ParamName.DATA])
+            return self._edit_upserted_object(model_roles, existing_obj, params) if diff else existing_obj
         else:
-            return self._add_upserted_object(model_operations, params)
+            return self._add_upserted_object(model_roles, params)
+
+
+def _validate_bulk_items(items):
+    names = set()
+    for item in items:
+        if not isinstance(item, dict) or not item.get('name'):
+            raise FtdConfigurationError('Every data item must be a dictionary with the object name, got %s' % item)
+        if item['name'] in names:
+            raise FtdConfigurationError('Multiple data items have the same name: %s' % item['name'])
+        names.add(item['name'])
+
+
+def _count_sequential_requests(request_count, max_concurrent_requests):
+    return (request_count + max_concurrent_requests - 1) // max_concurrent_requests
+
+
+def format_request_error(error):
+    """
+    Formats an error of a single request, so that it can be reported together with outcomes of other requests sent
+    concurrently (e.g., items of a bulk operation).
+
+    :rtype: str
+    """
+    if isinstance(error, FtdServerError):
+        return 'Status code: %s. Server response: %s' % (error.code, error.response)
+    if isinstance(error, FtdConfigurationError):
+        return error.msg
+    return error.args[0]
+
+
+def get_failed_bulk_items(reports):
+    """
+    Returns names of items whose requests failed during a bulk operation (see `bulk_upsert_objects`).
+
+    :param reports: reports returned by the bulk operation
+    :type reports: list
+    :rtype: list
+    """
+    return [report[BulkItemField.NAME] for report in reports
+            if isinstance(report, dict) and report.get(BulkItemField.STATUS) == BulkItemStatus.FAILED]
+
+
+def _is_server_filter_value(value):
+    if isinstance(value, string_types):
+        return FILTER_CONDITION_SEPARATOR not in value
+    return isinstance(value, integer_types) and not isinstance(value, bool)
+
+
+def _iterate_with_server_filters(iterate, server_filters, on_rejected=None):
+    """
+    Iterates over pages returned by `iterate(server_filters)`. If the server rejects the first request because of
+    keys other than the name, `on_rejected` is called and the iteration starts over with the name filter only.
+    """
+    items_returned = False
+    try:
+        for items in iterate(server_filters):
+            items_returned = True
+            yield items
+    except FtdServerError as e:
+        name_filter = dict((k, v) for k, v in iteritems(server_filters) if k == NAME_FILTER_KEY)
+        filter_rejected = e.code in (BAD_REQUEST_STATUS, UNPROCESSABLE_ENTITY_STATUS)
+        if items_returned or not filter_rejected or name_filter == server_filters:
+            raise
+
+        if on_rejected is not None:
+            on_rejected()
+        for items in iterate(name_filter):
+            yield items
 
 
 def _set_default(params, field_name, value):
@@ -525,29 +1171,126 @@ def is_put_request(operation_spec):
     return operation_spec[OperationField.METHOD] == HTTPMethod.PUT
 
 
+def _get_list_path_params(params):
+    # objects are identified by the 'objId' path param, remaining path params identify the list they belong to
+    path_params = params.get(ParamName.PATH_PARAMS) or {}
+    return dict((k, v) for k, v in iteritems(path_params) if k != 'objId')
+
+
 def _get_user_params(params):
     return params.get(ParamName.DATA) or {}, params.get(ParamName.QUERY_PARAMS) or {}, params.get(
         ParamName.PATH_PARAMS) or {}
 
 
-def iterate_over_pageable_resource(resource_func, params):
+class PageRequestParams(Mapping):
+    """
+    Read-only params of a request for a single page of a pageable resource.
+
+    Pages of a resource differ only in their query params, so every instance owns a shallow copy of the query params,
+    while other params (e.g., `path_params` or a large `data` payload) are shared with the original params by reference
+    and are never copied or mutated.
+    """
+
+    __slots__ = ('_params', '_query_params')
+
+    def __init__(self, params, **default_query_params):
+        """
+        :param params: original params of the request, the dict is not mutated
+        :type params: dict
+        :param default_query_params: values of query params that are used when not present in `params`
+        """
+        self._params = params
+        self._query_params = dict(default_query_params)
+        self._query_params.update(params.get(ParamName.QUERY_PARAMS) or {})
+
+    def with_query_params(self, **query_params):
+        """
+        Returns params of another page of the resource.
+
+        :param query_params: query params (e.g., 'offset' and 'limit') that replace the current values
+        :return: new params sharing everything except query params with the current ones
+        :rtype: PageRequestParams
+        """
+        page_params = PageRequestParams.__new__(PageRequestParams)
+        page_params._params = self._params
+        page_params._query_params = dict(self._query_params)
+        page_params._query_params.update(query_params)
+        return page_params
+
+    def __getitem__(self, key):
+        if key == ParamName.QUERY_PARAMS:
+            return self._query_params
+        return self._params[key]
+
+    def __iter__(self):
+        for key in self._params:
+            yield key
+        if ParamName.QUERY_PARAMS not in self._params:
+            yield ParamName.QUERY_PARAMS
+
+    def __len__(self):
+        return len(self._params) + (ParamName.QUERY_PARAMS not in self._params)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+def iterate_over_pageable_resource(resource_func, params, page_size=DEFAULT_PAGE_SIZE, adaptive=False, metrics=None,
+                                   max_concurrent_pages=1):
     """
     A generator function that iterates over a resource that supports pagination and lazily returns present items
-    one by one.
+    one by one. See `iterate_over_pageable_resource_pages` for the description of parameters.
+
+    :return: an iterator containing returned items
+    :rtype: iterator of dict
+    """
+    pages = iterate_over_pageable_resource_pages(resource_func, params, page_size, adaptive, metrics,
+                                                 max_concurrent_pages)
+    for items in pages:
+        for item in items:
+            yield item
+
+
+def iterate_over_pageable_resource_pages(resource_func, params, page_size=DEFAULT_PAGE_SIZE, adaptive=False,
+                                         metrics=None, max_concurrent_pages=1):
+    """
+    A generator function that iterates over a resource that supports pagination and lazily returns lists of items
+    page by page.
+
+    When pages contain the `paging` metadata, the iteration stops as soon as the server reports there are no more
+    pages (see PagingField), otherwise it stops after the first page containing less items than requested.
+
+    In the adaptive mode, the page size is doubled after every full page until it reaches MAX_ADAPTIVE_PAGE_SIZE.
+    When the server rejects the grown page size, the page is requested again with the last accepted size, which is
+    used until the end of the iteration. The adaptive mode is disabled when `limit` is set in the query params.
+
+    When `max_concurrent_pages` is greater than one and the first page reports the total number of items, the
+    remaining pages are requested concurrently with the page size of the first page, while items are still returned
+    in the server order. If a prefetched page does not match the reported total (e.g., objects were added or removed
+    in the meantime), prefetched pages are dropped and the iteration continues serially from that page.
 
     :param resource_func: function that receives `params` argument and returns a page of objects
     :type resource_func: callable
-    :param params: initial dictionary of parameters that will be passed to the resource_func.
+    :param params: initial dictionary of parameters that will be passed to the resource_func as PageRequestParams.
                    Should contain `query_params` inside.
     :type params: dict
-    :return: an iterator containing returned items
-    :rtype: iterator of dict
+    :param page_size: number of items requested per page unless `limit` is set in the query params
+    :type page_size: int
+    :param adaptive: whether the page size should grow toward the largest value accepted by the server
+    :type adaptive: bool
+    :param metrics: optional dict where the number of fetched pages and objects is accumulated (see MetricName)
+    :type metrics: dict
+    :param max_concurrent_pages: maximum number of pages requested at the same time
+    :type max_concurrent_pages: int
+    :return: an iterator containing lists of items of returned pages
+    :rtype: iterator of list
     """
-    # creating a copy not to mutate passed dict
-    params = copy.deepcopy(params)
-    params[ParamName.QUERY_PARAMS].setdefault('limit', DEFAULT_PAGE_SIZE)
-    params[ParamName.QUERY_PARAMS].setdefault('offset', DEFAULT_OFFSET)
+    adaptive = adaptive and 'limit' not in params[ParamName.QUERY_PARAMS]
+    params = PageRequestParams(params, limit=page_size, offset=DEFAULT_OFFSET)
     limit = int(params[ParamName.QUERY_PARAMS]['limit'])
+    max_limit = max(limit, MAX_ADAPTIVE_PAGE_SIZE) if adaptive else limit
+    accepted_limit = None
+    prefetch_enabled = max_concurrent_pages > 1
 
     def received_less_items_than_requested(items_in_response, items_expected):
         if items_in_response == items_expected:
@@ -561,16 +1304,135 @@ def iterate_over_pageable_resource(resource_func, params):
                 items_in_response, items_expected)
         )
 
-    while True:
-        result = resource_func(params=params)
+    def with_query_params(**query_params):
+        return params.with_query_params(**query_params)
 
-        for item in result['items']:
-            yield item
+    def count_page(page):
+        if metrics is not None:
+            metrics[MetricName.PAGES_FETCHED] = metrics.get(MetricName.PAGES_FETCHED, 0) + 1
+            metrics[MetricName.OBJECTS_FETCHED] = metrics.get(MetricName.OBJECTS_FETCHED, 0) + len(page['items'])
 
-        if received_less_items_than_requested(len(result['items']), limit):
+    while True:
+        try:
+            result = resource_func(params=params)
+        except FtdServerError as e:
+            page_size_rejected = e.code in (BAD_REQUEST_STATUS, UNPROCESSABLE_ENTITY_STATUS)
+            if accepted_limit is None or limit == accepted_limit or not page_size_rejected:
+                raise
+            # the server does not accept the grown page size, so the last accepted one is used from now on
+            limit = max_limit = accepted_limit
+            params = with_query_params(limit=limit)
+            continue
+
+        count_page(result)
+        items_count = len(result['items'])
+        yield result['items']
+
+        is_short_page = received_less_items_than_requested(items_count, limit)
+        next_offset = int(params[ParamName.QUERY_PARAMS]['offset']) + items_count
+        has_next_page = _has_next_page(result, next_offset)
+        if has_next_page is not None:
+            # the server tells whether more items follow, so no request is sent past the last page
+            if not has_next_page or items_count == 0:
+                break
+        elif is_short_page and (accepted_limit is None or limit == accepted_limit or items_count < accepted_limit):
             break
 
-        # creating a copy not to mutate existing dict
-        params = copy.deepcopy(params)
-        query_params = params[ParamName.QUERY_PARAMS]
-        query_params['offset'] = int(query_params['offset']) + limit
+        if is_short_page:
+            # a short page followed by more items means that the server caps the page size,
+            # so the received page size is used until the end of the iteration
+            limit = max_limit = accepted_limit = items_count
+            params = with_query_params(offset=next_offset, limit=limit)
+            continue
+
+        total_count = get_total_items_count(result) if prefetch_enabled else None
+        if total_count is not None and next_offset < total_count:
+            # pages are prefetched once, the iteration falls back to the serial mode if the prefetch is interrupted
+            prefetch_enabled = False
+            pages_params = (with_query_params(offset=offset, limit=limit)
+                            for offset in range(next_offset, total_count, limit))
+            pages = _fetch_pages_concurrently(resource_func, pages_params, max_concurrent_pages)
+            try:
+                for page_params, page in pages:
+                    count_page(page)
+                    page_offset = page_params[ParamName.QUERY_PARAMS]['offset']
+                    expected_count = min(limit, total_count - page_offset)
+                    if get_total_items_count(page) != total_count or len(page['items']) != expected_count:
+                        # the list has changed since the first page, so the page is requested again serially
+                        next_offset = page_offset
+                        break
+                    yield page['items']
+                    next_offset = page_offset + expected_count
+                    result = page
+                else:
+                    if not _has_next_page(result, next_offset):
+                        break
+            finally:
+                pages.close()
+
+            accepted_limit = max_limit = limit
+            params = with_query_params(offset=next_offset, limit=limit)
+            continue
+
+        accepted_limit = limit
+        limit = min(limit * 2, max_limit)
+        if limit == accepted_limit:
+            params = with_query_params(offset=next_offset)
+        else:
+            params = with_query_params(offset=next_offset, limit=limit)
+
+
+def _fetch_pages_concurrently(resource_func, pages_params, max_concurrent_pages):
+    """
+    Calls `resource_func` for every item of `pages_params` on a thread pool and yields (params, page) pairs in the
+    order of `pages_params`. At most `max_concurrent_pages` pages are requested or kept in memory at the same time,
+    and pending requests are abandoned when the generator is closed.
+    """
+    pool = ThreadPool(max_concurrent_pages)
+    pending_pages = deque()
+    try:
+        for page_params in islice(pages_params, max_concurrent_pages):
+            pending_pages.append((page_params, pool.apply_async(resource_func, kwds={'params': page_params})))
+
+        while pending_pages:
+            page_params, pending_page = pending_pages.popleft()
+            page = pending_page.get()
+            for next_page_params in islice(pages_params, 1):
+                pending_pages.append(
+                    (next_page_params, pool.apply_async(resource_func, kwds={'params': next_page_params}))
+                )
+            yield page_params, page
+    finally:
+        pool.terminate()
+
+
+def get_total_items_count(page):
+    """
+    Returns the total number of items in the pageable resource reported in the `paging` metadata of the page.
+
+    :param page: a page of objects returned by the server
+    :type page: dict
+    :return: the total number of items or None if the page does not contain valid paging metadata
+    :rtype: int
+    """
+    paging = page.get(PagingField.PAGING)
+    if not isinstance(paging, dict):
+        return None
+    count = paging.get(PagingField.COUNT)
+    if isinstance(count, bool) or not isinstance(count, int) or count < 0:
+        return None
+    return count
+
+
+def _has_next_page(page, next_offset):
+    paging = page.get(PagingField.PAGING)
+    if not isinstance(paging, dict):
+        return None
+    next_pages = paging.get(PagingField.NEXT)
+    if isinstance(next_pages, list):
+        return len(next_pages) > 0
+
+    total_count = get_total_items_count(page)
+    if total_count is None:
+        return None
+    return next_offset < total_count
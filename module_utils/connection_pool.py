@@ -0,0 +1,208 @@
+# Copyright (c) 2020 Cisco and/or its affiliates.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+import errno
+import select
+import socket
+import ssl
+import threading
+from collections import deque
+
+from ansible.module_utils.six.moves import http_client
+from ansible.module_utils.six.moves.urllib.parse import urlparse
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT = 30
+
+# errors of a kept-alive connection that the server has closed in the meantime
+CLOSED_CONNECTION_ERRNOS = (errno.ECONNRESET, errno.ECONNABORTED, errno.EPIPE)
+# requests that can be sent again when the connection is closed before the response is read
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'])
+
+
+class ConnectionPoolStatsField:
+    HITS = 'hits'
+    MISSES = 'misses'
+    DISCARDED = 'discarded'
+    IDLE_CONNECTIONS = 'idle_connections'
+
+
+class ConnectionPoolError(Exception):
+    pass
+
+
+class PooledResponse(object):
+    """
+    Response read completely from a pooled connection. It provides the methods of responses returned by `open_url`
+    used by the connection plugin, so that the connection can be given back to the pool right away.
+    """
+
+    def __init__(self, status, reason, headers, body):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    def getcode(self):
+        return self.status
+
+    def info(self):
+        return self.headers
+
+    def read(self):
+        return self.body
+
+
+class HTTPConnectionPool(object):
+    """
+    Persistent HTTP(S) connections to a single device, so that subsequent requests (e.g., pages of a list) skip
+    the TCP and TLS handshakes.
+
+    A request takes the most recently used idle connection or opens a new one when there are no idle connections,
+    and the connection is given back once the response is read. At most `max_size` idle connections are kept;
+    concurrent requests beyond that open extra connections that are closed afterwards.
+
+    Idle connections closed by the device are detected before they are reused and replaced with new ones. When
+    the device closes a reused connection, the request is sent again over a new connection if it failed while being
+    sent or if it is idempotent. Other requests (e.g., POST requests deploying the configuration) might have been
+    processed by the device, so they are never sent twice.
+    """
+
+    def __init__(self, url, max_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, validate_certs=True):
+        parsed_url = urlparse(url)
+        self._scheme = parsed_url.scheme
+        self._host = parsed_url.hostname
+        self._port = parsed_url.port
+        self._max_size = max_size
+        self._timeout = timeout
+        self._ssl_context = _create_ssl_context(validate_certs) if self._scheme == 'https' else None
+        self._idle_connections = deque()
+        self._lock = threading.Lock()
+        self._stats = {
+            ConnectionPoolStatsField.HITS: 0,
+            ConnectionPoolStatsField.MISSES: 0,
+            ConnectionPoolStatsField.DISCARDED: 0
+        }
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Sends the request over a pooled connection and reads the whole response.
+
+        :param method: HTTP method, in any case (e.g., 'get' as defined by HTTPMethod)
+        :type method: str
+        :param path: path of the URL including the query string
+        :type path: str
+        :param body: request body
+        :type body: bytes
+        :param headers: request headers
+        :type headers: dict
+        :rtype: PooledResponse
+        """
+        # methods are case-sensitive on the wire, so they are sent in upper case just like `open_url` does
+        method = method.upper()
+        while True:
+            conn, reused = self._acquire()
+            sent = False
+            try:
+                conn.request(method, path, body, headers or {})
+                sent = True
+                response = conn.getresponse()
+                response_body = response.read()
+            except (http_client.HTTPException, socket.error) as e:
+                self._discard(conn)
+                if reused and _is_closed_connection_error(e) and (not sent or method in IDEMPOTENT_METHODS):
+                    continue
+                raise ConnectionPoolError(e)
+
+            if response.will_close:
+                self._discard(conn)
+            else:
+                self._release(conn)
+            return PooledResponse(response.status, response.reason, response.msg, response_body)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats[ConnectionPoolStatsField.IDLE_CONNECTIONS] = len(self._idle_connections)
+            return stats
+
+    def close(self):
+        """
+        Closes idle connections. Connections in use are closed when they are given back.
+        """
+        with self._lock:
+            connections = list(self._idle_connections)
+            self._idle_connections.clear()
+            self._max_size = 0
+        for conn in connections:
+            conn.close()
+
+    def _acquire(self):
+        with self._lock:
+            while self._idle_connections:
+                conn = self._idle_connections.pop()
+                if _is_connection_alive(conn):
+                    self._stats[ConnectionPoolStatsField.HITS] += 1
+                    return conn, True
+                conn.close()
+                self._stats[ConnectionPoolStatsField.DISCARDED] += 1
+            self._stats[ConnectionPoolStatsField.MISSES] += 1
+        return self._create_connection(), False
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._idle_connections) < self._max_size:
+                self._idle_connections.append(conn)
+                return
+        conn.close()
+
+    def _discard(self, conn):
+        conn.close()
+        with self._lock:
+            self._stats[ConnectionPoolStatsField.DISCARDED] += 1
+
+    def _create_connection(self):
+        if self._ssl_context is not None:
+            return http_client.HTTPSConnection(self._host, self._port, timeout=self._timeout,
+                                               context=self._ssl_context)
+        return http_client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+
+
+def _create_ssl_context(validate_certs):
+    context = ssl.create_default_context()
+    if not validate_certs:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def _is_connection_alive(conn):
+    if conn.sock is None:
+        return False
+    try:
+        readable, dummy, dummy = select.select([conn.sock], [], [], 0)
+    except (ValueError, select.error, socket.error):
+        return False
+    # nothing is expected from an idle connection, so it becomes readable only when the device closes it
+    return not readable
+
+
+def _is_closed_connection_error(error):
+    # RemoteDisconnected raised on Python 3 when the device closes the connection without a response is BadStatusLine
+    if isinstance(error, http_client.BadStatusLine):
+        return True
+    return isinstance(error, socket.error) and getattr(error, 'errno', None) in CLOSED_CONNECTION_ERRNOS
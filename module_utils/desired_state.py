@@ -0,0 +1,464 @@
+# Copyright (c) 2020 Cisco and/or its affiliates.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+from multiprocessing.pool import ThreadPool
+
+from ansible.module_utils.six import iteritems, string_types
+
+try:
+    from ansible.module_utils.common import copy_identity_properties, FtdConfigurationError, FtdServerError, \
+        FtdUnexpectedResponse
+    from ansible.module_utils.configuration import ParamName, MULTIPLE_DUPLICATES_FOUND_ERROR, \
+        DEFAULT_MAX_CONCURRENT_REQUESTS, NAME_FILTER_KEY, format_request_error
+    from ansible.module_utils.fdm_swagger_client import OperationRole, OperationField, ValidationError
+except ImportError:
+    from module_utils.common import copy_identity_properties, FtdConfigurationError, FtdServerError, \
+        FtdUnexpectedResponse
+    from module_utils.configuration import ParamName, MULTIPLE_DUPLICATES_FOUND_ERROR, \
+        DEFAULT_MAX_CONCURRENT_REQUESTS, NAME_FILTER_KEY, format_request_error
+    from module_utils.fdm_swagger_client import OperationRole, OperationField, ValidationError
+
+
+class PlanAction:
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+
+
+class PlanStepField:
+    ACTION = 'action'
+    MODEL = 'model'
+    NAME = 'name'
+    OBJECT = 'object'
+    DIFF = 'diff'
+    ERROR = 'error'
+
+
+class DesiredStateField:
+    OBJECTS = 'objects'
+    PATH_PARAMS = 'path_params'
+
+
+class DesiredStateResultField:
+    CHANGED = 'changed'
+    PLAN = 'plan'
+    SUMMARY = 'summary'
+
+
+class _PlanStep(object):
+
+    def __init__(self, action, model_name, op_name, data, path_params, existing_object=None, diff=None):
+        self.action = action
+        self.model_name = model_name
+        self.op_name = op_name
+        self.data = data
+        self.path_params = path_params
+        self.existing_object = existing_object
+        self.diff = diff
+        self.result = None
+        self.error = None
+        self.dependencies = set()
+
+    @property
+    def name(self):
+        return (self.data or self.existing_object).get('name')
+
+    def to_report(self):
+        report = {
+            PlanStepField.ACTION: self.action,
+            PlanStepField.MODEL: self.model_name,
+            PlanStepField.NAME: self.name,
+            PlanStepField.OBJECT: self.result if self.result is not None else self.existing_object
+        }
+        if self.diff is not None:
+            report[PlanStepField.DIFF] = self.diff
+        if self.error is not None:
+            report[PlanStepField.ERROR] = self.error
+        return report
+
+
+class Plan(object):
+    """
+    Writes needed to bring the device to the desired state, grouped into waves. Steps of a wave depend only on steps
+    of previous waves, so they can be executed in parallel.
+    """
+
+    def __init__(self, waves, unchanged_count):
+        self.waves = waves
+        self.unchanged_count = unchanged_count
+
+    @property
+    def steps(self):
+        return [step for wave in self.waves for step in wave]
+
+    def to_report(self):
+        return [step.to_report() for step in self.steps]
+
+    def get_summary(self):
+        summary = {PlanAction.CREATE: 0, PlanAction.UPDATE: 0, PlanAction.DELETE: 0, 'unchanged': self.unchanged_count}
+        for step in self.steps:
+            summary[step.action] += 1
+        return summary
+
+
+class DesiredStateResource(object):
+    """
+    Brings objects of multiple models to the state described by a single document.
+
+    The document maps model names to lists of objects, or to dicts with `objects` and `path_params` for models whose
+    list depends on path params (e.g., access rules of a policy). Objects refer to each other by reference dicts
+    containing `type` and `name` only; such references are resolved to ids of existing objects, or of objects created
+    while applying the plan, so that referenced objects are written before the objects referring to them. Objects of
+    models missing in the document are looked up on the device by their name, unless their list depends on path
+    params.
+    """
+
+    def __init__(self, resource, max_concurrent_requests=None):
+        self._resource = resource
+        self._max_concurrent_requests = max_concurrent_requests or DEFAULT_MAX_CONCURRENT_REQUESTS
+        self._known_objects = {}
+
+    def run(self, state, prune=False, check_mode=False):
+        """
+        Plans the writes needed to reach the state and applies them unless in check mode.
+
+        :return: the report on planned or executed steps in `plan`, whether any write succeeded in `changed`,
+            and the number of planned objects per action in `summary`
+        :rtype: dict
+        """
+        plan = self.plan(state, prune)
+        report = plan.to_report() if check_mode else self.apply(plan)
+        return {
+            DesiredStateResultField.CHANGED: any(PlanStepField.ERROR not in step for step in report),
+            DesiredStateResultField.PLAN: report,
+            DesiredStateResultField.SUMMARY: plan.get_summary()
+        }
+
+    def plan(self, state, prune=False):
+        """
+        Fetches current objects of all models in `state` concurrently and computes writes needed to reach the state.
+
+        :param state: desired-state document
+        :type state: dict
+        :param prune: whether objects of the given models that are not in the document are deleted
+        :type prune: bool
+        :rtype: Plan
+        """
+        entries = [self._normalize_entry(model_name, value) for model_name, value in sorted(iteritems(state))]
+        current_objects = self._map(self._fetch_current_objects, entries)
+
+        self._known_objects = {}
+        for (model_name, path_params, _, _), objects in zip(entries, current_objects):
+            for obj in objects:
+                self._known_objects.setdefault(_get_ref_key(obj), []).append(obj)
+        self._add_referenced_objects(entries)
+
+        steps_by_key = {}
+        write_steps = []
+        unchanged_count = 0
+        for (model_name, path_params, desired_objects, model_roles), objects in zip(entries, current_objects):
+            existing_by_name = _group_by_name(objects)
+            for desired_obj in desired_objects:
+                existing_objs = existing_by_name.get(desired_obj['name'], [])
+                if len(existing_objs) > 1:
+                    raise FtdConfigurationError(MULTIPLE_DUPLICATES_FOUND_ERROR, desired_obj)
+                existing_obj = existing_objs[0] if existing_objs else None
+
+                resolved_obj, all_resolved = self._resolve_refs(desired_obj, self._known_objects)
+                if existing_obj is None:
+                    op_name = _get_op_name(model_roles, OperationRole.ADD, model_name, PlanAction.CREATE)
+                    step = _PlanStep(PlanAction.CREATE, model_name, op_name, desired_obj, path_params)
+                else:
+                    # references to objects created by the plan are not resolved yet, so they always differ
+                    diff = self._resource.diff_with_existing_object(model_name, existing_obj, resolved_obj)
+                    if all_resolved and not diff:
+                        unchanged_count += 1
+                        continue
+                    op_name = _get_op_name(model_roles, OperationRole.EDIT, model_name, PlanAction.UPDATE)
+                    step = _PlanStep(PlanAction.UPDATE, model_name, op_name, desired_obj, path_params, existing_obj,
+                                     diff)
+                write_steps.append(step)
+                if desired_obj.get('type'):
+                    steps_by_key[_get_ref_key(desired_obj)] = step
+
+        for step in write_steps:
+            for ref_key in _find_ref_keys(step.data):
+                if ref_key in steps_by_key:
+                    if steps_by_key[ref_key] is not step:
+                        step.dependencies.add(steps_by_key[ref_key])
+                elif ref_key not in self._known_objects:
+                    raise FtdConfigurationError('Cannot resolve the reference to %s "%s"' % ref_key, step.data)
+                elif len(self._known_objects[ref_key]) > 1:
+                    raise FtdConfigurationError(MULTIPLE_DUPLICATES_FOUND_ERROR, step.data)
+
+        delete_steps = self._plan_deletes(entries, current_objects, write_steps) if prune else []
+        return Plan(_split_into_waves(write_steps + delete_steps), unchanged_count)
+
+    def apply(self, plan):
+        """
+        Executes steps of the plan wave by wave, sending requests of a wave concurrently. Fails before sending any
+        write if the plan is not expected to be applied within the command timeout of the persistent connection.
+
+        Every step of a wave records its own outcome, so a failed write does not abandon the other writes of its
+        wave. Later waves depend on the earlier ones, so they are not executed after a failure.
+
+        :type plan: Plan
+        :return: reports on executed steps; failed steps contain the `error` (see `get_failed_plan_steps`)
+        :rtype: list
+        """
+        workers = self._max_concurrent_requests
+        self._resource.check_expected_run_time(sum((len(wave) + workers - 1) // workers for wave in plan.waves))
+        executed_steps = []
+        for wave in plan.waves:
+            self._execute_wave(wave)
+            executed_steps.extend(wave)
+            if any(step.error is not None for step in wave):
+                break
+        return [step.to_report() for step in executed_steps]
+
+    def _normalize_entry(self, model_name, value):
+        if isinstance(value, dict):
+            objects = value.get(DesiredStateField.OBJECTS) or []
+            path_params = value.get(DesiredStateField.PATH_PARAMS) or {}
+        else:
+            objects, path_params = value or [], {}
+        if not isinstance(objects, list):
+            raise FtdConfigurationError('Objects of %s model must be given as a list' % model_name)
+
+        names = set()
+        for obj in objects:
+            if not isinstance(obj, dict) or not isinstance(obj.get('name'), string_types):
+                raise FtdConfigurationError('Every object of %s model must be a dictionary with the object name, '
+                                            'got %s' % (model_name, obj))
+            if obj['name'] in names:
+                raise FtdConfigurationError('Multiple objects of %s model have the same name: %s'
+                                            % (model_name, obj['name']))
+            names.add(obj['name'])
+
+        model_roles = self._resource.get_model_roles(model_name)
+        if not any(model_roles[role] for role in (OperationRole.ADD, OperationRole.EDIT, OperationRole.GET_LIST,
+                                                  OperationRole.DELETE)):
+            raise FtdConfigurationError('Model %s is not supported by the device' % model_name)
+        return model_name, path_params, objects, model_roles
+
+    def _fetch_current_objects(self, entry):
+        model_name, path_params, _, model_roles = entry
+        get_list_op_name = _get_op_name(model_roles, OperationRole.GET_LIST, model_name, 'list')
+        return list(self._resource.get_objects_by_filter(get_list_op_name, {ParamName.PATH_PARAMS: path_params}))
+
+    def _add_referenced_objects(self, entries):
+        """
+        Looks up objects that are referred to by desired objects, but belong to models missing in the document
+        (e.g., system-defined networks referred to by groups), and adds them to known objects.
+        """
+        desired_keys = set()
+        ref_keys = set()
+        for _, _, desired_objects, _ in entries:
+            for obj in desired_objects:
+                desired_keys.add(_get_ref_key(obj))
+                ref_keys.update(_find_ref_keys(obj))
+        missing_keys = sorted(k for k in ref_keys if k not in desired_keys and k not in self._known_objects)
+
+        for ref_key, objects in zip(missing_keys, self._map(self._fetch_referenced_objects, missing_keys)):
+            if objects:
+                self._known_objects[ref_key] = objects
+
+    def _fetch_referenced_objects(self, ref_key):
+        ref_type, name = ref_key
+        model_name = self._resource.get_model_name_by_type(ref_type)
+        if model_name is None:
+            return []
+        get_list_op_name = self._resource.get_model_roles(model_name)[OperationRole.GET_LIST]
+        # lists depending on path params (e.g., access rules of a policy) cannot be fetched without them
+        if get_list_op_name is None or '{' in self._resource.get_operation_spec(get_list_op_name)[OperationField.URL]:
+            return []
+        objects = self._resource.get_objects_by_filter(get_list_op_name, {ParamName.FILTERS: {NAME_FILTER_KEY: name}})
+        return [obj for obj in objects if obj.get('type') == ref_type]
+
+    def _plan_deletes(self, entries, current_objects, write_steps):
+        desired_keys = set()
+        for model_name, path_params, desired_objects, _ in entries:
+            desired_keys.update((model_name, obj['name']) for obj in desired_objects)
+
+        steps_by_id = {}
+        for (model_name, path_params, _, model_roles), objects in zip(entries, current_objects):
+            for obj in objects:
+                if (model_name, obj.get('name')) in desired_keys or obj.get('isSystemDefined'):
+                    continue
+                delete_op_name = _get_op_name(model_roles, OperationRole.DELETE, model_name, PlanAction.DELETE)
+                steps_by_id[obj['id']] = _PlanStep(PlanAction.DELETE, model_name, delete_op_name, None,
+                                                   dict(path_params, objId=obj['id']), obj)
+
+        for step in steps_by_id.values():
+            # desired objects might stop referring to deleted ones, and deleted objects referring to each other
+            # are deleted starting from the referring ones
+            step.dependencies.update(write_steps)
+            for ref_id in _find_ref_ids(step.existing_object):
+                if ref_id in steps_by_id and steps_by_id[ref_id] is not step:
+                    steps_by_id[ref_id].dependencies.add(step)
+        return sorted(steps_by_id.values(), key=lambda s: (s.model_name, s.name or ''))
+
+    def _execute_step(self, step):
+        params = {ParamName.PATH_PARAMS: dict(step.path_params)}
+        if step.action != PlanAction.DELETE:
+            data, _ = self._resolve_refs(step.data, self._known_objects)
+            if step.action == PlanAction.UPDATE:
+                copy_identity_properties(step.existing_object, data)
+                params[ParamName.PATH_PARAMS]['objId'] = step.existing_object['id']
+            params[ParamName.DATA] = data
+
+        try:
+            step.result = self._resource.send_general_request(step.op_name, params)
+        except (FtdServerError, FtdUnexpectedResponse, FtdConfigurationError, ValidationError) as e:
+            step.error = format_request_error(e)
+            return
+        if step.action != PlanAction.DELETE and step.data.get('type'):
+            self._known_objects[_get_ref_key(step.data)] = [step.result]
+
+    @staticmethod
+    def _resolve_refs(obj, known_objects):
+        """
+        Returns a copy of `obj` where references without ids are completed with ids of known objects, and whether all
+        references were resolved.
+        """
+        all_resolved = [True]
+
+        def resolve(value, is_root=False):
+            if isinstance(value, dict):
+                if not is_root and _is_unresolved_ref(value):
+                    targets = known_objects.get(_get_ref_key(value))
+                    if targets and len(targets) == 1 and targets[0].get('id'):
+                        return dict(value, id=targets[0]['id'])
+                    all_resolved[0] = False
+                    return dict(value)
+                return dict((k, resolve(v)) for k, v in iteritems(value))
+            elif isinstance(value, list):
+                return [resolve(v) for v in value]
+            return value
+
+        return resolve(obj, is_root=True), all_resolved[0]
+
+    def _execute_wave(self, wave):
+        if len(wave) < 2 or self._max_concurrent_requests == 1:
+            for step in wave:
+                self._execute_step(step)
+            return
+        pool = ThreadPool(min(self._max_concurrent_requests, len(wave)))
+        try:
+            for _ in pool.imap_unordered(self._execute_step, wave):
+                pass
+        finally:
+            pool.terminate()
+
+    def _map(self, func, items):
+        if len(items) < 2 or self._max_concurrent_requests == 1:
+            return [func(item) for item in items]
+        pool = ThreadPool(min(self._max_concurrent_requests, len(items)))
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.terminate()
+
+
+def get_failed_plan_steps(report):
+    """
+    Returns descriptions of steps whose writes failed while applying the plan (see `DesiredStateResource.apply`).
+
+    :param report: the report on executed steps
+    :type report: list
+    :rtype: list
+    """
+    return ['%s "%s" (%s)' % (step[PlanStepField.MODEL], step[PlanStepField.NAME], step[PlanStepField.ERROR])
+            for step in report if PlanStepField.ERROR in step]
+
+
+def _get_op_name(model_roles, role, model_name, action):
+    op_name = model_roles[role]
+    if op_name is None:
+        raise FtdConfigurationError('Cannot %s objects of %s model: the operation is not supported' %
+                                    (action, model_name))
+    return op_name
+
+
+def _group_by_name(objects):
+    objects_by_name = {}
+    for obj in objects:
+        objects_by_name.setdefault(obj.get('name'), []).append(obj)
+    return objects_by_name
+
+
+def _get_ref_key(obj):
+    return obj.get('type'), obj.get('name')
+
+
+def _is_unresolved_ref(value):
+    return not value.get('id') and isinstance(value.get('type'), string_types) \
+        and isinstance(value.get('name'), string_types)
+
+
+def _find_ref_keys(obj):
+    keys = set()
+
+    def find(value, is_root=False):
+        if isinstance(value, dict):
+            if not is_root and _is_unresolved_ref(value):
+                keys.add(_get_ref_key(value))
+                return
+            for v in value.values():
+                find(v)
+        elif isinstance(value, list):
+            for v in value:
+                find(v)
+
+    find(obj, is_root=True)
+    return keys
+
+
+def _find_ref_ids(obj):
+    ids = set()
+
+    def find(value, is_root=False):
+        if isinstance(value, dict):
+            if not is_root and value.get('id') and value.get('type'):
+                ids.add(value['id'])
+            for v in value.values():
+                find(v)
+        elif isinstance(value, list):
+            for v in value:
+                find(v)
+
+    find(obj, is_root=True)
+    return ids
+
+
+def _split_into_waves(steps):
+    """
+    Orders steps topologically by their dependencies, so that every step is placed in the wave following the latest
+    wave of its dependencies.
+    """
+    waves = []
+    remaining_steps = list(steps)
+    done_steps = set()
+    while remaining_steps:
+        wave = [s for s in remaining_steps if s.dependencies <= done_steps]
+        if not wave:
+            raise FtdConfigurationError('Objects refer to each other in a cycle: %s' %
+                                        ', '.join(sorted('%s %s' % (s.model_name, s.name) for s in remaining_steps)))
+        waves.append(wave)
+        done_steps.update(wave)
+        remaining_steps = [s for s in remaining_steps if s not in done_steps]
+    return waves
@@ -15,13 +15,20 @@
 # You should have received a copy of the GNU General Public License
 # along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
 #
+import codecs
+import json
+import re
 
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.common._collections_compat import Mapping
 from ansible.module_utils.network.ftd.common import HTTPMethod
-from ansible.module_utils.six import integer_types, string_types, iteritems
+from ansible.module_utils.six import binary_type, integer_types, string_types, iteritems
 
 FILE_MODEL_NAME = '_File'
+REFERENCE_MODEL_NAME = 'ReferenceModel'
 SUCCESS_RESPONSE_CODE = '200'
 DELETE_PREFIX = 'delete'
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
 class OperationField:
@@ -39,6 +46,16 @@ class SpecProp:
     OPERATIONS = 'operations'
     MODELS = 'models'
     MODEL_OPERATIONS = 'model_operations'
+    MODEL_ROLES = 'model_roles'
+
+
+class OperationRole:
+    ADD = 'add'
+    EDIT = 'edit'
+    GET = 'get'
+    GET_LIST = 'getList'
+    DELETE = 'delete'
+    UPSERT = 'upsert'
 
 
 class PropName:
@@ -57,6 +74,9 @@ class PropName:
     RESPONSES = 'responses'
     NAME = 'name'
     DESCRIPTION = 'description'
+    EXAMPLE = 'example'
+    ADDITIONAL_PROPERTIES = 'additionalProperties'
+    DEFAULT = 'default'
 
 
 class PropType:
@@ -82,6 +102,185 @@ class PathParams:
     OBJ_ID = 'objId'
 
 
+# the description of the `filter` query param lists keys accepted by the list operation, e.g.,
+# 'Supported keys are: "name", "hardwareName", "fts".'
+SUPPORTED_FILTER_KEYS_REGEX = re.compile(
+    r'[Ss]upported (?:filter )?keys(?: are)?\s*:?\s*((?:"[^"]+"(?:\s*,\s*|\s+and\s+)?)+)'
+)
+QUOTED_FILTER_KEY_REGEX = re.compile(r'"([^"]+)"')
+# a pseudo key for the full-text search, which is used for name filters on newer builds
+FULL_TEXT_SEARCH_FILTER_KEY = 'fts'
+# model properties that are never worth filtering on the server: the type is the same for all listed objects and
+# the version changes with every edit
+NON_FILTERABLE_PROPERTIES = frozenset([PropName.TYPE, 'version'])
+
+
+def get_model_operations(operations):
+    """
+    Groups operations by the name of the model they work with.
+
+    :param operations: operations from the 'operations' section of the parsed specification
+    :type operations: dict
+    :return: a dict in the format of the 'model_operations' section of the parsed specification
+    :rtype: dict
+    """
+    model_operations = {}
+    for operations_name, params in iteritems(operations):
+        model_name = params[OperationField.MODEL_NAME]
+        model_operations.setdefault(model_name, {})[operations_name] = params
+    return model_operations
+
+
+def get_model_roles(model_operations):
+    """
+    Indexes operations of every model by their roles, see `get_operation_roles`.
+
+    :param model_operations: the 'model_operations' section of the parsed specification
+    :type model_operations: dict
+    :return: a dict in the format of the 'model_roles' section of the parsed specification
+    :rtype: dict
+    """
+    return dict((model_name, get_operation_roles(operations)) for model_name, operations in iteritems(model_operations))
+
+
+def get_operation_roles(operations):
+    """
+    Finds operations playing CRUD roles among operations of a single model. Some endpoints have non-CRUD operations,
+    so both operation names and HTTP methods are checked, the same way as OperationChecker does.
+
+    :param operations: operations of the model
+    :type operations: dict
+    :return: names of the first 'add', 'edit', 'get', 'getList' and 'delete' operations (None if the model has no
+        such operation) and whether the model supports upsert operations, i.e., has both 'edit' and 'getList' ones
+    :rtype: dict
+    """
+    roles = dict.fromkeys((OperationRole.ADD, OperationRole.EDIT, OperationRole.GET, OperationRole.GET_LIST,
+                           OperationRole.DELETE))
+    for op_name, op_spec in iteritems(operations):
+        role = _get_operation_role(op_name, op_spec)
+        if role is not None and roles[role] is None:
+            roles[role] = op_name
+    roles[OperationRole.UPSERT] = roles[OperationRole.EDIT] is not None and roles[OperationRole.GET_LIST] is not None
+    return roles
+
+
+def get_server_filter_keys(operation, model=None):
+    """
+    Finds keys the list operation accepts in the `filter` query param. The keys are listed in the description of
+    the param when the spec is parsed together with the docs. Specs served by devices do not describe the param, so
+    scalar top-level properties of the listed `model` are used instead, as FDM filters objects by their fields.
+    The latter is a best guess only, so the server might still reject some of the keys.
+
+    :param operation: specification of the operation
+    :type operation: dict
+    :param model: specification of the model returned by the operation
+    :type model: dict
+    :return: the supported keys, or None if the operation has no `filter` query param or the keys are unknown
+    :rtype: frozenset
+    """
+    query_params = (operation.get(OperationField.PARAMETERS) or {}).get(OperationParams.QUERY) or {}
+    if QueryParams.FILTER not in query_params:
+        return None
+
+    filter_param = query_params[QueryParams.FILTER] or {}
+    match = SUPPORTED_FILTER_KEYS_REGEX.search(filter_param.get(OperationField.DESCRIPTION) or '')
+    if match is not None:
+        return frozenset(k for k in QUOTED_FILTER_KEY_REGEX.findall(match.group(1))
+                         if k != FULL_TEXT_SEARCH_FILTER_KEY)
+
+    properties = (model or {}).get(PropName.PROPERTIES)
+    if not properties:
+        return None
+    return frozenset(name for name, prop in iteritems(properties) if _is_filterable_property(name, prop))
+
+
+def _is_filterable_property(name, prop):
+    if name in NON_FILTERABLE_PROPERTIES or PropName.REF in prop:
+        return False
+    return prop.get(PropName.TYPE) in (PropType.STRING, PropType.INTEGER)
+
+
+def _get_operation_role(op_name, op_spec):
+    method = op_spec[OperationField.METHOD]
+    if method == HTTPMethod.GET:
+        return OperationRole.GET_LIST if op_spec[OperationField.RETURN_MULTIPLE_ITEMS] else OperationRole.GET
+    elif method == HTTPMethod.POST and op_name.startswith(OperationRole.ADD):
+        return OperationRole.ADD
+    elif method == HTTPMethod.PUT and op_name.startswith(OperationRole.EDIT):
+        return OperationRole.EDIT
+    elif method == HTTPMethod.DELETE and op_name.startswith(OperationRole.DELETE):
+        return OperationRole.DELETE
+    return None
+
+
+class ComparisonSchema(object):
+    """
+    Describes model fields that need special treatment when objects are compared (see `equal_objects`):
+        - `unordered_fields` - arrays of references, which are sets of objects, so the order of items is ignored;
+        - `defaults` - default values of fields, which the server fills when fields are not given;
+        - `nested` - schemas of nested objects and array items by field names.
+    """
+
+    def __init__(self):
+        self.unordered_fields = set()
+        self.defaults = {}
+        self.nested = {}
+
+
+def get_comparison_schema(model_name, get_model_spec, schemas=None):
+    """
+    Builds the comparison schema of the model from its specification and specifications of nested models.
+
+    :param model_name: name of the model
+    :type model_name: str
+    :param get_model_spec: function returning the specification of a model by its name
+    :type get_model_spec: callable
+    :param schemas: already built schemas by model names, updated with the schemas built by the call
+    :type schemas: dict
+    :return: the comparison schema, or None if the model is not in the specification
+    :rtype: ComparisonSchema
+    """
+    schemas = {} if schemas is None else schemas
+    if model_name in schemas:
+        return schemas[model_name]
+
+    model_spec = get_model_spec(model_name)
+    if not model_spec:
+        schemas[model_name] = None
+        return None
+
+    # the schema is registered before nested models are processed, as models may refer to themselves
+    schema = schemas[model_name] = ComparisonSchema()
+    for base_spec in model_spec.get(PropName.ALL_OF) or []:
+        base_schema = get_comparison_schema(_get_model_name_from_url(base_spec[PropName.REF]), get_model_spec,
+                                            schemas) if PropName.REF in base_spec else None
+        if base_schema is not None:
+            schema.unordered_fields.update(base_schema.unordered_fields)
+            schema.defaults.update(base_schema.defaults)
+            schema.nested.update(base_schema.nested)
+        _add_properties_to_comparison_schema(schema, base_spec.get(PropName.PROPERTIES), get_model_spec, schemas)
+    _add_properties_to_comparison_schema(schema, model_spec.get(PropName.PROPERTIES), get_model_spec, schemas)
+    return schema
+
+
+def _add_properties_to_comparison_schema(schema, properties, get_model_spec, schemas):
+    for prop_name, prop_spec in iteritems(properties or {}):
+        if PropName.DEFAULT in prop_spec:
+            schema.defaults[prop_name] = prop_spec[PropName.DEFAULT]
+
+        if prop_spec.get(PropName.TYPE) == PropType.ARRAY:
+            prop_spec = prop_spec.get(PropName.ITEMS) or {}
+            if _get_model_name_from_url(prop_spec.get(PropName.REF, '')) == REFERENCE_MODEL_NAME:
+                schema.unordered_fields.add(prop_name)
+                continue
+
+        if PropName.REF in prop_spec:
+            nested_schema = get_comparison_schema(_get_model_name_from_url(prop_spec[PropName.REF]), get_model_spec,
+                                                  schemas)
+            if nested_schema is not None:
+                schema.nested[prop_name] = nested_schema
+
+
 def _get_model_name_from_url(schema_ref):
     path = schema_ref.split('/')
     return path[len(path) - 1]
@@ -160,6 +359,17 @@ class FdmSwaggerParser:
                         ...
                     },
                     ...
+                },
+                'model_roles':{
+                    'model_name':{ # names of operations playing CRUD roles for the current model
+                        'add': 'addNetworkObject', # None if the model does not have such an operation
+                        'edit': 'editNetworkObject',
+                        'get': 'getNetworkObject',
+                        'getList': 'getNetworkObjectList',
+                        'delete': 'deleteNetworkObject',
+                        'upsert': True # whether upsert operations are supported for the current model
+                    },
+                    ...
                 }
             }
         """
@@ -171,42 +381,101 @@ class FdmSwaggerParser:
             operations = self._enrich_operations_with_docs(operations, docs)
             self._definitions = self._enrich_definitions_with_docs(self._definitions, docs)
 
+        model_operations = self._get_model_operations(operations)
+        return {
+            SpecProp.MODELS: self._definitions,
+            SpecProp.OPERATIONS: operations,
+            SpecProp.MODEL_OPERATIONS: model_operations,
+            SpecProp.MODEL_ROLES: get_model_roles(model_operations)
+        }
+
+    def parse_spec_stream(self, stream, docs=None):
+        """
+        Does the same as `parse_spec`, but reads the API specification from a file-like object incrementally.
+        Models and path items are decoded one by one, and every path item is discarded as soon as its operations
+        are built, so the raw specification and its fully decoded form are never kept in memory at the same time.
+
+        :param stream: A file-like object containing an API specification in the swagger format
+        :param docs: A documentation map containing descriptions for models, operations and operation parameters.
+        :type docs: dict
+        :rtype: dict
+        :return: the same data as `parse_spec`
+        :raises ValueError if the stream does not contain a valid JSON object
+        """
+        reader = _JsonStreamReader(stream)
+        self._definitions = {}
+        self._base_path = None
+        has_definitions = False
+        operations = {}
+        # path items are resolved against model definitions and the base path, so the items that precede them
+        # in the stream are kept as compact JSON until both are read
+        pending_path_items = []
+
+        for key in reader.iter_object_keys():
+            if key == SpecProp.DEFINITIONS:
+                for model_name in reader.iter_object_keys():
+                    self._definitions[model_name] = reader.read_value()
+                has_definitions = True
+            elif key == PropName.BASE_PATH:
+                self._base_path = reader.read_value()
+            elif key == PropName.PATHS:
+                for url in reader.iter_object_keys():
+                    if has_definitions and self._base_path is not None:
+                        self._add_path_operations(operations, url, reader.read_value())
+                    else:
+                        pending_path_items.append((url, json.dumps(reader.read_value(), separators=(',', ':'))))
+            else:
+                reader.skip_value()
+
+        if not has_definitions:
+            raise KeyError(SpecProp.DEFINITIONS)
+        if self._base_path is None:
+            raise KeyError(PropName.BASE_PATH)
+        for url, path_item in pending_path_items:
+            self._add_path_operations(operations, url, json.loads(path_item))
+
+        if docs:
+            operations = self._enrich_operations_with_docs(operations, docs)
+            self._definitions = self._enrich_definitions_with_docs(self._definitions, docs)
+
+        model_operations = self._get_model_operations(operations)
         return {
             SpecProp.MODELS: self._definitions,
             SpecProp.OPERATIONS: operations,
-            SpecProp.MODEL_OPERATIONS: self._get_model_operations(operations)
+            SpecProp.MODEL_OPERATIONS: model_operations,
+            SpecProp.MODEL_ROLES: get_model_roles(model_operations)
         }
 
     @property
     def base_path(self):
         return self._base_path
 
-    def _get_model_operations(self, operations):
-        model_operations = {}
-        for operations_name, params in iteritems(operations):
-            model_name = params[OperationField.MODEL_NAME]
-            model_operations.setdefault(model_name, {})[operations_name] = params
-        return model_operations
+    @staticmethod
+    def _get_model_operations(operations):
+        return get_model_operations(operations)
 
     def _get_operations(self, spec):
         paths_dict = spec[PropName.PATHS]
         operations_dict = {}
         for url, operation_params in iteritems(paths_dict):
-            for method, params in iteritems(operation_params):
-                operation = {
-                    OperationField.METHOD: method,
-                    OperationField.URL: self._base_path + url,
-                    OperationField.MODEL_NAME: self._get_model_name(method, params),
-                    OperationField.RETURN_MULTIPLE_ITEMS: self._return_multiple_items(params),
-                    OperationField.TAGS: params.get(OperationField.TAGS, [])
-                }
-                if OperationField.PARAMETERS in params:
-                    operation[OperationField.PARAMETERS] = self._get_rest_params(params[OperationField.PARAMETERS])
-
-                operation_id = params[PropName.OPERATION_ID]
-                operations_dict[operation_id] = operation
+            self._add_path_operations(operations_dict, url, operation_params)
         return operations_dict
 
+    def _add_path_operations(self, operations_dict, url, operation_params):
+        for method, params in iteritems(operation_params):
+            operation = {
+                OperationField.METHOD: method,
+                OperationField.URL: self._base_path + url,
+                OperationField.MODEL_NAME: self._get_model_name(method, params),
+                OperationField.RETURN_MULTIPLE_ITEMS: self._return_multiple_items(params),
+                OperationField.TAGS: params.get(OperationField.TAGS, [])
+            }
+            if OperationField.PARAMETERS in params:
+                operation[OperationField.PARAMETERS] = self._get_rest_params(params[OperationField.PARAMETERS])
+
+            operation_id = params[PropName.OPERATION_ID]
+            operations_dict[operation_id] = operation
+
     def _enrich_operations_with_docs(self, operations, docs):
         def get_operation_docs(op):
             op_url = op[OperationField.URL][len(self._base_path):]
@@ -331,14 +600,319 @@ class FdmSwaggerParser:
             return model_name
 
 
+class _JsonStreamReader(object):
+    """
+    Reads a JSON document from a file-like object piece by piece, so only a small part of the document is buffered
+    at any time. Objects and arrays can be iterated member by member, or decoded as a whole with `read_value`.
+    """
+
+    WHITESPACE = re.compile(r'\s*')
+    NUMBER_START_SYMBOLS = frozenset('-0123456789')
+    NUMBER_CONTINUATION_SYMBOLS = frozenset('.eE+-0123456789')
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._chunk_size = STREAM_CHUNK_SIZE
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        # decoding is split into many calls, so keys are shared between them explicitly (like `json.loads` does
+        # within a single call) to avoid storing a separate copy of the same key in every decoded object
+        self._keys = {}
+        self._json_decoder = json.JSONDecoder(object_pairs_hook=self._create_object)
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def iter_object_keys(self):
+        """
+        Iterates over keys of the object starting at the current position. The value of every key must be consumed
+        (e.g., with `read_value` or `skip_value`) before the next key is requested.
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, string_types):
+                raise ValueError('Object key expected at position %s' % self._pos)
+            self._expect(':')
+            yield self._keys.setdefault(key, key)
+            separator = self._peek()
+            self._pos += 1
+            if separator == '}':
+                return
+            elif separator != ',':
+                raise ValueError("Expected ',' or '}' but got %r" % separator)
+
+    def iter_array_items(self):
+        """
+        Iterates over items of the array starting at the current position.
+        """
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self.read_value()
+            separator = self._peek()
+            self._pos += 1
+            if separator == ']':
+                return
+            elif separator != ',':
+                raise ValueError("Expected ',' or ']' but got %r" % separator)
+
+    def read_value(self):
+        """
+        Decodes the value starting at the current position. Values that fit into the buffer are decoded at once,
+        larger objects and arrays are decoded member by member, so the buffer never holds a whole large value.
+        """
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+                if self._eof or not self._may_continue(end):
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise
+
+            symbol = self._buffer[self._pos]
+            if symbol == '{':
+                return dict((key, self.read_value()) for key in self.iter_object_keys())
+            elif symbol == '[':
+                return list(self.iter_array_items())
+            # a scalar value (e.g., a long string) is incomplete, so more data is needed
+            self._read_chunk(max(self._chunk_size, len(self._buffer) - self._pos))
+
+    def skip_value(self):
+        self.read_value()
+
+    def _may_continue(self, end):
+        # a number split between chunks is decoded partially (e.g., '1.' of '1.25' as 1), so a number is accepted
+        # only when it is followed by a symbol that cannot be a part of it
+        if end >= len(self._buffer):
+            return True
+        return self._buffer[self._pos] in self.NUMBER_START_SYMBOLS and \
+            self._buffer[end] in self.NUMBER_CONTINUATION_SYMBOLS
+
+    def _create_object(self, pairs):
+        keys = self._keys
+        return dict((keys.setdefault(key, key), value) for key, value in pairs)
+
+    def _expect(self, symbol):
+        actual_symbol = self._peek()
+        if actual_symbol != symbol:
+            raise ValueError('Expected %r but got %r' % (symbol, actual_symbol))
+        self._pos += 1
+
+    def _peek(self):
+        self._skip_whitespace()
+        if self._pos >= len(self._buffer):
+            raise ValueError('Unexpected end of JSON document')
+        return self._buffer[self._pos]
+
+    def _skip_whitespace(self):
+        while True:
+            self._pos = self.WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer) or self._eof:
+                return
+            self._read_chunk(self._chunk_size)
+
+    def _read_chunk(self, size):
+        chunk = self._stream.read(size)
+        self._eof = not chunk
+        if isinstance(chunk, binary_type):
+            chunk = self._decoder.decode(chunk, final=self._eof)
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+
+
+class RuntimeSpecSection(Mapping):
+    """
+    Read-only view of a section (operations or models) of the runtime spec. Items are decoded on first access,
+    so only the items that are actually used are kept in memory as dicts.
+    """
+
+    def __init__(self, buffer, payload_offset, toc):
+        self._buffer = buffer
+        self._payload_offset = payload_offset
+        self._toc = toc
+        self._decoded_items = {}
+
+    def __getitem__(self, name):
+        if name not in self._decoded_items:
+            offset, length = self._toc[name]
+            start = self._payload_offset + offset
+            self._decoded_items[name] = json.loads(to_text(self._buffer[start:start + length]))
+        return self._decoded_items[name]
+
+    def __iter__(self):
+        return iter(self._toc)
+
+    def __len__(self):
+        return len(self._toc)
+
+    @property
+    def decoded_count(self):
+        return len(self._decoded_items)
+
+
+class RuntimeModelOperations(Mapping):
+    """
+    Read-only view of the 'model_operations' section of the runtime spec. Operations are resolved from
+    the operations section, so every operation is decoded only once.
+    """
+
+    def __init__(self, operations, toc):
+        self._operations = operations
+        self._toc = dict((model_name, op_names) for model_name, op_names in toc)
+
+    def __getitem__(self, model_name):
+        return _RuntimeOperationsSubset(self._operations, self._toc[model_name])
+
+    def __iter__(self):
+        return iter(self._toc)
+
+    def __len__(self):
+        return len(self._toc)
+
+
+class _RuntimeOperationsSubset(Mapping):
+
+    def __init__(self, operations, op_names):
+        self._operations = operations
+        self._op_names = op_names
+
+    def __getitem__(self, op_name):
+        if op_name not in self._op_names:
+            raise KeyError(op_name)
+        return self._operations[op_name]
+
+    def __iter__(self):
+        return iter(self._op_names)
+
+    def __len__(self):
+        return len(self._op_names)
+
+
+def dump_runtime_spec(spec):
+    """
+    Serializes the parsed specification into the compact runtime format. Documentation (descriptions, examples and
+    tags) is not needed for executing operations, so it is not serialized, except for the description of
+    the `filter` query param listing the keys supported by the server (see `get_server_filter_keys`).
+
+    The serialized spec consists of a table of contents with positions of all operations and models followed by
+    individually encoded operations and models, so that any item can be decoded without reading the others.
+
+    :param spec: data from FdmSwaggerParser().parse_spec()
+    :type spec: dict
+    :return: serialized runtime spec
+    :rtype: bytes
+    """
+    chunks = []
+    toc = {}
+    payload_size = 0
+    sections = (
+        (SpecProp.OPERATIONS, _strip_operation_docs),
+        (SpecProp.MODELS, _strip_schema_docs)
+    )
+    for section_name, strip_docs in sections:
+        section_toc = toc[section_name] = {}
+        for name, value in iteritems(spec[section_name]):
+            chunk = to_bytes(json.dumps(strip_docs(value), separators=(',', ':')))
+            section_toc[name] = [payload_size, len(chunk)]
+            payload_size += len(chunk)
+            chunks.append(chunk)
+    # model names might be None, so the sections are stored as lists of pairs instead of JSON objects
+    toc[SpecProp.MODEL_OPERATIONS] = [[model_name, sorted(operations)]
+                                      for model_name, operations in iteritems(spec[SpecProp.MODEL_OPERATIONS])]
+    toc[SpecProp.MODEL_ROLES] = [[model_name, roles]
+                                 for model_name, roles in iteritems(spec.get(SpecProp.MODEL_ROLES, {}))]
+
+    return to_bytes(json.dumps(toc, separators=(',', ':'))) + b'\n' + b''.join(chunks)
+
+
+def load_runtime_spec(buffer, offset=0):
+    """
+    Loads the spec serialized by `dump_runtime_spec`. Only the table of contents is decoded immediately,
+    operations and models are decoded on first access.
+
+    :param buffer: serialized runtime spec, any object supporting slicing (e.g., bytes or mmap)
+    :param offset: position of the runtime spec in the buffer
+    :type offset: int
+    :return: read-only spec in the format of FdmSwaggerParser().parse_spec() output
+    :rtype: dict
+    :raises ValueError if the buffer does not contain a valid runtime spec
+    """
+    toc_end = buffer.find(b'\n', offset)
+    if toc_end < 0:
+        raise ValueError('The runtime spec does not contain a table of contents')
+
+    try:
+        toc = json.loads(to_text(buffer[offset:toc_end]))
+        operations = RuntimeSpecSection(buffer, toc_end + 1, toc[SpecProp.OPERATIONS])
+        return {
+            SpecProp.MODELS: RuntimeSpecSection(buffer, toc_end + 1, toc[SpecProp.MODELS]),
+            SpecProp.OPERATIONS: operations,
+            SpecProp.MODEL_OPERATIONS: RuntimeModelOperations(operations, toc[SpecProp.MODEL_OPERATIONS]),
+            SpecProp.MODEL_ROLES: dict((model_name, roles) for model_name, roles in toc[SpecProp.MODEL_ROLES])
+        }
+    except (KeyError, TypeError) as e:
+        raise ValueError('Invalid table of contents of the runtime spec: %s' % e)
+
+
+def _strip_operation_docs(operation):
+    operation = dict((k, v) for k, v in iteritems(operation)
+                     if k not in (OperationField.DESCRIPTION, OperationField.TAGS))
+    if OperationField.PARAMETERS in operation:
+        operation[OperationField.PARAMETERS] = dict(
+            (location, dict((name, _strip_param_docs(location, name, param)) for name, param in iteritems(params)))
+            for location, params in iteritems(operation[OperationField.PARAMETERS])
+        )
+    return operation
+
+
+def _strip_param_docs(location, name, param):
+    stripped_param = _strip_schema_docs(param)
+    if location == OperationParams.QUERY and name == QueryParams.FILTER and isinstance(param, dict) and \
+            OperationField.DESCRIPTION in param:
+        stripped_param[OperationField.DESCRIPTION] = param[OperationField.DESCRIPTION]
+    return stripped_param
+
+
+def _strip_schema_docs(schema):
+    if not isinstance(schema, dict):
+        return schema
+
+    stripped_schema = {}
+    for key, value in iteritems(schema):
+        if key in (PropName.DESCRIPTION, PropName.EXAMPLE):
+            continue
+        elif key == PropName.PROPERTIES and isinstance(value, dict):
+            # keys of 'properties' are field names (e.g., 'description'), so only their values are stripped
+            value = dict((name, _strip_schema_docs(prop)) for name, prop in iteritems(value))
+        elif key in (PropName.ITEMS, PropName.ADDITIONAL_PROPERTIES):
+            value = _strip_schema_docs(value)
+        elif key == PropName.ALL_OF and isinstance(value, list):
+            value = [_strip_schema_docs(item) for item in value]
+        stripped_schema[key] = value
+    return stripped_schema
+
+
 class FdmSwaggerValidator:
-    def __init__(self, spec):
+    def __init__(self, spec, compiled=False):
         """
         :param spec: dict
                     data from FdmSwaggerParser().parse_spec()
+        :param compiled: bool
+                    if True, every model is compiled into a validator function on first use, so repeated
+                    validations do not walk the model specification again. The reports are the same in both modes.
         """
         self._operations = spec[SpecProp.OPERATIONS]
         self._models = spec[SpecProp.MODELS]
+        self._compiled = compiled
+        self._compiled_models = {}
 
     def validate_data(self, operation_name, data=None):
         """
@@ -378,10 +952,13 @@ class FdmSwaggerValidator:
         self._check_validate_data_params(data, operation_name)
 
         operation = self._operations[operation_name]
-        model = self._models[operation[OperationField.MODEL_NAME]]
         status = self._init_report()
 
-        self._validate_object(status, model, data, '')
+        if self._compiled:
+            self._get_compiled_model(operation[OperationField.MODEL_NAME])(status, data, '')
+        else:
+            model = self._models[operation[OperationField.MODEL_NAME]]
+            self._validate_object(status, model, data, '')
 
         if len(status[PropName.REQUIRED]) > 0 or len(status[PropName.INVALID_TYPE]) > 0:
             return False, self._delete_empty_field_from_report(status)
@@ -582,6 +1159,147 @@ class FdmSwaggerValidator:
                 model_type = item_model.get(PropName.TYPE, PropType.OBJECT)
                 self._check_types(status, item_data, model_type, item_model, "{0}[{1}]".format(path, i), '')
 
+    def _get_compiled_model(self, model_name):
+        validator = self._compiled_models.get(model_name)
+        if validator is None:
+            validator = self._compiled_models[model_name] = self._compile_model(self._models[model_name])
+        return validator
+
+    def _compile_model(self, model):
+        """
+        Compiles the model into a function with the same behaviour as `_validate_object`. The function accepts
+        the report, the data and the path to the data. To avoid formatting paths of valid fields, nested paths are
+        passed as tuples and are formatted only when an error is reported (see `_format_path`).
+        """
+        if self._is_enum(model):
+            return self._compile_enum(model[PropName.ENUM])
+        elif self._is_object(model):
+            return self._compile_object(model)
+        return _skip_validation
+
+    def _compile_enum(self, enum):
+        enum_values = enum
+        if isinstance(enum, list):
+            try:
+                enum_values = frozenset(enum)
+            except TypeError:
+                pass
+
+        def validate_enum(status, value, path):
+            if value is None:
+                return
+            try:
+                is_valid = value in enum_values
+            except TypeError:
+                # unhashable values are compared one by one
+                is_valid = value in enum
+            if not is_valid:
+                self._add_compiled_invalid_type_report(status, path, '', PropName.ENUM, value)
+
+        return validate_enum
+
+    def _compile_object(self, model):
+        has_required_fields = PropName.REQUIRED in model
+        required_fields = model.get(PropName.REQUIRED)
+        model_properties = model.get(PropName.PROPERTIES)
+        prop_validators = []
+        if model_properties is not None:
+            for prop_name, prop_model in iteritems(model_properties):
+                prop_validators.append((prop_name, self._compile_prop(prop_model)))
+
+        def validate_object(status, data, path):
+            if data is None:
+                return
+            if not isinstance(data, dict):
+                self._add_compiled_invalid_type_report(status, path, '', PropType.OBJECT, data)
+                return
+
+            if has_required_fields:
+                missed_required_fields = [field for field in required_fields if data.get(field) is None]
+                if missed_required_fields:
+                    parent_path = self._format_path(path)
+                    status[PropName.REQUIRED] += [self._create_path_to_field(parent_path, field)
+                                                  for field in missed_required_fields]
+            if model_properties is None:
+                raise KeyError(PropName.PROPERTIES)
+
+            for prop_name, validate_prop in prop_validators:
+                if prop_name in data:
+                    validate_prop(status, data[prop_name], path, prop_name)
+
+        return validate_object
+
+    def _compile_prop(self, model):
+        """
+        Compiles the property model into a function with the same behaviour as `_check_types`. Errors in the model
+        specification are raised only when the property is validated, as it happens in the non-compiled mode.
+        """
+        try:
+            expected_type = model.get(PropName.TYPE, PropType.OBJECT)
+            if expected_type == PropType.OBJECT:
+                return self._compile_ref(model[PropName.REF])
+            elif expected_type == PropType.ARRAY:
+                return self._compile_array(model)
+            return self._compile_simple_type(expected_type)
+        except Exception as e:
+            return _raise_on_validation(e)
+
+    def _compile_ref(self, ref):
+        ref_model_name = _get_model_name_from_url(ref)
+
+        def validate_ref(status, value, path, prop_name):
+            # referenced models are compiled on first use, so recursive models are supported
+            self._get_compiled_model(ref_model_name)(status, value, (path, prop_name, False))
+
+        return validate_ref
+
+    def _compile_array(self, model):
+        has_items = PropName.ITEMS in model
+        validate_item = self._compile_prop(model[PropName.ITEMS]) if has_items else None
+
+        def validate_array(status, value, path, prop_name):
+            if value is None:
+                return
+            path = (path, prop_name, False)
+            if not isinstance(value, list):
+                self._add_compiled_invalid_type_report(status, path, '', PropType.ARRAY, value)
+                return
+            if not has_items:
+                raise KeyError(PropName.ITEMS)
+            for i, item in enumerate(value):
+                validate_item(status, item, (path, i, True), '')
+
+        return validate_array
+
+    def _compile_simple_type(self, expected_type):
+        if expected_type == PropType.STRING:
+            def is_correct_type(value):
+                return isinstance(value, string_types)
+        elif expected_type == PropType.BOOLEAN:
+            def is_correct_type(value):
+                return isinstance(value, bool)
+        else:
+            def is_correct_type(value):
+                return self._is_correct_simple_types(expected_type, value)
+
+        def validate_simple_type(status, value, path, prop_name):
+            if value is not None and not is_correct_type(value):
+                self._add_compiled_invalid_type_report(status, path, prop_name, expected_type, value)
+
+        return validate_simple_type
+
+    def _add_compiled_invalid_type_report(self, status, path, prop_name, expected_type, actually_value):
+        self._add_invalid_type_report(status, self._format_path(path), prop_name, expected_type, actually_value)
+
+    @classmethod
+    def _format_path(cls, path):
+        if not isinstance(path, tuple):
+            return path
+        parent_path, name, is_index = path
+        if is_index:
+            return "{0}[{1}]".format(cls._format_path(parent_path), name)
+        return cls._create_path_to_field(cls._format_path(parent_path), name)
+
     @staticmethod
     def _is_correct_simple_types(expected_type, value, allow_null=True):
         def is_numeric_string(s):
@@ -636,3 +1354,14 @@ class FdmSwaggerValidator:
     @staticmethod
     def _is_object(model):
         return PropName.REF in model or model.get(PropName.TYPE) == PropType.OBJECT
+
+
+def _skip_validation(*args):
+    pass
+
+
+def _raise_on_validation(error):
+    def raise_error(*args):
+        raise error
+
+    return raise_error
@@ -0,0 +1,216 @@
+# Copyright (c) 2020 Cisco and/or its affiliates.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_OBJECT_CACHE_TTL = 300
+DEFAULT_OBJECT_CACHE_MAX_OBJECTS = 50000
+
+
+class ObjectCacheStatsField:
+    HITS = 'hits'
+    MISSES = 'misses'
+    LOADS = 'loads'
+    EVICTIONS = 'evictions'
+    CACHED_OBJECTS = 'cached_objects'
+
+
+class _ObjectList(object):
+    """
+    Objects of a single list (a model within the given path params) indexed by name and id.
+    """
+
+    def __init__(self, objects, loaded_at):
+        self.loaded_at = loaded_at
+        self.by_id = {}
+        self.by_name = {}
+        self._size = 0
+        for obj in objects:
+            self.add(obj)
+
+    def add(self, obj):
+        obj_id = obj.get('id')
+        if obj_id is not None:
+            self.remove(obj_id)
+            self.by_id[obj_id] = obj
+        self.by_name.setdefault(obj.get('name'), []).append(obj)
+        self._size += 1
+
+    def remove(self, obj_id):
+        obj = self.by_id.pop(obj_id, None)
+        if obj is None:
+            return
+        self._size -= 1
+        same_name_objects = [o for o in self.by_name.get(obj.get('name'), []) if o is not obj]
+        if same_name_objects:
+            self.by_name[obj.get('name')] = same_name_objects
+        else:
+            self.by_name.pop(obj.get('name'), None)
+
+    def __len__(self):
+        return self._size
+
+
+class ObjectCache(object):
+    """
+    Connection-wide cache of object lists fetched from the device, so that lookups of existing objects (e.g., by
+    upsert operations) do not list the same model again for every task.
+
+    Lists are keyed by the model name and path params of the list operation (e.g., the parent interface of
+    subinterfaces) and indexed by object name and id. A list expires `ttl` seconds after it was loaded. When the total
+    number of cached objects exceeds `max_objects`, the least recently used lists are evicted; a list larger than
+    `max_objects` is not cached at all.
+
+    Successful writes should be reported with `put` and `remove`, so that cached lists stay in sync with the device.
+    """
+
+    def __init__(self, ttl=DEFAULT_OBJECT_CACHE_TTL, max_objects=DEFAULT_OBJECT_CACHE_MAX_OBJECTS, clock=time.time):
+        self._ttl = ttl
+        self._max_objects = max_objects
+        self._clock = clock
+        self._lists = OrderedDict()
+        # the total number of objects in cached lists, so that it is not counted again on every write
+        self._object_count = 0
+        self._lock = threading.RLock()
+        self._stats = {
+            ObjectCacheStatsField.HITS: 0,
+            ObjectCacheStatsField.MISSES: 0,
+            ObjectCacheStatsField.LOADS: 0,
+            ObjectCacheStatsField.EVICTIONS: 0
+        }
+
+    def is_loaded(self, model_name, path_params=None):
+        """
+        Checks whether the list of objects is cached and not expired.
+
+        :param model_name: name of the model
+        :type model_name: str
+        :param path_params: path params of the list operation
+        :type path_params: dict
+        :rtype: bool
+        """
+        with self._lock:
+            return self._get_list(_list_key(model_name, path_params)) is not None
+
+    def load(self, model_name, objects, path_params=None):
+        """
+        Stores the complete list of objects, replacing the cached one.
+
+        :param model_name: name of the model
+        :type model_name: str
+        :param objects: all objects returned by the list operation
+        :type objects: list
+        :param path_params: path params of the list operation
+        :type path_params: dict
+        """
+        key = _list_key(model_name, path_params)
+        with self._lock:
+            self._drop_list(key)
+            self._stats[ObjectCacheStatsField.LOADS] += 1
+            if len(objects) > self._max_objects:
+                return
+            object_list = _ObjectList([copy.deepcopy(obj) for obj in objects], self._clock())
+            self._lists[key] = object_list
+            self._object_count += len(object_list)
+            self._evict()
+
+    def find_by_name(self, model_name, name, path_params=None):
+        """
+        Returns cached objects with the given name.
+
+        :return: copies of matching objects or None if the list is not cached
+        :rtype: list
+        """
+        with self._lock:
+            object_list = self._get_list(_list_key(model_name, path_params))
+            if object_list is None:
+                self._stats[ObjectCacheStatsField.MISSES] += 1
+                return None
+            self._stats[ObjectCacheStatsField.HITS] += 1
+            return [copy.deepcopy(obj) for obj in object_list.by_name.get(name, [])]
+
+    def put(self, model_name, obj, path_params=None):
+        """
+        Adds a created or updated object to the cached list of the model. Nothing is cached if the list is not loaded.
+        """
+        with self._lock:
+            object_list = self._get_list(_list_key(model_name, path_params))
+            if object_list is not None:
+                size = len(object_list)
+                object_list.add(copy.deepcopy(obj))
+                self._object_count += len(object_list) - size
+                self._evict()
+
+    def remove(self, model_name, obj_id):
+        """
+        Removes the deleted object from all cached lists of the model.
+        """
+        with self._lock:
+            for (list_model_name, _), object_list in self._lists.items():
+                if list_model_name == model_name:
+                    size = len(object_list)
+                    object_list.remove(obj_id)
+                    self._object_count -= size - len(object_list)
+
+    def invalidate(self, model_name=None):
+        """
+        Drops cached lists of the given model or all cached lists.
+
+        :return: number of dropped lists
+        :rtype: int
+        """
+        with self._lock:
+            keys = [key for key in self._lists if model_name is None or key[0] == model_name]
+            for key in keys:
+                self._drop_list(key)
+            return len(keys)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats[ObjectCacheStatsField.CACHED_OBJECTS] = self._object_count
+            return stats
+
+    def _get_list(self, key):
+        object_list = self._lists.get(key)
+        if object_list is None:
+            return None
+        if self._clock() - object_list.loaded_at >= self._ttl:
+            self._drop_list(key)
+            return None
+        # the list becomes the most recently used one
+        del self._lists[key]
+        self._lists[key] = object_list
+        return object_list
+
+    def _drop_list(self, key):
+        object_list = self._lists.pop(key, None)
+        if object_list is not None:
+            self._object_count -= len(object_list)
+
+    def _evict(self):
+        while self._lists and self._object_count > self._max_objects:
+            _, object_list = self._lists.popitem(last=False)
+            self._object_count -= len(object_list)
+            self._stats[ObjectCacheStatsField.EVICTIONS] += 1
+
+
+def _list_key(model_name, path_params):
+    return model_name, tuple(sorted((path_params or {}).items()))
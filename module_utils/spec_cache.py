@@ -0,0 +1,304 @@
+# Copyright (c) 2020 Cisco and/or its affiliates.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+import hashlib
+import json
+import mmap
+import os
+import re
+import tempfile
+
+from ansible.module_utils._text import to_bytes, to_text
+
+try:
+    from ansible.module_utils.fdm_swagger_client import SpecProp, RuntimeSpecSection, dump_runtime_spec, \
+        load_runtime_spec
+except ImportError:
+    from module_utils.fdm_swagger_client import SpecProp, RuntimeSpecSection, dump_runtime_spec, load_runtime_spec
+
+# Bump the version every time the output of FdmSwaggerParser or the layout of stored entries changes,
+# so entries created by older versions are treated as stale
+CACHE_FORMAT_VERSION = 5
+
+SPECS_DIR = 'specs'
+BUILDS_DIR = 'builds'
+SPEC_FILE_EXTENSION = '.json'
+
+INVALID_KEY_SYMBOLS = r'[^a-zA-Z0-9_.-]'
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+PROC_STATUS_PATH = '/proc/self/status'
+
+
+class SpecCacheEntryField:
+    FORMAT_VERSION = 'format_version'
+    SPEC_HASH = 'spec_hash'
+    CHECKSUM = 'checksum'
+
+
+class MemoryUsageField:
+    RESIDENT = 'resident_bytes'
+    RESIDENT_ANONYMOUS = 'resident_anonymous_bytes'
+    RESIDENT_FILE = 'resident_file_bytes'
+    MAX_RESIDENT = 'max_resident_bytes'
+
+
+def get_spec_hash(spec_content):
+    """
+    Calculates a hash of the raw API specification content. The hash is used as an identity of the specification
+    in the cache.
+
+    :param spec_content: raw content of the API specification
+    :type spec_content: str or bytes
+    :return: hex digest of the content
+    :rtype: str
+    """
+    return hashlib.sha256(to_bytes(spec_content)).hexdigest()
+
+
+def get_spec_stream_hash(spec_stream):
+    """
+    Does the same as `get_spec_hash`, but reads the content from a binary file-like object in chunks. The stream is
+    rewound to its initial position afterwards, so it can be parsed right away.
+
+    :param spec_stream: binary file-like object containing the API specification
+    :return: hex digest of the content
+    :rtype: str
+    """
+    start = spec_stream.tell()
+    spec_hash = hashlib.sha256()
+    for chunk in iter(lambda: spec_stream.read(CHECKSUM_CHUNK_SIZE), b''):
+        spec_hash.update(chunk)
+    spec_stream.seek(start)
+    return spec_hash.hexdigest()
+
+
+class SpecCache(object):
+    """
+    Controller-wide store of API specifications parsed by FdmSwaggerParser.
+
+    Every parsed specification is stored once under the hash of its raw content. In addition, device build versions
+    are mapped to the specification hashes, so the specification for a known build can be loaded without
+    downloading it from the device. The directory layout is as follows:
+
+        <cache_dir>/specs/<spec_hash>.json  - the parsed specification
+        <cache_dir>/builds/<build_key>      - the hash of the specification served by the build
+
+    A stored specification consists of a header line (format version, hash and checksum) followed by the spec
+    in the runtime format (see `dump_runtime_spec`). The stored file is memory-mapped in read-only mode, so all
+    connection processes share the same physical pages and decode only the operations and models they use.
+
+    Entries that cannot be read, were created by another version of the store or do not match their checksum are
+    considered stale and are ignored.
+    """
+
+    def __init__(self, cache_dir):
+        self._cache_dir = cache_dir
+
+    @property
+    def cache_dir(self):
+        return self._cache_dir
+
+    def get_by_build(self, build_key):
+        """
+        Returns the parsed specification for the given build.
+
+        :param build_key: identifier of the device build (e.g., build version)
+        :type build_key: str
+        :return: parsed specification or None if there is no valid entry for the build
+        :rtype: dict
+        """
+        spec_hash = self._read_text(self._get_build_path(build_key))
+        if not spec_hash:
+            return None
+        return self.get_by_hash(spec_hash.strip())
+
+    def get_by_hash(self, spec_hash):
+        """
+        Returns the parsed specification with the given content hash. Sections of the returned specification are
+        read-only mappings backed by the memory-mapped cache entry.
+
+        :param spec_hash: hash of the raw specification content, see `get_spec_hash`
+        :type spec_hash: str
+        :return: parsed specification or None if there is no valid entry for the hash
+        :rtype: dict
+        """
+        buffer = self._map_file(self._get_spec_path(spec_hash))
+        if buffer is None:
+            return None
+
+        try:
+            header_end = buffer.find(b'\n')
+            header = json.loads(to_text(buffer[:header_end]))
+            is_valid_entry = header_end > 0 and \
+                header[SpecCacheEntryField.FORMAT_VERSION] == CACHE_FORMAT_VERSION and \
+                header[SpecCacheEntryField.SPEC_HASH] == spec_hash and \
+                header[SpecCacheEntryField.CHECKSUM] == _calculate_checksum(buffer, header_end + 1)
+            if not is_valid_entry:
+                buffer.close()
+                return None
+
+            return load_runtime_spec(buffer, header_end + 1)
+        except (ValueError, KeyError, TypeError):
+            # corrupted entries are ignored and overwritten once the specification is downloaded again
+            buffer.close()
+            return None
+
+    def put(self, spec_hash, spec, build_key=None):
+        """
+        Stores the parsed specification in the cache and, if `build_key` is given, maps the build to it.
+
+        :param spec_hash: hash of the raw specification content, see `get_spec_hash`
+        :type spec_hash: str
+        :param spec: data from FdmSwaggerParser().parse_spec()
+        :type spec: dict
+        :param build_key: identifier of the device build (e.g., build version)
+        :type build_key: str
+        """
+        payload = dump_runtime_spec(spec)
+        header = to_bytes(json.dumps({
+            SpecCacheEntryField.FORMAT_VERSION: CACHE_FORMAT_VERSION,
+            SpecCacheEntryField.SPEC_HASH: spec_hash,
+            SpecCacheEntryField.CHECKSUM: hashlib.sha256(payload).hexdigest()
+        }))
+        self._write_atomically(self._get_spec_path(spec_hash), header + b'\n' + payload)
+
+        if build_key:
+            self.link_build(build_key, spec_hash)
+
+    def link_build(self, build_key, spec_hash):
+        """
+        Maps the build to an already stored specification.
+
+        :param build_key: identifier of the device build (e.g., build version)
+        :type build_key: str
+        :param spec_hash: hash of the raw specification content, see `get_spec_hash`
+        :type spec_hash: str
+        """
+        self._write_atomically(self._get_build_path(build_key), to_bytes(spec_hash))
+
+    def _get_spec_path(self, spec_hash):
+        return os.path.join(self._cache_dir, SPECS_DIR, _sanitize_key(spec_hash) + SPEC_FILE_EXTENSION)
+
+    def _get_build_path(self, build_key):
+        return os.path.join(self._cache_dir, BUILDS_DIR, _sanitize_key(build_key))
+
+    @staticmethod
+    def _read_text(path):
+        try:
+            with open(path, 'rb') as f:
+                return to_text(f.read())
+        except (IOError, OSError):
+            return None
+
+    @staticmethod
+    def _map_file(path):
+        try:
+            with open(path, 'rb') as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError):
+            # ValueError is raised when mapping an empty file
+            return None
+
+    @staticmethod
+    def _write_atomically(path, content):
+        # several connection processes might write the same entry simultaneously, so the content is written
+        # into a temporary file first and moved to its final location afterwards. Processes that have already
+        # mapped the previous file keep using it until they exit.
+        dir_path = os.path.dirname(path)
+        if not os.path.isdir(dir_path):
+            try:
+                os.makedirs(dir_path)
+            except OSError:
+                # the directory could have been created by another process in the meantime
+                if not os.path.isdir(dir_path):
+                    raise
+
+        fd, tmp_path = tempfile.mkstemp(dir=dir_path)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.rename(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+
+def get_spec_stats(spec):
+    """
+    Collects statistics on how much of the specification has been decoded by the current process.
+
+    :param spec: data from FdmSwaggerParser().parse_spec() or SpecCache
+    :type spec: dict
+    :return: number of available and decoded operations and models, and whether the items are decoded lazily
+    :rtype: dict
+    """
+    stats = {'lazy': False}
+    for section_name in (SpecProp.OPERATIONS, SpecProp.MODELS):
+        section = spec.get(section_name) or {}
+        is_lazy = isinstance(section, RuntimeSpecSection)
+        stats['lazy'] = stats['lazy'] or is_lazy
+        stats[section_name] = {
+            'total': len(section),
+            'decoded': section.decoded_count if is_lazy else len(section)
+        }
+    return stats
+
+
+def get_memory_usage():
+    """
+    Reports memory usage of the current process. On Linux, resident memory is split into anonymous memory
+    (private to the process) and file-backed memory (shared with other processes mapping the same files).
+
+    :return: memory usage in bytes, only the values supported by the platform are present
+    :rtype: dict
+    """
+    usage = {}
+    status_fields = {
+        'VmRSS': MemoryUsageField.RESIDENT,
+        'RssAnon': MemoryUsageField.RESIDENT_ANONYMOUS,
+        'RssFile': MemoryUsageField.RESIDENT_FILE,
+        'VmHWM': MemoryUsageField.MAX_RESIDENT
+    }
+    try:
+        with open(PROC_STATUS_PATH) as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in status_fields:
+                    # values are reported in kB
+                    usage[status_fields[name]] = int(value.split()[0]) * 1024
+    except (IOError, OSError, ValueError, IndexError):
+        pass
+
+    if MemoryUsageField.MAX_RESIDENT not in usage:
+        try:
+            import resource
+            # ru_maxrss is reported in kB on Linux, so the value is approximate on other platforms
+            usage[MemoryUsageField.MAX_RESIDENT] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except (ImportError, AttributeError):
+            pass
+    return usage
+
+
+def _calculate_checksum(buffer, offset):
+    checksum = hashlib.sha256()
+    for chunk_start in range(offset, len(buffer), CHECKSUM_CHUNK_SIZE):
+        checksum.update(buffer[chunk_start:chunk_start + CHECKSUM_CHUNK_SIZE])
+    return checksum.hexdigest()
+
+
+def _sanitize_key(key):
+    return re.sub(INVALID_KEY_SYMBOLS, '_', to_text(key))
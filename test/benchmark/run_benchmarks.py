@@ -0,0 +1,420 @@
+"""
+Performance benchmarks for spec parsing, validation, object comparison and pagination.
+
+Run from the project root with the project directory in the Python path:
+
+    python -m test.benchmark.run_benchmarks --output results.json
+    python -m test.benchmark.run_benchmarks --baseline results.json
+
+Every benchmark is executed `repeat` times and the timings (in seconds) are written as JSON, so results of
+different runs can be compared. On Python 3, the peak size of memory allocated by a single run (in bytes) is
+reported too. With `--baseline`, the script exits with a non-zero code if the median time of
+any benchmark grew by more than the allowed threshold.
+"""
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import copy
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import OrderedDict
+
+from ansible.module_utils.six import BytesIO
+
+try:
+    import tracemalloc
+except ImportError:
+    # tracemalloc is only available on Python 3.4+
+    tracemalloc = None
+
+try:
+    from ansible.module_utils.common import equal_objects, delete_ref_duplicates
+    from ansible.module_utils.configuration import iterate_over_pageable_resource, ParamName
+    from ansible.module_utils.fdm_swagger_client import FdmSwaggerParser, FdmSwaggerValidator, SpecProp, \
+        OperationField
+except ImportError:
+    from module_utils.common import equal_objects, delete_ref_duplicates
+    from module_utils.configuration import iterate_over_pageable_resource, ParamName
+    from module_utils.fdm_swagger_client import FdmSwaggerParser, FdmSwaggerValidator, SpecProp, OperationField
+
+DIR_PATH = os.path.dirname(os.path.realpath(__file__))
+SPEC_FILE = os.path.join(DIR_PATH, '..', 'unit', 'module_utils', 'test_data', 'ngfw_with_ex.json')
+
+RESULTS_FORMAT_VERSION = 1
+DEFAULT_REPEAT = 5
+DEFAULT_REGRESSION_THRESHOLD = 1.25
+RANDOM_SEED = 42
+
+ACCESS_RULE_COUNT = 100
+REFS_PER_FIELD = 200
+HUGE_RULE_REF_COUNT = 50000
+PAGEABLE_RESOURCE_SIZE = 10000
+PAGE_SIZE = 100
+PAGE_LATENCY = 0.005
+CONCURRENT_PAGES = 8
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name):
+    """
+    Registers a benchmark. The decorated function receives the shared benchmark context and returns
+    the function to be timed, so that the preparation of test data is not included into the results.
+    """
+
+    def register(setup_func):
+        BENCHMARKS[name] = setup_func
+        return setup_func
+
+    return register
+
+
+class BenchmarkContext(object):
+    """
+    Lazily loads and caches the data shared by several benchmarks.
+    """
+
+    def __init__(self):
+        self._raw_spec = None
+        self._parsed_spec = None
+
+    @property
+    def raw_spec(self):
+        if self._raw_spec is None:
+            with open(SPEC_FILE, 'rb') as f:
+                self._raw_spec = f.read()
+        return self._raw_spec
+
+    @property
+    def parsed_spec(self):
+        if self._parsed_spec is None:
+            self._parsed_spec = FdmSwaggerParser().parse_spec(json.loads(self.raw_spec.decode('utf-8')))
+        return self._parsed_spec
+
+    def get_model_examples(self):
+        """
+        Returns (operation name, example) pairs for all operations that send a model with an example.
+        """
+        models = self.parsed_spec[SpecProp.MODELS]
+        operations = self.parsed_spec[SpecProp.OPERATIONS]
+        examples = []
+        for op_name in sorted(operations):
+            op_spec = operations[op_name]
+            model = models.get(op_spec[OperationField.MODEL_NAME]) or {}
+            if op_spec[OperationField.METHOD] != 'get' and 'example' in model:
+                examples.append((op_name, model['example']))
+        return examples
+
+
+def _validate_examples(validator, examples):
+    for op_name, example in examples:
+        try:
+            validator.validate_data(op_name, example)
+        except Exception:
+            # some examples in the spec are not valid, but they are still useful for benchmarking
+            pass
+
+
+@benchmark('parse_spec')
+def setup_parse_spec(context):
+    raw_spec = context.raw_spec
+    # decoding is included, so the result is comparable with parse_spec_stream
+    return lambda: FdmSwaggerParser().parse_spec(json.loads(raw_spec.decode('utf-8')))
+
+
+@benchmark('parse_spec_stream')
+def setup_parse_spec_stream(context):
+    raw_spec = context.raw_spec
+    return lambda: FdmSwaggerParser().parse_spec_stream(BytesIO(raw_spec))
+
+
+@benchmark('validate_data_all_examples')
+def setup_validate_data(context):
+    validator = FdmSwaggerValidator(context.parsed_spec)
+    examples = context.get_model_examples()
+    return lambda: _validate_examples(validator, examples)
+
+
+@benchmark('validate_data_all_examples_compiled')
+def setup_validate_data_compiled(context):
+    validator = FdmSwaggerValidator(context.parsed_spec, compiled=True)
+    examples = context.get_model_examples()
+    # models are compiled once per validator, so compilation is not included into the results
+    _validate_examples(validator, examples)
+    return lambda: _validate_examples(validator, examples)
+
+
+def _generate_refs(rnd, ref_type, count, duplicates_ratio=0.0):
+    refs = [{'id': 'id-%s-%s' % (ref_type, i), 'type': ref_type, 'name': '%s-%s' % (ref_type, i), 'version': 'v1'}
+            for i in range(count)]
+    refs += [copy.deepcopy(rnd.choice(refs)) for _ in range(int(count * duplicates_ratio))]
+    rnd.shuffle(refs)
+    return refs
+
+
+def _generate_access_rule(rnd, index, duplicates_ratio=0.0):
+    return {
+        'id': 'rule-%s' % index,
+        'version': 'v%s' % rnd.randint(1, 100),
+        'name': 'AccessRule%s' % index,
+        'type': 'accessrule',
+        'ruleId': index,
+        'ruleAction': rnd.choice(['PERMIT', 'TRUST', 'DENY']),
+        'eventLogAction': 'LOG_BOTH',
+        'enabled': True,
+        'sourceZones': _generate_refs(rnd, 'securityzone', 5, duplicates_ratio),
+        'destinationZones': _generate_refs(rnd, 'securityzone', 5, duplicates_ratio),
+        'sourceNetworks': _generate_refs(rnd, 'networkobject', REFS_PER_FIELD, duplicates_ratio),
+        'destinationNetworks': _generate_refs(rnd, 'networkobject', REFS_PER_FIELD, duplicates_ratio),
+        'sourcePorts': _generate_refs(rnd, 'tcpportobject', REFS_PER_FIELD // 2, duplicates_ratio),
+        'destinationPorts': _generate_refs(rnd, 'udpportobject', REFS_PER_FIELD // 2, duplicates_ratio),
+        'urlFilter': {
+            'type': 'embeddedurlfilter',
+            'urlObjects': _generate_refs(rnd, 'urlobject', REFS_PER_FIELD // 4, duplicates_ratio),
+            'urlCategories': [{'urlCategory': {'id': 'cat-%s' % i, 'type': 'urlcategory'},
+                               'urlReputation': None, 'type': 'urlcategorymatcher'} for i in range(20)]
+        },
+        'embeddedAppFilter': None
+    }
+
+
+@benchmark('equal_objects_access_rules')
+def setup_equal_objects(context):
+    rnd = random.Random(RANDOM_SEED)
+    rules = [_generate_access_rule(rnd, i, duplicates_ratio=0.1) for i in range(ACCESS_RULE_COUNT)]
+    # the same rules as returned by the device: with another version and without duplicate references
+    existing_rules = []
+    for rule in rules:
+        existing_rule = delete_ref_duplicates(copy.deepcopy(rule))
+        existing_rule['version'] = 'device-version'
+        existing_rules.append(existing_rule)
+
+    def compare_rules():
+        for rule, existing_rule in zip(rules, existing_rules):
+            equal_objects(existing_rule, rule)
+
+    return compare_rules
+
+
+@benchmark('equal_objects_access_rules_changed')
+def setup_equal_objects_changed(context):
+    rnd = random.Random(RANDOM_SEED)
+    rules = [_generate_access_rule(rnd, i, duplicates_ratio=0.1) for i in range(ACCESS_RULE_COUNT)]
+    # the rules as changed by the user: the last reference in one of the fields points to another object
+    existing_rules = []
+    for rule in rules:
+        existing_rule = delete_ref_duplicates(copy.deepcopy(rule))
+        field_name = rnd.choice(['sourceNetworks', 'destinationNetworks', 'sourcePorts', 'destinationPorts'])
+        existing_rule[field_name][-1] = dict(existing_rule[field_name][-1], id='changed-id')
+        existing_rules.append(existing_rule)
+
+    def compare_rules():
+        for rule, existing_rule in zip(rules, existing_rules):
+            equal_objects(existing_rule, rule)
+
+    return compare_rules
+
+
+@benchmark('delete_ref_duplicates_access_rules')
+def setup_delete_ref_duplicates(context):
+    rnd = random.Random(RANDOM_SEED)
+    rules = [_generate_access_rule(rnd, i, duplicates_ratio=0.5) for i in range(ACCESS_RULE_COUNT)]
+
+    def delete_duplicates():
+        for rule in rules:
+            delete_ref_duplicates(rule)
+
+    return delete_duplicates
+
+
+def _generate_huge_access_rules(rnd):
+    rules = []
+    # a rule with a few duplicate references and a rule the device returns, i.e., without duplicates
+    for duplicates_ratio in (0.01, 0.0):
+        rule = _generate_access_rule(rnd, len(rules))
+        rule['urlFilter']['urlObjects'] = _generate_refs(rnd, 'urlobject', HUGE_RULE_REF_COUNT, duplicates_ratio)
+        rule['embeddedAppFilter'] = {
+            'type': 'embeddedappfilter',
+            'applications': _generate_refs(rnd, 'application', HUGE_RULE_REF_COUNT, duplicates_ratio)
+        }
+        rules.append(rule)
+    return rules
+
+
+@benchmark('delete_ref_duplicates_huge_access_rules')
+def setup_delete_ref_duplicates_huge(context):
+    rules = _generate_huge_access_rules(random.Random(RANDOM_SEED))
+
+    def delete_duplicates():
+        for rule in rules:
+            delete_ref_duplicates(rule)
+
+    return delete_duplicates
+
+
+@benchmark('equal_objects_huge_access_rules')
+def setup_equal_objects_huge(context):
+    rule = _generate_huge_access_rules(random.Random(RANDOM_SEED))[0]
+    # the rule given by the user, with duplicates, is compared with the same rule returned by the device
+    existing_rule = delete_ref_duplicates(copy.deepcopy(rule))
+    existing_rule['version'] = 'device-version'
+
+    def compare_rules():
+        equal_objects(existing_rule, rule)
+
+    return compare_rules
+
+
+def _create_pageable_resource(item_count, latency=0.0):
+    items = [{'id': str(i), 'name': 'object-%s' % i, 'type': 'networkobject'} for i in range(item_count)]
+
+    def get_page(params):
+        if latency:
+            # simulates the round trip to the device
+            time.sleep(latency)
+        query_params = params[ParamName.QUERY_PARAMS]
+        offset, limit = int(query_params['offset']), int(query_params['limit'])
+        next_pages = ['/object/networks?offset=%s' % (offset + limit)] if offset + limit < len(items) else []
+        return {
+            'items': items[offset:offset + limit],
+            'paging': {'offset': offset, 'limit': limit, 'count': len(items), 'next': next_pages}
+        }
+
+    return get_page
+
+
+def _iterate_pageable_resource(get_page, max_concurrent_pages=1):
+    def iterate():
+        params = {ParamName.QUERY_PARAMS: {'limit': PAGE_SIZE}, ParamName.PATH_PARAMS: {}}
+        for _ in iterate_over_pageable_resource(get_page, params, max_concurrent_pages=max_concurrent_pages):
+            pass
+
+    return iterate
+
+
+@benchmark('iterate_over_pageable_resource')
+def setup_iterate_over_pageable_resource(context):
+    return _iterate_pageable_resource(_create_pageable_resource(PAGEABLE_RESOURCE_SIZE))
+
+
+@benchmark('iterate_over_pageable_resource_with_latency')
+def setup_iterate_over_pageable_resource_with_latency(context):
+    return _iterate_pageable_resource(_create_pageable_resource(PAGEABLE_RESOURCE_SIZE, PAGE_LATENCY))
+
+
+@benchmark('iterate_over_pageable_resource_with_latency_concurrent')
+def setup_iterate_over_pageable_resource_with_latency_concurrent(context):
+    return _iterate_pageable_resource(_create_pageable_resource(PAGEABLE_RESOURCE_SIZE, PAGE_LATENCY),
+                                      CONCURRENT_PAGES)
+
+
+def run_benchmark(setup_func, context, repeat):
+    func = setup_func(context)
+    timings = []
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        timings.append(time.time() - start)
+
+    timings.sort()
+    return OrderedDict([
+        ('repeat', repeat),
+        ('min', timings[0]),
+        ('max', timings[-1]),
+        ('mean', sum(timings) / len(timings)),
+        ('median', timings[len(timings) // 2]),
+        ('peak_memory', measure_peak_memory(func))
+    ])
+
+
+def measure_peak_memory(func):
+    """
+    Runs the function once more with memory allocations traced.
+
+    :return: the peak size of memory allocated by the function in bytes, or None if allocations cannot be traced
+    """
+    if tracemalloc is None:
+        return None
+
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(names, repeat):
+    context = BenchmarkContext()
+    results = OrderedDict()
+    for name in names:
+        results[name] = run_benchmark(BENCHMARKS[name], context, repeat)
+        peak_memory = results[name]['peak_memory']
+        print('%-55s median %.4fs (min %.4fs)%s' % (name, results[name]['median'], results[name]['min'],
+                                                    ', peak memory %s KiB' % (peak_memory // 1024)
+                                                    if peak_memory is not None else ''),
+              file=sys.stderr)
+
+    return OrderedDict([
+        ('format_version', RESULTS_FORMAT_VERSION),
+        ('timestamp', time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ('python_version', platform.python_version()),
+        ('platform', platform.platform()),
+        ('benchmarks', results)
+    ])
+
+
+def find_regressions(results, baseline, threshold):
+    """
+    Compares median timings with the baseline.
+
+    :return: list of (benchmark name, baseline median, current median) for benchmarks that became slower
+        than the baseline by more than `threshold` times
+    """
+    regressions = []
+    for name, result in results['benchmarks'].items():
+        baseline_result = baseline['benchmarks'].get(name)
+        if baseline_result and result['median'] > baseline_result['median'] * threshold:
+            regressions.append((name, baseline_result['median'], result['median']))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Runs performance benchmarks of the FTD Ansible modules.')
+    parser.add_argument('--output', help='path to the JSON file to write results to (stdout by default)')
+    parser.add_argument('--baseline', help='path to the JSON file with results of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help='maximum allowed ratio of the current and baseline median times')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='number of runs of every benchmark')
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark',
+                        help='names of benchmarks to run (all by default): %s' % ', '.join(BENCHMARKS))
+    args = parser.parse_args(args)
+    unknown_benchmarks = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown_benchmarks:
+        parser.error('unknown benchmarks: %s' % ', '.join(unknown_benchmarks))
+
+    results = run_benchmarks(args.benchmarks or list(BENCHMARKS), args.repeat)
+    results_json = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results_json)
+    else:
+        print(results_json)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        for name, baseline_median, median in regressions:
+            print('Regression in %s: median %.4fs, baseline %.4fs' % (name, median, baseline_median), file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -16,6 +16,10 @@
 # along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
 #
 import json
+import os
+import shutil
+import tempfile
+import threading
 
 from ansible.errors import AnsibleConnectionFailure
 from ansible.module_utils.connection import ConnectionError
@@ -25,8 +29,10 @@ from units.compat import mock
 from units.compat import unittest
 from units.compat.mock import mock_open, patch
 
-from httpapi_plugins.ftd import HttpApi, BASE_HEADERS, TOKEN_PATH_TEMPLATE, DEFAULT_API_VERSIONS
-from module_utils.common import HTTPMethod, ResponseParams
+from httpapi_plugins.ftd import HttpApi, BASE_HEADERS, TOKEN_PATH_TEMPLATE, DEFAULT_API_VERSIONS, \
+    SYSTEM_INFO_PATH_TEMPLATE
+from module_utils.common import HTTPMethod, ResponseParams, FtdServerError
+from module_utils.connection_pool import ConnectionPoolError, PooledResponse
 from module_utils.fdm_swagger_client import FdmSwaggerParser, SpecProp
 
 if PY3:
@@ -40,7 +46,16 @@ class FakeFtdHttpApiPlugin(HttpApi):
         super(FakeFtdHttpApiPlugin, self).__init__(conn)
         self.hostvars = {
             'token_path': '/testLoginUrl',
-            'spec_path': '/testSpecUrl'
+            'spec_path': '/testSpecUrl',
+            'spec_file': None,
+            'spec_cache_dir': None,
+            'page_size': 10,
+            'adaptive_paging': False,
+            'max_concurrent_pages': 1,
+            'object_cache': False,
+            'object_cache_ttl': 300,
+            'object_cache_max_objects': 50000,
+            'connection_pool_size': 0
         }
 
     def get_option(self, var):
@@ -54,6 +69,7 @@ class TestFtdHttpApi(unittest.TestCase):
 
     def setUp(self):
         self.connection_mock = mock.Mock()
+        self.connection_mock.get_option.side_effect = {'persistent_command_timeout': 30}.get
         self.ftd_plugin = FakeFtdHttpApiPlugin(self.connection_mock)
         self.ftd_plugin.access_token = 'ACCESS_TOKEN'
         self.ftd_plugin._load_name = 'httpapi'
@@ -190,9 +206,143 @@ class TestFtdHttpApi(unittest.TestCase):
     def test_handle_httperror_should_not_retry_on_non_auth_errors(self):
         assert not self.ftd_plugin.handle_httperror(HTTPError('http://testhost.com', 500, '', {}, None))
 
-    def test_handle_httperror_should_not_retry_when_ignoring_http_errors(self):
-        self.ftd_plugin._ignore_http_errors = True
-        assert not self.ftd_plugin.handle_httperror(HTTPError('http://testhost.com', 401, '', {}, None))
+    def test_handle_httperror_should_not_retry_auth_requests(self):
+        def send(path, data, **kwargs):
+            # the connection handles errors of the token request
+            assert not self.ftd_plugin.handle_httperror(HTTPError('http://testhost.com', 401, '', {}, None))
+            raise HTTPError('http://testhost.com', 401, '', {}, StringIO('{"error": "invalid token"}'))
+
+        self.connection_mock.send.side_effect = send
+        self.ftd_plugin.refresh_token = 'REFRESH_TOKEN'
+
+        with self.assertRaises(ConnectionError):
+            self.ftd_plugin.login('foo', 'bar')
+
+    def test_handle_httperror_should_not_login_again_when_token_is_already_refreshed(self):
+        self.connection_mock._auth = {'Authorization': 'Bearer NEW_ACCESS_TOKEN'}
+
+        # the request was sent with the old token before another request refreshed it
+        assert self.ftd_plugin._refresh_auth(HTTPError('http://testhost.com', 401, '', {}, None),
+                                             {'Authorization': 'Bearer ACCESS_TOKEN'})
+        self.connection_mock.send.assert_not_called()
+
+    def _enable_connection_pool(self, pool_class_mock, *responses):
+        self.ftd_plugin.hostvars['connection_pool_size'] = 2
+        self.connection_mock._url = 'https://testhost.com'
+        self.connection_mock._auth = {'Authorization': 'Bearer ACCESS_TOKEN'}
+        self.connection_mock.get_option.side_effect = {'timeout': 10, 'validate_certs': False}.get
+        pool_mock = pool_class_mock.return_value
+        pool_mock.request.side_effect = [PooledResponse(status, 'Reason', {}, json.dumps(body).encode())
+                                         for status, body in responses]
+        return pool_mock
+
+    @patch('httpapi_plugins.ftd.getproxies', mock.Mock(return_value={}))
+    @patch('httpapi_plugins.ftd.HTTPConnectionPool')
+    def test_send_request_uses_connection_pool(self, pool_class_mock):
+        pool_mock = self._enable_connection_pool(pool_class_mock, (200, {'id': '1'}), (200, {'id': '2'}))
+
+        assert {ResponseParams.SUCCESS: True, ResponseParams.STATUS_CODE: 200, ResponseParams.RESPONSE: {'id': '1'}} \
+            == self.ftd_plugin.send_request('/test', HTTPMethod.POST, body_params={'name': 'foo'})
+        self.ftd_plugin.send_request('/test', HTTPMethod.GET)
+
+        pool_class_mock.assert_called_once_with('https://testhost.com', max_size=2, timeout=10, validate_certs=False)
+        expected_headers = dict(BASE_HEADERS, Authorization='Bearer ACCESS_TOKEN')
+        assert [
+            mock.call(HTTPMethod.POST, '/test', b'{"name": "foo"}', expected_headers),
+            mock.call(HTTPMethod.GET, '/test', None, expected_headers)
+        ] == pool_mock.request.call_args_list
+        self.connection_mock.send.assert_not_called()
+
+    @patch('httpapi_plugins.ftd.getproxies', mock.Mock(return_value={}))
+    @patch('httpapi_plugins.ftd.HTTPConnectionPool')
+    def test_send_request_over_connection_pool_retries_after_login_on_auth_errors(self, pool_class_mock):
+        pool_mock = self._enable_connection_pool(
+            pool_class_mock,
+            (401, {'error': 'expired'}),
+            (200, {'access_token': 'NEW_ACCESS_TOKEN', 'refresh_token': 'NEW_REFRESH_TOKEN'}),
+            (500, {'error': 'failed'})
+        )
+        self.ftd_plugin.refresh_token = 'REFRESH_TOKEN'
+
+        assert {ResponseParams.SUCCESS: False, ResponseParams.STATUS_CODE: 500,
+                ResponseParams.RESPONSE: {'error': 'failed'}} == self.ftd_plugin.send_request('/test', HTTPMethod.GET)
+
+        assert 'NEW_ACCESS_TOKEN' == self.ftd_plugin.access_token
+        assert 3 == pool_mock.request.call_count
+
+    @patch('httpapi_plugins.ftd.getproxies', mock.Mock(return_value={}))
+    @patch('httpapi_plugins.ftd.HTTPConnectionPool')
+    def test_concurrent_requests_over_connection_pool_log_in_once_on_auth_errors(self, pool_class_mock):
+        pool_mock = self._enable_connection_pool(pool_class_mock)
+        self.ftd_plugin.refresh_token = 'REFRESH_TOKEN'
+        token_requests = []
+        expired_responses = []
+        both_requests_failed = threading.Event()
+        lock = threading.Lock()
+
+        def request(method, path, body, headers):
+            if path == '/testLoginUrl':
+                token_requests.append(body)
+                return PooledResponse(200, 'OK', {}, b'{"access_token": "NEW", "refresh_token": "NEW_REFRESH"}')
+            if headers['Authorization'] == 'Bearer NEW':
+                return PooledResponse(200, 'OK', {}, b'{}')
+            with lock:
+                expired_responses.append(path)
+                if len(expired_responses) == 2:
+                    both_requests_failed.set()
+            # both requests fail with the expired token before any of them logs in
+            both_requests_failed.wait(5)
+            return PooledResponse(401, 'Unauthorized', {}, b'{}')
+
+        pool_mock.request.side_effect = request
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.ftd_plugin.send_request('/test', 'get')))
+                   for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert [True, True] == [result[ResponseParams.SUCCESS] for result in results]
+        assert 2 == len(expired_responses)
+        assert 1 == len(token_requests)
+
+    @patch('httpapi_plugins.ftd.getproxies', mock.Mock(return_value={}))
+    @patch('httpapi_plugins.ftd.HTTPConnectionPool')
+    def test_send_request_over_connection_pool_fails_when_device_is_unreachable(self, pool_class_mock):
+        self._enable_connection_pool(pool_class_mock)
+        pool_class_mock.return_value.request.side_effect = ConnectionPoolError('Connection refused')
+
+        with self.assertRaises(AnsibleConnectionFailure) as res:
+            self.ftd_plugin.send_request('/test', HTTPMethod.GET)
+
+        assert 'Could not connect to https://testhost.com/test: Connection refused' == str(res.exception)
+
+    @patch('httpapi_plugins.ftd.getproxies', mock.Mock(return_value={'https': 'http://proxy:3128'}))
+    @patch('httpapi_plugins.ftd.proxy_bypass', mock.Mock(return_value=False))
+    @patch('httpapi_plugins.ftd.HTTPConnectionPool')
+    def test_connection_pool_is_not_used_with_proxy(self, pool_class_mock):
+        self._enable_connection_pool(pool_class_mock)
+        self.connection_mock.send.return_value = self._connection_response({})
+
+        self.ftd_plugin.send_request('/test', HTTPMethod.GET)
+
+        pool_class_mock.assert_not_called()
+        assert self.ftd_plugin.get_connection_pool_stats() is None
+        self.connection_mock.send.assert_called_once_with('/test', None, method=HTTPMethod.GET, headers=BASE_HEADERS)
+
+    @patch('httpapi_plugins.ftd.getproxies', mock.Mock(return_value={}))
+    @patch('httpapi_plugins.ftd.HTTPConnectionPool')
+    def test_logout_closes_connection_pool(self, pool_class_mock):
+        pool_mock = self._enable_connection_pool(pool_class_mock, (200, {}), (200, {}))
+        pool_mock.get_stats.return_value = {'hits': 1, 'misses': 1}
+        self.ftd_plugin.send_request('/test', HTTPMethod.GET)
+        assert {'hits': 1, 'misses': 1} == self.ftd_plugin.get_connection_pool_stats()
+
+        self.ftd_plugin.logout()
+
+        pool_mock.close.assert_called_once_with()
+        assert self.ftd_plugin.get_connection_pool_stats() is None
 
     @patch('os.path.isdir', mock.Mock(return_value=False))
     def test_download_file(self):
@@ -234,7 +384,7 @@ class TestFtdHttpApi(unittest.TestCase):
         exp_headers = dict(BASE_HEADERS)
         exp_headers['Content-Length'] = len('--Encoded data--')
         exp_headers['Content-Type'] = 'multipart/form-data'
-        self.connection_mock.send.assert_called_once_with('/files', data='--Encoded data--',
+        self.connection_mock.send.assert_called_once_with('/files', '--Encoded data--',
                                                           headers=exp_headers, method=HTTPMethod.POST)
         open_mock.assert_called_once_with('/tmp/test.txt', 'rb')
 
@@ -251,34 +401,153 @@ class TestFtdHttpApi(unittest.TestCase):
 
         assert 'Invalid JSON response' in str(res.exception)
 
-    @patch.object(FdmSwaggerParser, 'parse_spec')
-    def test_get_operation_spec(self, parse_spec_mock):
+    @patch.object(FdmSwaggerParser, 'parse_spec_stream')
+    def test_get_operation_spec(self, parse_spec_stream_mock):
         self.connection_mock.send.return_value = self._connection_response(None)
-        parse_spec_mock.return_value = {
+        parse_spec_stream_mock.return_value = {
             SpecProp.OPERATIONS: {'testOp': 'Specification for testOp'}
         }
 
         assert 'Specification for testOp' == self.ftd_plugin.get_operation_spec('testOp')
         assert self.ftd_plugin.get_operation_spec('nonExistingTestOp') is None
 
-    @patch.object(FdmSwaggerParser, 'parse_spec')
-    def test_get_model_spec(self, parse_spec_mock):
+    @patch('httpapi_plugins.ftd.BaseConfigurationResource')
+    def test_execute_operation(self, resource_class_mock):
+        resource_mock = resource_class_mock.return_value
+        resource_mock.execute_operation.return_value = {'id': '123'}
+        resource_mock.config_changed = True
+        resource_mock.metrics = {'pages_fetched': 0}
+        resource_mock.diff = [{'path': 'name', 'before': 'foo', 'after': 'test'}]
+        self.ftd_plugin.set_option('page_size', 100)
+        self.ftd_plugin.set_option('adaptive_paging', True)
+        self.ftd_plugin.set_option('max_concurrent_pages', 4)
+
+        result = self.ftd_plugin.execute_operation('addTest', {'data': {'name': 'test'}}, True)
+
+        assert {'changed': True, 'response': {'id': '123'}, 'metrics': {'pages_fetched': 0},
+                'diff': [{'path': 'name', 'before': 'foo', 'after': 'test'}]} == result
+        resource_class_mock.assert_called_once_with(self.ftd_plugin, True, page_size=100, adaptive_paging=True,
+                                                    max_concurrent_pages=4, object_cache=None,
+                                                    command_timeout=30)
+        resource_mock.execute_operation.assert_called_once_with('addTest', {'data': {'name': 'test'}})
+
+    @patch('httpapi_plugins.ftd.BaseConfigurationResource')
+    def test_execute_operation_returns_serialized_operation_error(self, resource_class_mock):
+        resource_class_mock.return_value.execute_operation.side_effect = FtdServerError({'error': 'foo'}, 500)
+
+        result = self.ftd_plugin.execute_operation('addTest', {}, False)
+
+        assert {'error': {'type': 'FtdServerError', 'args': [{'error': 'foo'}, 500]}} == result
+
+    @patch('httpapi_plugins.ftd.BaseConfigurationResource')
+    def test_execute_operation_raises_unexpected_errors(self, resource_class_mock):
+        resource_class_mock.return_value.execute_operation.side_effect = KeyError('key')
+
+        with self.assertRaises(KeyError):
+            self.ftd_plugin.execute_operation('addTest', {}, False)
+
+    @patch('httpapi_plugins.ftd.DesiredStateResource')
+    @patch('httpapi_plugins.ftd.BaseConfigurationResource')
+    def test_apply_desired_state(self, resource_class_mock, desired_state_class_mock):
+        desired_state_class_mock.return_value.run.return_value = {'changed': False, 'plan': [], 'summary': {}}
+        self.ftd_plugin.set_option('page_size', 100)
+        self.ftd_plugin.set_option('adaptive_paging', True)
+        self.ftd_plugin.set_option('max_concurrent_pages', 4)
+
+        result = self.ftd_plugin.apply_desired_state({'NetworkObject': []}, True, True, 8)
+
+        assert {'changed': False, 'plan': [], 'summary': {}} == result
+        resource_class_mock.assert_called_once_with(self.ftd_plugin, False, page_size=100, adaptive_paging=True,
+                                                    max_concurrent_pages=4, object_cache=None,
+                                                    command_timeout=30)
+        desired_state_class_mock.assert_called_once_with(resource_class_mock.return_value, max_concurrent_requests=8)
+        desired_state_class_mock.return_value.run.assert_called_once_with({'NetworkObject': []}, True, True)
+
+    @patch('httpapi_plugins.ftd.DesiredStateResource')
+    @patch('httpapi_plugins.ftd.BaseConfigurationResource', mock.Mock())
+    def test_apply_desired_state_returns_serialized_operation_error(self, desired_state_class_mock):
+        desired_state_class_mock.return_value.run.side_effect = FtdServerError({'error': 'foo'}, 500)
+
+        result = self.ftd_plugin.apply_desired_state({}, False, False)
+
+        assert {'error': {'type': 'FtdServerError', 'args': [{'error': 'foo'}, 500]}} == result
+
+    def test_object_cache_is_created_only_when_enabled(self):
+        assert self.ftd_plugin.object_cache is None
+        assert 0 == self.ftd_plugin.invalidate_object_cache()
+        assert self.ftd_plugin.get_object_cache_stats() is None
+
+        self.ftd_plugin.hostvars['object_cache'] = True
+        object_cache = self.ftd_plugin.object_cache
+        object_cache.load('NetworkObject', [{'id': '1', 'name': 'net'}])
+
+        assert object_cache is self.ftd_plugin.object_cache
+        assert 1 == self.ftd_plugin.get_object_cache_stats()['cached_objects']
+        assert 1 == self.ftd_plugin.invalidate_object_cache('NetworkObject')
+        assert not object_cache.is_loaded('NetworkObject')
+
+    def test_system_information_is_cached_until_upgrade_is_started(self):
+        self.ftd_plugin.hostvars['token_path'] = TOKEN_PATH_TEMPLATE.format('v2')
+        self.connection_mock.send.side_effect = self._device_responses({'swagger': '2.0'}, '6.4.0')
+
+        assert '6.4.0' == self.ftd_plugin._get_device_build_version()
+        assert {'databaseInfo': {'buildVersion': '6.4.0'}} == self.ftd_plugin.get_system_information()
+        self.connection_mock.send.assert_called_once_with(SYSTEM_INFO_PATH_TEMPLATE.format('v2'), None,
+                                                          method=HTTPMethod.GET, headers=BASE_HEADERS)
+
+        self.ftd_plugin.send_request('/api/fdm/v2/action/upgrade', HTTPMethod.POST)
+        self.ftd_plugin.get_system_information()
+
+        assert 3 == self.connection_mock.send.call_count
+
+    def test_get_system_information_raises_exception_when_api_version_is_unknown(self):
+        with self.assertRaises(ConnectionError) as res:
+            self.ftd_plugin.get_system_information()
+
+        assert "Can't fetch system information: API version is unknown" == str(res.exception)
+        assert self.ftd_plugin._get_device_build_version() is None
+        self.connection_mock.send.assert_not_called()
+
+    def test_validate_request_returns_reports_for_invalid_parts(self):
+        self.ftd_plugin._api_spec = {SpecProp.OPERATIONS: {'addTest': {'method': HTTPMethod.POST, 'url': '/test'}}}
+        self.ftd_plugin._api_validator = mock.Mock()
+        self.ftd_plugin._api_validator.validate_query_params.return_value = (True, None)
+        self.ftd_plugin._api_validator.validate_path_params.side_effect = ValueError('Invalid path params')
+        self.ftd_plugin._api_validator.validate_data.return_value = (False, {'required': ['name']})
+
+        reports = self.ftd_plugin.validate_request('addTest', {'value': 1}, {'limit': 1}, None)
+
+        assert {'path_params': 'Invalid path params', 'data': {'required': ['name']}} == reports
+        self.ftd_plugin._api_validator.validate_query_params.assert_called_once_with('addTest', {'limit': 1})
+        self.ftd_plugin._api_validator.validate_data.assert_called_once_with('addTest', {'value': 1})
+
+    def test_validate_request_does_not_validate_data_of_get_requests(self):
+        self.ftd_plugin._api_spec = {SpecProp.OPERATIONS: {'getTest': {'method': HTTPMethod.GET, 'url': '/test'}}}
+        self.ftd_plugin._api_validator = mock.Mock()
+        self.ftd_plugin._api_validator.validate_query_params.return_value = (True, None)
+        self.ftd_plugin._api_validator.validate_path_params.return_value = (True, None)
+
+        assert {} == self.ftd_plugin.validate_request('getTest', {'value': 1})
+        self.ftd_plugin._api_validator.validate_data.assert_not_called()
+
+    @patch.object(FdmSwaggerParser, 'parse_spec_stream')
+    def test_get_model_spec(self, parse_spec_stream_mock):
         self.connection_mock.send.return_value = self._connection_response(None)
-        parse_spec_mock.return_value = {
+        parse_spec_stream_mock.return_value = {
             SpecProp.MODELS: {'TestModel': 'Specification for TestModel'}
         }
 
         assert 'Specification for TestModel' == self.ftd_plugin.get_model_spec('TestModel')
         assert self.ftd_plugin.get_model_spec('NonExistingTestModel') is None
 
-    @patch.object(FdmSwaggerParser, 'parse_spec')
-    def test_get_operation_spec_by_model_name(self, parse_spec_mock):
+    @patch.object(FdmSwaggerParser, 'parse_spec_stream')
+    def test_get_operation_spec_by_model_name(self, parse_spec_stream_mock):
         self.connection_mock.send.return_value = self._connection_response(None)
         operation1 = {'modelName': 'TestModel'}
         op_model_name_is_none = {'modelName': None}
         op_without_model_name = {'url': 'testUrl'}
 
-        parse_spec_mock.return_value = {
+        parse_spec_stream_mock.return_value = {
             SpecProp.MODEL_OPERATIONS: {
                 'TestModel': {
                     'testOp1': operation1,
@@ -309,6 +578,178 @@ class TestFtdHttpApi(unittest.TestCase):
 
         assert self.ftd_plugin.get_operation_specs_by_model_name('nonExistingOperation') is None
 
+    @patch.object(FdmSwaggerParser, 'parse_spec_stream')
+    def test_get_model_roles(self, parse_spec_stream_mock):
+        self.connection_mock.send.return_value = self._connection_response(None)
+        model_roles = {'add': 'addTest', 'edit': None, 'get': None, 'getList': None, 'delete': None, 'upsert': False}
+        parse_spec_stream_mock.return_value = {
+            SpecProp.MODEL_OPERATIONS: {
+                'TestModel': {'addTest': {'method': HTTPMethod.POST, 'url': '/test', 'modelName': 'TestModel'}},
+                'OtherModel': {'getOther': {'method': HTTPMethod.GET, 'url': '/other/{objId}',
+                                            'modelName': 'OtherModel', 'returnMultipleItems': False}}
+            },
+            SpecProp.MODEL_ROLES: {'TestModel': model_roles}
+        }
+
+        assert model_roles is self.ftd_plugin.get_model_roles('TestModel')
+        assert 'getOther' == self.ftd_plugin.get_model_roles('OtherModel')['get']
+        assert {'add': None, 'edit': None, 'get': None, 'getList': None, 'delete': None, 'upsert': False} == \
+            self.ftd_plugin.get_model_roles('NonExistingModel')
+
+    @patch.object(FdmSwaggerParser, 'parse_spec_stream')
+    def test_get_model_name_by_type(self, parse_spec_stream_mock):
+        self.connection_mock.send.return_value = self._connection_response(None)
+        parse_spec_stream_mock.return_value = {
+            SpecProp.MODELS: {'NetworkObject': {}, 'SecurityZone': {}}
+        }
+
+        assert 'NetworkObject' == self.ftd_plugin.get_model_name_by_type('networkobject')
+        assert 'SecurityZone' == self.ftd_plugin.get_model_name_by_type('securityzone')
+        assert self.ftd_plugin.get_model_name_by_type('unknownobject') is None
+
+    @patch.object(FdmSwaggerParser, 'parse_spec_stream')
+    def test_api_spec_should_raise_exception_when_spec_download_fails(self, parse_spec_stream_mock):
+        self.connection_mock.send.side_effect = HTTPError('http://testhost.com', 500, '', {},
+                                                          StringIO('{"errorMessage": "ERROR"}'))
+
+        with self.assertRaises(ConnectionError) as res:
+            self.ftd_plugin.get_operation_spec('testOp')
+
+        assert 'Failed to download API specification. Status code: 500' in str(res.exception)
+        parse_spec_stream_mock.assert_not_called()
+
+    @patch.object(FdmSwaggerParser, 'parse_spec_stream')
+    def test_api_spec_should_be_loaded_from_cache_for_known_build(self, parse_spec_stream_mock):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        parse_spec_stream_mock.return_value = {
+            SpecProp.MODELS: {},
+            SpecProp.OPERATIONS: {'testOp': {'modelName': 'TestModel', 'url': '/test'}},
+            SpecProp.MODEL_OPERATIONS: {'TestModel': {'testOp': {'modelName': 'TestModel', 'url': '/test'}}}
+        }
+        self.connection_mock.send.side_effect = self._device_responses({'swagger': '2.0'}, '6.4.0')
+        self.ftd_plugin.hostvars['token_path'] = TOKEN_PATH_TEMPLATE.format('v2')
+        self.ftd_plugin.hostvars['spec_cache_dir'] = cache_dir
+
+        assert {'modelName': 'TestModel', 'url': '/test'} == self.ftd_plugin.get_operation_spec('testOp')
+        assert parse_spec_stream_mock.call_count == 1
+
+        other_plugin = FakeFtdHttpApiPlugin(self.connection_mock)
+        other_plugin.hostvars = self.ftd_plugin.hostvars
+        self.connection_mock.send.reset_mock()
+
+        assert {'modelName': 'TestModel', 'url': '/test'} == other_plugin.get_operation_spec('testOp')
+        assert parse_spec_stream_mock.call_count == 1
+        self.connection_mock.send.assert_called_once_with(SYSTEM_INFO_PATH_TEMPLATE.format('v2'), None,
+                                                          method=HTTPMethod.GET, headers=BASE_HEADERS)
+
+    @patch.object(FdmSwaggerParser, 'parse_spec_stream')
+    def test_spec_rpc_results_should_be_json_serializable_when_spec_is_loaded_from_cache(self, parse_spec_stream_mock):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        operation = {'method': HTTPMethod.POST, 'url': '/test', 'modelName': 'TestModel'}
+        parse_spec_stream_mock.return_value = {
+            SpecProp.MODELS: {'TestModel': {'type': 'object', 'properties': {'name': {'type': 'string'}}}},
+            SpecProp.OPERATIONS: {'addTest': operation},
+            SpecProp.MODEL_OPERATIONS: {'TestModel': {'addTest': operation}}
+        }
+        self.connection_mock.send.side_effect = self._device_responses({'swagger': '2.0'}, '6.4.0')
+        self.ftd_plugin.hostvars['token_path'] = TOKEN_PATH_TEMPLATE.format('v2')
+        self.ftd_plugin.hostvars['spec_cache_dir'] = cache_dir
+        self.ftd_plugin.get_operation_spec('addTest')
+
+        other_plugin = FakeFtdHttpApiPlugin(self.connection_mock)
+        other_plugin.hostvars = self.ftd_plugin.hostvars
+        results = [
+            other_plugin.get_operation_specs_by_model_name('TestModel'),
+            other_plugin.get_operation_spec('addTest'),
+            other_plugin.get_model_spec('TestModel'),
+            other_plugin.get_model_roles('TestModel')
+        ]
+
+        # results of RPC methods are sent to the module as JSON
+        assert {'addTest': operation} == json.loads(json.dumps(results[0]))
+        assert operation == json.loads(json.dumps(results[1]))
+        json.dumps(results[2:])
+        assert parse_spec_stream_mock.call_count == 1
+
+    @patch.object(FdmSwaggerParser, 'parse_spec_stream')
+    def test_api_spec_should_be_downloaded_when_cache_entry_is_corrupted(self, parse_spec_stream_mock):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        parse_spec_stream_mock.return_value = {
+            SpecProp.MODELS: {},
+            SpecProp.OPERATIONS: {'testOp': {'modelName': None}},
+            SpecProp.MODEL_OPERATIONS: {None: {'testOp': {'modelName': None}}}
+        }
+        self.connection_mock.send.side_effect = self._device_responses({'swagger': '2.0'}, '6.4.0')
+        self.ftd_plugin.hostvars['token_path'] = TOKEN_PATH_TEMPLATE.format('v2')
+        self.ftd_plugin.hostvars['spec_cache_dir'] = cache_dir
+        self.ftd_plugin.get_operation_spec('testOp')
+
+        spec_files = os.listdir(os.path.join(cache_dir, 'specs'))
+        assert 1 == len(spec_files)
+        with open(os.path.join(cache_dir, 'specs', spec_files[0]), 'wb') as f:
+            f.write(b'corrupted')
+
+        other_plugin = FakeFtdHttpApiPlugin(self.connection_mock)
+        other_plugin.hostvars = self.ftd_plugin.hostvars
+
+        assert {'modelName': None} == other_plugin.get_operation_spec('testOp')
+        assert parse_spec_stream_mock.call_count == 2
+        self.connection_mock.send.assert_any_call('/testSpecUrl', None, method=HTTPMethod.GET, headers=BASE_HEADERS)
+
+    @patch.object(FdmSwaggerParser, 'parse_spec_stream')
+    def test_api_spec_should_be_downloaded_when_build_version_is_unknown(self, parse_spec_stream_mock):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        parse_spec_stream_mock.return_value = {
+            SpecProp.MODELS: {},
+            SpecProp.OPERATIONS: {'testOp': {'url': '/test'}},
+            SpecProp.MODEL_OPERATIONS: {}
+        }
+        self.connection_mock.send.return_value = self._connection_response({'swagger': '2.0'})
+        self.ftd_plugin.hostvars['spec_cache_dir'] = cache_dir
+
+        assert {'url': '/test'} == self.ftd_plugin.get_operation_spec('testOp')
+        self.connection_mock.send.assert_called_once_with('/testSpecUrl', None, method=HTTPMethod.GET,
+                                                          headers=BASE_HEADERS)
+
+    @patch.object(FdmSwaggerParser, 'parse_spec_stream')
+    def test_api_spec_should_be_loaded_from_spec_file(self, parse_spec_stream_mock):
+        spec_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spec_dir)
+        spec_file = os.path.join(spec_dir, 'ngfw.json')
+        with open(spec_file, 'wb') as f:
+            f.write(b'{"swagger": "2.0"}')
+
+        def parse_spec_stream(spec_stream):
+            assert b'{"swagger": "2.0"}' == spec_stream.read()
+            return {SpecProp.MODELS: {}, SpecProp.OPERATIONS: {'testOp': 'spec'}}
+
+        parse_spec_stream_mock.side_effect = parse_spec_stream
+        self.ftd_plugin.hostvars['spec_file'] = spec_file
+
+        assert 'spec' == self.ftd_plugin.get_operation_spec('testOp')
+        assert parse_spec_stream_mock.call_count == 1
+        self.connection_mock.send.assert_not_called()
+
+    def test_api_spec_should_raise_exception_when_spec_is_invalid(self):
+        self.connection_mock.send.return_value = self._connection_response('{"swagger": "2.0", "paths": {')
+
+        with self.assertRaises(ConnectionError) as res:
+            self.ftd_plugin.get_operation_spec('testOp')
+
+        assert 'Invalid API specification' in str(res.exception)
+
+    def _device_responses(self, spec, build_version):
+        def send(url, data, **kwargs):
+            if url == '/testSpecUrl':
+                return self._connection_response(spec)
+            return self._connection_response({'databaseInfo': {'buildVersion': build_version}})
+
+        return send
+
     @staticmethod
     def _connection_response(response, status=200):
         response_mock = mock.Mock()
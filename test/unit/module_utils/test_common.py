@@ -16,7 +16,15 @@
 # along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-from module_utils.common import equal_objects, delete_ref_duplicates, construct_ansible_facts
+import random
+from collections import OrderedDict
+
+from ansible.module_utils._text import to_text
+from ansible.module_utils.common.collections import is_string
+
+from module_utils.common import equal_objects, delete_ref_duplicates, construct_ansible_facts, equal_values, \
+    equal_dicts, is_object_ref, object_diff, NON_COMPARABLE_PROPERTIES
+from module_utils.fdm_swagger_client import ComparisonSchema
 
 
 # simple objects
@@ -288,6 +296,205 @@ def test_equal_objects_return_true_with_reference_list_containing_duplicates():
     )
 
 
+# comparison of random objects with the straightforward recursive implementation
+
+def _reference_equal_values(v1, v2, compare_by_reference=True):
+    if is_string(v1) and is_string(v2):
+        return to_text(v1) == to_text(v2)
+    if type(v1) is not type(v2):
+        return False
+    if type(v1) is list:
+        return len(v1) == len(v2) and all(_reference_equal_values(i1, i2) for i1, i2 in zip(v1, v2))
+    if type(v1) is dict:
+        if compare_by_reference and is_object_ref(v1) and is_object_ref(v2):
+            return v1['id'] == v2['id'] and v1['type'] == v2['type']
+        return len(v1) == len(v2) and all(k in v2 and _reference_equal_values(v, v2[k]) for k, v in v1.items())
+    return v1 == v2
+
+
+def _reference_delete_ref_duplicates(d):
+    def delete_from_list(refs):
+        if all(type(i) is dict and is_object_ref(i) for i in refs):
+            return list(OrderedDict(((i['id'], i['type']), i) for i in refs).values())
+        return refs
+
+    if not d:
+        return d
+    modified_d = {}
+    for k, v in d.items():
+        if type(v) is list:
+            modified_d[k] = delete_from_list(v)
+        elif type(v) is dict:
+            modified_d[k] = _reference_delete_ref_duplicates(v)
+        else:
+            modified_d[k] = v
+    return modified_d
+
+
+def _reference_equal_objects(d1, d2, compare_common_fields_only):
+    common_keys = set(d1) & set(d2) if compare_common_fields_only else None
+
+    def prepare(d):
+        d = _reference_delete_ref_duplicates(
+            dict((k, v) for k, v in d.items() if k not in NON_COMPARABLE_PROPERTIES and v))
+        return dict((k, v) for k, v in d.items() if k in common_keys) if common_keys else d
+
+    return _reference_equal_values(prepare(d1), prepare(d2), compare_by_reference=False)
+
+
+class RandomObjectGenerator(object):
+    SCALARS = [0, 1, 1.0, True, 'a', u'a', b'a', '1', '', None]
+    KEYS = ['foo', 'bar', 'baz', 'id', 'version']
+
+    def __init__(self, seed):
+        self._random = random.Random(seed)
+
+    def object(self, depth=0):
+        return dict((k, self.value(depth)) for k in self._random.sample(self.KEYS, self._random.randint(0, 4)))
+
+    def value(self, depth):
+        choice = self._random.random()
+        if depth > 3 or choice < 0.4:
+            return self._random.choice(self.SCALARS)
+        elif choice < 0.6:
+            return [self.ref() for _ in range(self._random.randint(0, 3))]
+        elif choice < 0.7:
+            return self.ref()
+        elif choice < 0.85:
+            return [self.value(depth + 1) for _ in range(self._random.randint(0, 2))]
+        return self.object(depth + 1)
+
+    def ref(self):
+        return {'id': self._random.choice(['1', '2']), 'type': self._random.choice(['network', 'port']),
+                'name': self._random.choice(['foo', 'bar'])}
+
+    def object_pair(self):
+        d1 = self.object()
+        d2 = dict(d1) if self._random.random() < 0.7 else self.object()
+        if d2 and self._random.random() < 0.7:
+            d2[self._random.choice(list(d2))] = self.value(1)
+        return d1, d2
+
+
+def test_comparison_matches_recursive_implementation_on_random_objects():
+    generator = RandomObjectGenerator(seed=42)
+    equal_count = 0
+    for _ in range(5000):
+        d1, d2 = generator.object_pair()
+        for compare_common_fields_only in (True, False):
+            expected = _reference_equal_objects(d1, d2, compare_common_fields_only)
+            assert expected == equal_objects(d1, d2, compare_common_fields_only), (d1, d2)
+            equal_count += expected
+        assert _reference_equal_values(d1, d2) == equal_values(d1, d2), (d1, d2)
+        assert _reference_equal_values(d1, d2, False) == equal_dicts(d1, d2, False), (d1, d2)
+        # a schema without special fields does not change verdicts
+        assert _reference_equal_objects(d1, d2, True) == equal_objects(d1, d2, schema=ComparisonSchema())
+        # the diff is empty exactly when the objects are equal
+        for compare_common_fields_only in (True, False):
+            assert (not object_diff(d1, d2, compare_common_fields_only)) == \
+                equal_objects(d1, d2, compare_common_fields_only), (d1, d2)
+        assert (not object_diff(d1, d2, schema=_access_rule_schema())) == \
+            equal_objects(d1, d2, schema=_access_rule_schema()), (d1, d2)
+
+    # the corpus must contain both equal and different objects to be meaningful
+    assert 1000 < equal_count < 9000
+
+
+def test_equal_values_compares_deeply_nested_values_without_recursion():
+    v1, v2 = [], []
+    for _ in range(5000):
+        v1, v2 = [v1, {'foo': 1}], [v2, {'foo': 1}]
+
+    assert equal_values(v1, v2)
+    v2[1]['foo'] = 2
+    assert not equal_values(v1, v2)
+
+
+# schema-aware comparison
+
+def _access_rule_schema():
+    url_filter_schema = ComparisonSchema()
+    url_filter_schema.unordered_fields.add('urlObjects')
+    url_filter_schema.defaults['type'] = 'embeddedurlfilter'
+    schema = ComparisonSchema()
+    schema.unordered_fields.update(['sourceNetworks', 'destinationNetworks'])
+    schema.defaults.update({'type': 'accessrule', 'eventLogAction': 'LOG_NONE'})
+    schema.nested['urlFilter'] = url_filter_schema
+    return schema
+
+
+def test_equal_objects_with_schema_ignore_order_of_references():
+    existing_rule = {
+        'name': 'rule',
+        'sourceNetworks': [{'id': '1', 'type': 'network'}, {'id': '2', 'type': 'network'}],
+        'urlFilter': {'urlObjects': [{'id': '3', 'type': 'url'}, {'id': '4', 'type': 'url'}]},
+        'sourcePorts': [{'id': '5', 'type': 'port'}, {'id': '6', 'type': 'port'}]
+    }
+    rule = {
+        'name': 'rule',
+        'sourceNetworks': [{'id': '2', 'type': 'network'}, {'id': '1', 'type': 'network'},
+                           {'id': '2', 'type': 'network'}],
+        'urlFilter': {'urlObjects': [{'id': '4', 'type': 'url'}, {'id': '3', 'type': 'url'}]},
+        'sourcePorts': [{'id': '5', 'type': 'port'}, {'id': '6', 'type': 'port'}]
+    }
+
+    assert not equal_objects(existing_rule, rule)
+    assert equal_objects(existing_rule, rule, schema=_access_rule_schema())
+
+    rule['sourcePorts'].reverse()
+    assert not equal_objects(existing_rule, rule, schema=_access_rule_schema())
+
+    rule['sourcePorts'].reverse()
+    rule['sourceNetworks'][0]['id'] = '3'
+    assert not equal_objects(existing_rule, rule, schema=_access_rule_schema())
+
+
+def test_equal_objects_with_schema_treat_default_values_as_missing():
+    existing_rule = {'name': 'rule', 'type': 'accessrule', 'eventLogAction': 'LOG_NONE',
+                     'urlFilter': {'type': 'embeddedurlfilter', 'urlObjects': []}}
+    rule = {'name': 'rule', 'eventLogAction': None, 'urlFilter': {'urlObjects': []}}
+
+    assert not equal_objects(existing_rule, rule)
+    assert equal_objects(existing_rule, rule, schema=_access_rule_schema())
+
+    rule['eventLogAction'] = 'LOG_BOTH'
+    assert not equal_objects(existing_rule, rule, schema=_access_rule_schema())
+
+
+def test_object_diff_returns_paths_of_changed_values():
+    existing_obj = {'id': '1', 'version': 'a', 'name': 'rule', 'action': 'PERMIT', 'description': 'foo',
+                    'urlFilter': {'urlCategories': [{'urlCategory': 'news'}, {'urlCategory': 'sports'}]}}
+    obj = {'name': 'rule', 'action': 'DENY', 'logFiles': True,
+           'urlFilter': {'urlCategories': [{'urlCategory': 'news'}, {'urlCategory': 'games'}]}}
+
+    assert [
+        {'path': 'action', 'before': 'PERMIT', 'after': 'DENY'},
+        {'path': 'urlFilter.urlCategories[1].urlCategory', 'before': 'sports', 'after': 'games'}
+    ] == object_diff(existing_obj, obj)
+    assert [
+        {'path': 'action', 'before': 'PERMIT', 'after': 'DENY'},
+        {'path': 'description', 'before': 'foo', 'after': None},
+        {'path': 'logFiles', 'before': None, 'after': True},
+        {'path': 'urlFilter.urlCategories[1].urlCategory', 'before': 'sports', 'after': 'games'}
+    ] == object_diff(existing_obj, obj, compare_common_fields_only=False)
+    assert [] == object_diff(existing_obj, dict(obj, action='PERMIT', urlFilter=existing_obj['urlFilter']))
+
+
+def test_object_diff_returns_added_and_removed_references():
+    existing_rule = {'name': 'rule', 'type': 'accessrule',
+                     'sourceNetworks': [{'id': '1', 'type': 'network'}, {'id': '2', 'type': 'network', 'name': 'b'}],
+                     'sourcePorts': [{'id': '5', 'type': 'port'}, {'id': '6', 'type': 'port'}]}
+    rule = {'name': 'rule', 'eventLogAction': 'LOG_NONE',
+            'sourceNetworks': [{'id': '3', 'type': 'network'}, {'id': '1', 'type': 'network'}],
+            'sourcePorts': [{'id': '6', 'type': 'port'}, {'id': '5', 'type': 'port'}]}
+
+    assert [
+        {'path': 'sourceNetworks', 'added': [{'id': '3', 'type': 'network'}],
+         'removed': [{'id': '2', 'type': 'network', 'name': 'b'}]},
+        {'path': 'sourcePorts', 'before': existing_rule['sourcePorts'], 'after': rule['sourcePorts']}
+    ] == object_diff(existing_rule, rule, compare_common_fields_only=False, schema=_access_rule_schema())
+
+
 def test_delete_ref_duplicates_with_none():
     assert delete_ref_duplicates(None) is None
 
@@ -374,6 +581,31 @@ def test_delete_ref_duplicates_with_object_containing_duplicate_refs_in_nested_o
     } == delete_ref_duplicates(data)
 
 
+def test_delete_ref_duplicates_returns_given_object_without_duplicates():
+    refs = [{'id': str(i), 'type': 'networkobject'} for i in range(5)]
+    data = {'name': 'foo', 'refs': refs, 'nested': {'refs': list(refs), 'values': [1, 1]}}
+
+    assert delete_ref_duplicates(data) is data
+
+
+def test_delete_ref_duplicates_copies_only_changed_values():
+    nested = {'refs': [{'id': '1', 'type': 'networkobject'}]}
+    data = {'nested': nested, 'refs': [{'id': '1', 'type': 'foo'}, {'id': '1', 'type': 'foo', 'name': 'last'}]}
+
+    result = delete_ref_duplicates(data)
+
+    assert {'nested': nested, 'refs': [{'id': '1', 'type': 'foo', 'name': 'last'}]} == result
+    assert result['nested'] is nested
+    assert 2 == len(data['refs'])
+
+
+def test_delete_ref_duplicates_matches_reference_implementation_on_random_objects():
+    generator = RandomObjectGenerator(seed=7)
+    for _ in range(2000):
+        obj = generator.object()
+        assert _reference_delete_ref_duplicates(obj) == delete_ref_duplicates(obj)
+
+
 def test_construct_ansible_facts_should_make_default_fact_with_name_and_type():
     response = {
         'id': '123',
@@ -20,20 +20,31 @@ import json
 import unittest
 
 import pytest
+from ansible.module_utils.connection import ConnectionError
 from units.compat import mock
 from units.compat.mock import call, patch
 
 from module_utils.configuration import iterate_over_pageable_resource, BaseConfigurationResource, \
-    OperationChecker, OperationNamePrefix, ParamName, QueryParams
+    OperationChecker, OperationNamePrefix, ParamName, QueryParams, FtdInvalidOperationNameError, \
+    serialize_operation_error, raise_operation_error, MetricName, MAX_ADAPTIVE_PAGE_SIZE, get_total_items_count, \
+    PageRequestParams, MULTIPLE_DUPLICATES_FOUND_ERROR
 
 try:
-    from ansible.module_utils.common import HTTPMethod, FtdUnexpectedResponse
+    from ansible.module_utils.common import HTTPMethod, FtdUnexpectedResponse, FtdServerError, \
+        FtdConfigurationError
     from ansible.module_utils.fdm_swagger_client import ValidationError, OperationField
 except ImportError:
-    from module_utils.common import HTTPMethod, FtdUnexpectedResponse
+    from module_utils.common import HTTPMethod, FtdUnexpectedResponse, FtdServerError, FtdConfigurationError
     from module_utils.fdm_swagger_client import ValidationError, OperationField
 
 
+INTERFACE_FILTER_DESCRIPTION = (
+    'The criteria used to filter the models you are requesting. It should have the following format: '
+    '{key}{operator}{value}[;{key}{operator}{value}]. Supported operators are: "!"(not equals), ":"(equals), '
+    '"~"(similar). Supported keys are: "name", "hardwareName", "fts".'
+)
+
+
 class TestBaseConfigurationResource(object):
     @pytest.fixture
     def connection_mock(self, mocker):
@@ -42,6 +53,9 @@ class TestBaseConfigurationResource(object):
         connection_instance.validate_data.return_value = True, None
         connection_instance.validate_query_params.return_value = True, None
         connection_instance.validate_path_params.return_value = True, None
+        connection_instance.validate_request.return_value = {}
+        # operation roles are derived from model operations, as with older connection plugins
+        connection_instance.get_model_roles.side_effect = ConnectionError('Method not found', code=-32601)
 
         return connection_instance
 
@@ -172,7 +186,7 @@ class TestBaseConfigurationResource(object):
                 }
             ]
         }
-        connection_mock.validate_data.return_value = (False, json.dumps(report, sort_keys=True, indent=4))
+        connection_mock.validate_request.return_value = {'data': json.dumps(report, sort_keys=True, indent=4)}
 
         with pytest.raises(ValidationError) as e_info:
             resource = BaseConfigurationResource(connection_mock, False)
@@ -200,7 +214,9 @@ class TestBaseConfigurationResource(object):
                 }
             ]
         }
-        connection_mock.validate_query_params.return_value = (False, json.dumps(report, sort_keys=True, indent=4))
+        connection_mock.validate_request.return_value = {
+            'query_params': json.dumps(report, sort_keys=True, indent=4)
+        }
 
         with pytest.raises(ValidationError) as e_info:
             resource = BaseConfigurationResource(connection_mock, False)
@@ -231,7 +247,9 @@ class TestBaseConfigurationResource(object):
                 ]
             }
         }
-        connection_mock.validate_path_params.return_value = (False, json.dumps(report, sort_keys=True, indent=4))
+        connection_mock.validate_request.return_value = {
+            'path_params': json.dumps(report, sort_keys=True, indent=4)
+        }
 
         with pytest.raises(ValidationError) as e_info:
             resource = BaseConfigurationResource(connection_mock, False)
@@ -249,6 +267,34 @@ class TestBaseConfigurationResource(object):
                 'required': ['objects[0].type']}}}
 
     def test_module_should_fail_if_validation_error_in_all_params(self, connection_mock):
+        connection_mock.get_operation_spec.return_value = {'method': HTTPMethod.PUT, 'url': '/test'}
+        connection_mock.validate_request.return_value = {
+            'data': 'data report',
+            'path_params': 'path params report',
+            'query_params': 'query params report'
+        }
+
+        with pytest.raises(ValidationError) as e_info:
+            resource = BaseConfigurationResource(connection_mock, False)
+            resource.crud_operation('putTest', {'data': {'name': 'test'}, 'path_params': {'objId': '1'}})
+
+        assert {
+            'Invalid data provided': 'data report',
+            'Invalid path_params provided': 'path params report',
+            'Invalid query_params provided': 'query params report'
+        } == e_info.value.args[0]
+        connection_mock.validate_request.assert_called_once_with('putTest', {'name': 'test'}, {}, {'objId': '1'})
+        connection_mock.validate_data.assert_not_called()
+
+    def test_validate_params_should_fail_when_validation_request_fails(self, connection_mock):
+        connection_mock.get_operation_spec.return_value = {'method': HTTPMethod.PUT, 'url': '/test'}
+        connection_mock.validate_request.side_effect = ConnectionError('Internal error', code=-32603)
+
+        with pytest.raises(ConnectionError):
+            BaseConfigurationResource(connection_mock, False).validate_params('putTest', {})
+
+    def test_module_should_fail_if_validation_error_in_all_params_with_old_connection_plugin(self, connection_mock):
+        connection_mock.validate_request.side_effect = ConnectionError('Method not found', code=-32601)
         connection_mock.get_operation_spec.return_value = {'method': HTTPMethod.POST, 'url': '/test'}
         report = {
             'data': {
@@ -317,6 +363,19 @@ class TestBaseConfigurationResource(object):
                 'invalid_type': [{'actually_value': 'test', 'expected_type': 'integer', 'path': 'f_integer'}],
                 'required': ['other_param']}}
 
+    def test_validate_params_should_not_use_batched_validation_after_method_not_found(self, connection_mock):
+        connection_mock.get_operation_spec.return_value = {'method': HTTPMethod.GET, 'url': '/test'}
+        connection_mock.validate_request.side_effect = ConnectionError('Method not found', code=-32601)
+        resource = BaseConfigurationResource(connection_mock, False)
+
+        resource.validate_params('getTest', {})
+        resource.validate_params('getTest', {'query_params': {'limit': 1}})
+
+        connection_mock.validate_request.assert_called_once_with('getTest', {}, {}, {})
+        assert connection_mock.validate_query_params.call_count == 2
+        connection_mock.validate_query_params.assert_called_with('getTest', {'limit': 1})
+        connection_mock.validate_data.assert_not_called()
+
     @pytest.mark.parametrize("test_api_version, expected_result",
                              [
                                  ("6.2.3", "name:object_name"),
@@ -337,6 +396,364 @@ class TestBaseConfigurationResource(object):
             assert resource._stringify_name_filter(filters) == expected_result, "Unexpected result for version %s" % (
                 test_api_version)
 
+    @patch.object(BaseConfigurationResource, '_send_request')
+    def test_get_objects_by_filter_uses_page_size_from_params(self, send_request_mock, connection_mock):
+        send_request_mock.side_effect = [{'items': [{'name': 'obj1'}]}]
+        connection_mock.get_operation_spec.return_value = {'method': HTTPMethod.GET, 'url': '/object/'}
+        resource = BaseConfigurationResource(connection_mock, False, page_size=50)
+
+        assert [{'name': 'obj1'}] == list(resource.get_objects_by_filter('test', {ParamName.PAGE_SIZE: 100}))
+        send_request_mock.assert_called_once_with('/object/', 'get', {}, {}, {'limit': 100, 'offset': 0})
+        assert {MetricName.PAGES_FETCHED: 1, MetricName.OBJECTS_FETCHED: 1, MetricName.SERVER_FILTERS: []} == \
+            resource.metrics
+
+    @patch.object(BaseConfigurationResource, '_send_request')
+    def test_get_objects_by_filter_uses_page_size_of_resource(self, send_request_mock, connection_mock):
+        send_request_mock.side_effect = [{'items': [{'name': 'obj1'}] * 50}, {'items': []}]
+        connection_mock.get_operation_spec.return_value = {'method': HTTPMethod.GET, 'url': '/object/'}
+        resource = BaseConfigurationResource(connection_mock, False, page_size=50)
+
+        assert 50 == len(list(resource.get_objects_by_filter('test', {ParamName.PAGE_SIZE: None})))
+        send_request_mock.assert_has_calls([
+            mock.call('/object/', 'get', {}, {}, {'limit': 50, 'offset': 0}),
+            mock.call('/object/', 'get', {}, {}, {'limit': 50, 'offset': 50})
+        ])
+        assert {MetricName.PAGES_FETCHED: 2, MetricName.OBJECTS_FETCHED: 50, MetricName.SERVER_FILTERS: []} == \
+            resource.metrics
+
+    @patch.object(BaseConfigurationResource, '_send_request')
+    def test_get_objects_by_filter_uses_adaptive_paging_from_params(self, send_request_mock, connection_mock):
+        send_request_mock.side_effect = [{'items': [{'name': 'obj1'}] * 10}, {'items': []}]
+        connection_mock.get_operation_spec.return_value = {'method': HTTPMethod.GET, 'url': '/object/'}
+        resource = BaseConfigurationResource(connection_mock, False, adaptive_paging=False)
+
+        list(resource.get_objects_by_filter('test', {ParamName.ADAPTIVE_PAGING: True}))
+
+        send_request_mock.assert_has_calls([
+            mock.call('/object/', 'get', {}, {}, {'limit': 10, 'offset': 0}),
+            mock.call('/object/', 'get', {}, {}, {'limit': 20, 'offset': 10})
+        ])
+
+    def test_get_objects_by_filter_raises_error_when_page_size_is_invalid(self, connection_mock):
+        resource = BaseConfigurationResource(connection_mock, False)
+
+        with pytest.raises(FtdConfigurationError) as ex:
+            list(resource.get_objects_by_filter('test', {ParamName.PAGE_SIZE: 0}))
+        assert 'Page size must be a positive integer, got 0' == ex.value.msg
+
+    @patch.object(BaseConfigurationResource, '_send_request')
+    def test_get_objects_by_filter_does_not_fetch_unstable_lists_concurrently(self, send_request_mock,
+                                                                              connection_mock):
+        send_request_mock.side_effect = [
+            {'items': [{'name': 'job1'}], 'paging': {'count': 2, 'next': ['/jobs?offset=1']}},
+            {'items': [{'name': 'job2'}], 'paging': {'count': 2, 'next': []}}
+        ]
+        connection_mock.get_operation_spec.return_value = {'method': HTTPMethod.GET, 'url': '/api/fdm/v2/jobs'}
+        resource = BaseConfigurationResource(connection_mock, False, page_size=1, max_concurrent_pages=4)
+
+        with patch('module_utils.configuration.ThreadPool') as thread_pool_mock:
+            assert [{'name': 'job1'}, {'name': 'job2'}] == list(resource.get_objects_by_filter('test', {}))
+        thread_pool_mock.assert_not_called()
+
+    @patch.object(BaseConfigurationResource, '_fetch_system_info')
+    @patch.object(BaseConfigurationResource, '_send_request')
+    def test_get_objects_by_filter_applies_supported_filters_on_server(self, send_request_mock, fetch_system_info_mock,
+                                                                       connection_mock):
+        send_request_mock.return_value = {'items': [
+            {'name': 'eth0', 'hardwareName': 'GigabitEthernet0/1', 'mode': 'ROUTED'},
+            {'name': 'eth0', 'hardwareName': 'GigabitEthernet0/1', 'mode': 'PASSIVE'}
+        ]}
+        fetch_system_info_mock.return_value = {'databaseInfo': {'buildVersion': '6.4.0'}}
+        connection_mock.get_operation_spec.return_value = {
+            'method': HTTPMethod.GET,
+            'url': '/interfaces',
+            'modelName': 'PhysicalInterface',
+            'parameters': {'query': {'filter': {'type': 'string', 'description': INTERFACE_FILTER_DESCRIPTION}}}
+        }
+        resource = BaseConfigurationResource(connection_mock, False)
+
+        objects = list(resource.get_objects_by_filter('getPhysicalInterfaceList', {ParamName.FILTERS: {
+            'name': 'eth0', 'hardwareName': 'GigabitEthernet0/1', 'mode': 'ROUTED'
+        }}))
+
+        assert [{'name': 'eth0', 'hardwareName': 'GigabitEthernet0/1', 'mode': 'ROUTED'}] == objects
+        send_request_mock.assert_called_once_with('/interfaces', 'get', {}, {}, {
+            QueryParams.FILTER: 'fts~eth0;hardwareName:GigabitEthernet0/1', 'limit': 10, 'offset': 0
+        })
+        assert ['hardwareName', 'name'] == resource.metrics[MetricName.SERVER_FILTERS]
+
+    def test_plan_server_filters(self, connection_mock):
+        connection_mock.get_operation_spec.return_value = {
+            'method': HTTPMethod.GET,
+            'url': '/interfaces',
+            'modelName': 'PhysicalInterface',
+            'parameters': {'query': {'filter': {'type': 'string', 'description': INTERFACE_FILTER_DESCRIPTION}}}
+        }
+        resource = BaseConfigurationResource(connection_mock, False)
+
+        assert {'name': 'foo', 'hardwareName': 'GigabitEthernet0/1'} == resource.plan_server_filters('test', {
+            'name': 'foo', 'hardwareName': 'GigabitEthernet0/1', 'subType': 'HOST'
+        })
+        assert {} == resource.plan_server_filters('test', {'name': 'foo;bar', 'hardwareName': {'id': '1'}})
+        assert {} == resource.plan_server_filters('test', {'name': True})
+
+    def test_plan_server_filters_derives_keys_from_model_when_spec_does_not_list_them(self, connection_mock):
+        connection_mock.get_operation_spec.return_value = {
+            'method': HTTPMethod.GET,
+            'url': '/interfaces',
+            'modelName': 'PhysicalInterface',
+            'parameters': {'query': {'filter': {'type': 'string'}}}
+        }
+        connection_mock.get_model_spec.return_value = {'properties': {
+            'name': {'type': 'string'},
+            'hardwareName': {'type': 'string'},
+            'mtu': {'type': 'integer'},
+            'mode': {'type': 'object', '$ref': '#/definitions/InterfaceModeType'},
+            'type': {'type': 'string'}
+        }}
+        resource = BaseConfigurationResource(connection_mock, False)
+
+        assert {'name': 'foo', 'hardwareName': 'GigabitEthernet0/1', 'mtu': 1500} == resource.plan_server_filters(
+            'test', {'name': 'foo', 'hardwareName': 'GigabitEthernet0/1', 'mtu': 1500, 'mode': 'ROUTED',
+                     'type': 'physicalinterface'}
+        )
+        connection_mock.get_model_spec.assert_called_once_with('PhysicalInterface')
+
+    def test_plan_server_filters_does_not_fetch_model_for_name_filter(self, connection_mock):
+        connection_mock.get_operation_spec.return_value = {
+            'method': HTTPMethod.GET,
+            'url': '/interfaces',
+            'modelName': 'PhysicalInterface',
+            'parameters': {'query': {'filter': {'type': 'string'}}}
+        }
+        resource = BaseConfigurationResource(connection_mock, False)
+
+        assert {'name': 'foo'} == resource.plan_server_filters('test', {'name': 'foo'})
+        connection_mock.get_model_spec.assert_not_called()
+
+    def test_plan_server_filters_when_operation_does_not_support_filter(self, connection_mock):
+        connection_mock.get_operation_spec.return_value = {
+            'method': HTTPMethod.GET,
+            'url': '/objects',
+            'modelName': 'NetworkObject',
+            'parameters': {'query': {'limit': {'type': 'integer'}}}
+        }
+        resource = BaseConfigurationResource(connection_mock, False)
+
+        assert {} == resource.plan_server_filters('test', {'name': 'foo'})
+
+    @patch.object(BaseConfigurationResource, '_fetch_system_info')
+    @patch.object(BaseConfigurationResource, '_send_request')
+    def test_get_objects_by_filter_falls_back_to_name_filter_when_server_rejects_filter(
+            self, send_request_mock, fetch_system_info_mock, connection_mock):
+        send_request_mock.side_effect = [
+            FtdServerError({'error': 'Unsupported filter key'}, 422),
+            {'items': [{'name': 'eth0', 'hardwareName': 'GigabitEthernet0/1'}]}
+        ]
+        fetch_system_info_mock.return_value = {'databaseInfo': {'buildVersion': '6.3.0'}}
+        connection_mock.get_operation_spec.return_value = {
+            'method': HTTPMethod.GET,
+            'url': '/interfaces',
+            'modelName': 'SubInterface',
+            'parameters': {'query': {'filter': {'type': 'string', 'description': INTERFACE_FILTER_DESCRIPTION}}}
+        }
+        resource = BaseConfigurationResource(connection_mock, False)
+
+        objects = list(resource.get_objects_by_filter('test', {ParamName.FILTERS: {
+            'name': 'eth0', 'hardwareName': 'GigabitEthernet0/1'
+        }}))
+
+        assert [{'name': 'eth0', 'hardwareName': 'GigabitEthernet0/1'}] == objects
+        send_request_mock.assert_has_calls([
+            mock.call('/interfaces', 'get', {}, {}, {
+                QueryParams.FILTER: 'name:eth0;hardwareName:GigabitEthernet0/1', 'limit': 10, 'offset': 0
+            }),
+            mock.call('/interfaces', 'get', {}, {}, {QueryParams.FILTER: 'name:eth0', 'limit': 10, 'offset': 0})
+        ])
+        assert ['name'] == resource.metrics[MetricName.SERVER_FILTERS]
+        # the operation is remembered, so that the rejected keys are not pushed again
+        assert {'name': 'eth0'} == resource.plan_server_filters('test', {
+            'name': 'eth0', 'hardwareName': 'GigabitEthernet0/1'
+        })
+
+    @patch.object(BaseConfigurationResource, '_fetch_system_info')
+    @patch.object(BaseConfigurationResource, '_send_request')
+    def test_find_object_by_name_stops_after_page_with_exact_match(self, send_request_mock, fetch_system_info_mock,
+                                                                   connection_mock):
+        send_request_mock.side_effect = [
+            {'items': [{'name': 'net-1'}, {'name': 'net-10'}], 'paging': {'count': 6, 'next': ['/objects?offset=2']}},
+            {'items': [{'name': 'net'}, {'name': 'net-11'}], 'paging': {'count': 6, 'next': ['/objects?offset=4']}},
+            {'items': [{'name': 'net-12'}, {'name': 'net-13'}], 'paging': {'count': 6, 'next': []}}
+        ]
+        fetch_system_info_mock.return_value = {'databaseInfo': {'buildVersion': '6.4.0'}}
+        connection_mock.get_operation_spec.return_value = {
+            'method': HTTPMethod.GET, 'url': '/objects', 'returnMultipleItems': True
+        }
+        connection_mock.get_operation_specs_by_model_name.return_value = {
+            'getObjectList': connection_mock.get_operation_spec.return_value
+        }
+        resource = BaseConfigurationResource(connection_mock, False, page_size=2)
+
+        obj = resource._find_object_matching_params('Object', {ParamName.DATA: {'name': 'net'}})
+
+        assert {'name': 'net'} == obj
+        assert 2 == send_request_mock.call_count
+        assert 4 == resource.metrics[MetricName.OBJECTS_FETCHED]
+
+    @patch.object(BaseConfigurationResource, '_fetch_system_info')
+    @patch.object(BaseConfigurationResource, '_send_request')
+    def test_find_object_by_name_detects_duplicates_within_page(self, send_request_mock, fetch_system_info_mock,
+                                                                connection_mock):
+        send_request_mock.return_value = {'items': [{'name': 'net', 'subType': 'HOST'},
+                                                    {'name': 'net', 'subType': 'NETWORK'}]}
+        fetch_system_info_mock.return_value = {'databaseInfo': {'buildVersion': '6.4.0'}}
+        connection_mock.get_operation_spec.return_value = {
+            'method': HTTPMethod.GET, 'url': '/objects', 'returnMultipleItems': True
+        }
+        connection_mock.get_operation_specs_by_model_name.return_value = {
+            'getObjectList': connection_mock.get_operation_spec.return_value
+        }
+        resource = BaseConfigurationResource(connection_mock, False)
+
+        with pytest.raises(FtdConfigurationError) as ex:
+            resource._find_object_matching_params('Object', {ParamName.DATA: {'name': 'net'}})
+        assert MULTIPLE_DUPLICATES_FOUND_ERROR == ex.value.msg
+
+    @patch.object(BaseConfigurationResource, '_send_request')
+    def test_edit_object_does_not_send_request_when_only_order_of_references_differs(self, send_request_mock,
+                                                                                     connection_mock):
+        operations = {
+            'getRule': {'method': HTTPMethod.GET, 'url': '/rules/{objId}', 'modelName': 'Rule',
+                        'returnMultipleItems': False},
+            'editRule': {'method': HTTPMethod.PUT, 'url': '/rules/{objId}', 'modelName': 'Rule'}
+        }
+        models = {
+            'Rule': {'type': 'object', 'properties': {
+                'networks': {'type': 'array', 'items': {'type': 'object', '$ref': '#/definitions/ReferenceModel'}},
+                'type': {'type': 'string', 'default': 'rule'}
+            }},
+            'ReferenceModel': {'type': 'object', 'properties': {}}
+        }
+        connection_mock.get_operation_spec.side_effect = operations.get
+        connection_mock.get_operation_specs_by_model_name.return_value = operations
+        connection_mock.get_model_spec.side_effect = models.get
+        existing_rule = {'id': '1', 'name': 'rule', 'type': 'rule',
+                         'networks': [{'id': 'a', 'type': 'network'}, {'id': 'b', 'type': 'network'}]}
+        send_request_mock.return_value = existing_rule
+        resource = BaseConfigurationResource(connection_mock, False)
+
+        result = resource.edit_object('editRule', {
+            ParamName.PATH_PARAMS: {'objId': '1'},
+            ParamName.DATA: {'name': 'rule',
+                             'networks': [{'id': 'b', 'type': 'network'}, {'id': 'a', 'type': 'network'}]}
+        })
+
+        assert existing_rule == result
+        send_request_mock.assert_called_once_with('/rules/{objId}', HTTPMethod.GET, {}, {'objId': '1'}, {})
+        assert not resource.config_changed
+        assert [] == resource.diff
+
+    @patch.object(BaseConfigurationResource, '_send_request')
+    def test_edit_object_saves_diff_with_existing_object(self, send_request_mock, connection_mock):
+        operations = {
+            'getRule': {'method': HTTPMethod.GET, 'url': '/rules/{objId}', 'modelName': 'Rule',
+                        'returnMultipleItems': False},
+            'editRule': {'method': HTTPMethod.PUT, 'url': '/rules/{objId}', 'modelName': 'Rule'}
+        }
+        connection_mock.get_operation_spec.side_effect = operations.get
+        connection_mock.get_operation_specs_by_model_name.return_value = operations
+        connection_mock.get_model_spec.return_value = None
+        existing_rule = {'id': '1', 'name': 'rule', 'action': 'PERMIT'}
+        edited_rule = {'id': '1', 'name': 'rule', 'action': 'DENY'}
+        send_request_mock.side_effect = [existing_rule, edited_rule]
+        resource = BaseConfigurationResource(connection_mock, False)
+
+        resource.edit_object('editRule', {
+            ParamName.PATH_PARAMS: {'objId': '1'},
+            ParamName.DATA: {'name': 'rule', 'action': 'DENY'}
+        })
+
+        send_request_mock.assert_called_with('/rules/{objId}', HTTPMethod.PUT, {'name': 'rule', 'action': 'DENY'},
+                                             {'objId': '1'}, {})
+        assert [{'path': 'action', 'before': 'PERMIT', 'after': 'DENY'}] == resource.diff
+
+    @patch('module_utils.configuration.time.time')
+    def test_check_expected_run_time_fails_when_requests_exceed_command_timeout(self, time_mock, connection_mock):
+        connection_mock.send_request.return_value = {'success': True, 'status_code': 200, 'response': {}}
+        # created at 0s, a request sent from 1s to 3s
+        time_mock.side_effect = [0, 1, 3, 10, 10]
+        resource = BaseConfigurationResource(connection_mock, False, command_timeout=30)
+        resource._send_request('/test', HTTPMethod.GET)
+
+        # 10s spent so far plus 10 requests taking 2s each
+        resource.check_expected_run_time(10)
+        with pytest.raises(FtdConfigurationError) as exc_info:
+            resource.check_expected_run_time(11)
+
+        assert exc_info.value.msg.startswith('The remaining requests are expected to take the operation about 32 '
+                                             'seconds, which exceeds the command timeout of the persistent '
+                                             'connection (30 seconds).')
+
+    def test_check_expected_run_time_passes_without_command_timeout(self, connection_mock):
+        connection_mock.send_request.return_value = {'success': True, 'status_code': 200, 'response': {}}
+        resource = BaseConfigurationResource(connection_mock, False)
+        resource._send_request('/test', HTTPMethod.GET)
+
+        resource.check_expected_run_time(1000000)
+
+    def test_get_model_name_by_type_is_cached(self, connection_mock):
+        connection_mock.get_model_name_by_type.return_value = 'NetworkObject'
+        resource = BaseConfigurationResource(connection_mock, False)
+
+        assert 'NetworkObject' == resource.get_model_name_by_type('networkobject')
+        assert 'NetworkObject' == resource.get_model_name_by_type('networkobject')
+        connection_mock.get_model_name_by_type.assert_called_once_with('networkobject')
+
+    def test_get_model_name_by_type_returns_none_when_connection_cannot_look_models_up(self, connection_mock):
+        connection_mock.get_model_name_by_type.side_effect = ConnectionError('Method not found', code=-32601)
+        resource = BaseConfigurationResource(connection_mock, False)
+
+        assert resource.get_model_name_by_type('networkobject') is None
+        assert resource.get_model_name_by_type('securityzone') is None
+        connection_mock.get_model_name_by_type.assert_called_once_with('networkobject')
+
+    @patch.object(BaseConfigurationResource, '_send_request')
+    def test_get_system_info_uses_information_cached_by_connection(self, send_request_mock, connection_mock):
+        connection_mock.get_system_information.return_value = {'databaseInfo': {'buildVersion': '6.4.0'}}
+        resource = BaseConfigurationResource(connection_mock, True)
+
+        assert {'databaseInfo': {'buildVersion': '6.4.0'}} == resource.get_system_info()
+        assert '6.4.0' == resource.get_build_version()
+        connection_mock.get_system_information.assert_called_once_with()
+        send_request_mock.assert_not_called()
+
+    @patch.object(BaseConfigurationResource, '_send_request')
+    def test_get_system_info_sends_request_when_connection_does_not_cache_it(self, send_request_mock,
+                                                                             connection_mock):
+        connection_mock.get_system_information.side_effect = ConnectionError('Method not found', code=-32601)
+        connection_mock.get_operation_spec.return_value = {'method': HTTPMethod.GET, 'url': '/systeminfo/{objId}'}
+        send_request_mock.return_value = {'databaseInfo': {'buildVersion': '6.3.0'}}
+        resource = BaseConfigurationResource(connection_mock, False)
+
+        assert '6.3.0' == resource.get_build_version()
+        assert {'databaseInfo': {'buildVersion': '6.3.0'}} == resource.get_system_info()
+        send_request_mock.assert_called_once_with('/systeminfo/{objId}', HTTPMethod.GET, {}, {'objId': 'default'},
+                                                  {})
+        connection_mock.get_operation_spec.assert_called_once_with('getSystemInformation')
+
+    @patch.object(BaseConfigurationResource, '_send_request')
+    def test_start_upgrade_drops_system_info(self, send_request_mock, connection_mock):
+        connection_mock.get_system_information.side_effect = [{'softwareVersion': '6.3.0'},
+                                                              {'softwareVersion': '6.4.0'}]
+        connection_mock.get_operation_spec.return_value = {'method': HTTPMethod.POST, 'url': '/action/upgrade'}
+        send_request_mock.return_value = {}
+        resource = BaseConfigurationResource(connection_mock, False)
+
+        assert {'softwareVersion': '6.3.0'} == resource.get_system_info()
+        resource.send_general_request('startUpgrade', {})
+
+        assert {'softwareVersion': '6.4.0'} == resource.get_system_info()
+
 
 class TestIterateOverPageableResource(object):
 
@@ -438,6 +855,333 @@ class TestIterateOverPageableResource(object):
             call(params={'query_params': {'offset': '1', 'limit': '1'}})
         ])
 
+    def test_iterate_over_pageable_resource_uses_page_size(self):
+        resource_func = mock.Mock(side_effect=[
+            {'items': ['foo', 'bar']},
+            {'items': ['buzz']},
+        ])
+
+        items = iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=2)
+
+        assert ['foo', 'bar', 'buzz'] == list(items)
+        resource_func.assert_has_calls([
+            call(params={'query_params': {'offset': 0, 'limit': 2}}),
+            call(params={'query_params': {'offset': 2, 'limit': 2}})
+        ])
+
+    def test_iterate_over_pageable_resource_counts_fetched_pages_and_objects(self):
+        resource_func = mock.Mock(side_effect=[
+            {'items': ['foo']},
+            {'items': []},
+        ])
+        metrics = {MetricName.PAGES_FETCHED: 3, MetricName.OBJECTS_FETCHED: 3}
+
+        list(iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=1, metrics=metrics))
+
+        assert {MetricName.PAGES_FETCHED: 5, MetricName.OBJECTS_FETCHED: 4} == metrics
+
+    def test_iterate_over_pageable_resource_grows_page_size_in_adaptive_mode(self):
+        items = list(range(40))
+        resource_func = mock.Mock(side_effect=lambda params: {
+            'items': items[params['query_params']['offset']:][:params['query_params']['limit']]
+        })
+
+        result = iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=5, adaptive=True)
+
+        assert items == list(result)
+        assert [
+            call(params={'query_params': {'offset': 0, 'limit': 5}}),
+            call(params={'query_params': {'offset': 5, 'limit': 10}}),
+            call(params={'query_params': {'offset': 15, 'limit': 20}}),
+            call(params={'query_params': {'offset': 35, 'limit': 40}})
+        ] == resource_func.call_args_list
+
+    def test_iterate_over_pageable_resource_does_not_grow_page_size_beyond_maximum(self):
+        resource_func = mock.Mock(side_effect=lambda params: {'items': [None] * params['query_params']['limit']}
+                                  if params['query_params']['offset'] < 2 * MAX_ADAPTIVE_PAGE_SIZE else {'items': []})
+
+        result = iterate_over_pageable_resource(resource_func, {'query_params': {}},
+                                                page_size=MAX_ADAPTIVE_PAGE_SIZE // 2, adaptive=True)
+
+        assert 5 * MAX_ADAPTIVE_PAGE_SIZE // 2 == len(list(result))
+        assert [MAX_ADAPTIVE_PAGE_SIZE // 2] + [MAX_ADAPTIVE_PAGE_SIZE] * 3 == \
+            [c[1]['params']['query_params']['limit'] for c in resource_func.call_args_list]
+
+    def test_iterate_over_pageable_resource_falls_back_when_page_size_is_rejected(self):
+        items = list(range(50))
+
+        def get_page(params):
+            offset, limit = params['query_params']['offset'], params['query_params']['limit']
+            if limit > 10:
+                raise FtdServerError({'error': 'limit is too big'}, 422)
+            return {'items': items[offset:offset + limit]}
+
+        resource_func = mock.Mock(side_effect=get_page)
+        metrics = {}
+
+        result = iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=5, adaptive=True,
+                                                metrics=metrics)
+
+        assert items == list(result)
+        assert [
+            call(params={'query_params': {'offset': 0, 'limit': 5}}),
+            call(params={'query_params': {'offset': 5, 'limit': 10}}),
+            call(params={'query_params': {'offset': 15, 'limit': 20}}),
+            call(params={'query_params': {'offset': 15, 'limit': 10}}),
+            call(params={'query_params': {'offset': 25, 'limit': 10}}),
+            call(params={'query_params': {'offset': 35, 'limit': 10}}),
+            call(params={'query_params': {'offset': 45, 'limit': 10}})
+        ] == resource_func.call_args_list
+        assert {MetricName.PAGES_FETCHED: 6, MetricName.OBJECTS_FETCHED: 50} == metrics
+
+    def test_iterate_over_pageable_resource_raises_error_when_initial_page_size_is_rejected(self):
+        resource_func = mock.Mock(side_effect=FtdServerError({'error': 'limit is too big'}, 422))
+
+        with pytest.raises(FtdServerError):
+            list(iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=5, adaptive=True))
+        assert 1 == resource_func.call_count
+
+    def test_iterate_over_pageable_resource_continues_when_server_caps_page_size(self):
+        items = list(range(25))
+        resource_func = mock.Mock(side_effect=lambda params: {
+            'items': items[params['query_params']['offset']:][:min(params['query_params']['limit'], 8)]
+        })
+
+        result = iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=4, adaptive=True)
+
+        assert items == list(result)
+        assert [
+            call(params={'query_params': {'offset': 0, 'limit': 4}}),
+            call(params={'query_params': {'offset': 4, 'limit': 8}}),
+            call(params={'query_params': {'offset': 12, 'limit': 16}}),
+            call(params={'query_params': {'offset': 20, 'limit': 8}})
+        ] == resource_func.call_args_list
+
+    def test_iterate_over_pageable_resource_does_not_adapt_explicit_limit(self):
+        resource_func = mock.Mock(side_effect=[
+            {'items': ['foo']},
+            {'items': ['bar']},
+            {'items': []},
+        ])
+
+        items = iterate_over_pageable_resource(resource_func, {'query_params': {'limit': 1}}, adaptive=True)
+
+        assert ['foo', 'bar'] == list(items)
+        resource_func.assert_has_calls([
+            call(params={'query_params': {'offset': 0, 'limit': 1}}),
+            call(params={'query_params': {'offset': 1, 'limit': 1}}),
+            call(params={'query_params': {'offset': 2, 'limit': 1}})
+        ])
+
+    def test_iterate_over_pageable_resource_stops_when_paging_metadata_has_no_next_page(self):
+        resource_func = mock.Mock(side_effect=[
+            {'items': ['foo', 'bar'], 'paging': {'offset': 0, 'limit': 2, 'count': 4, 'next': ['/objects?offset=2']}},
+            {'items': ['buzz', 'qux'], 'paging': {'offset': 2, 'limit': 2, 'count': 4, 'next': []}},
+        ])
+
+        items = iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=2)
+
+        assert ['foo', 'bar', 'buzz', 'qux'] == list(items)
+        assert 2 == resource_func.call_count
+
+    def test_iterate_over_pageable_resource_uses_items_count_when_next_pages_are_not_reported(self):
+        resource_func = mock.Mock(side_effect=[
+            {'items': ['foo', 'bar'], 'paging': {'count': 3}},
+            {'items': ['buzz'], 'paging': {'count': 3}},
+        ])
+
+        items = iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=2)
+
+        assert ['foo', 'bar', 'buzz'] == list(items)
+        assert 2 == resource_func.call_count
+
+    def test_iterate_over_pageable_resource_continues_after_short_page_when_server_reports_next_page(self):
+        resource_func = mock.Mock(side_effect=[
+            {'items': ['foo', 'bar'], 'paging': {'count': 5, 'next': ['/objects?offset=2']}},
+            {'items': ['buzz', 'qux'], 'paging': {'count': 5, 'next': ['/objects?offset=4']}},
+            {'items': ['quux'], 'paging': {'count': 5, 'next': []}},
+        ])
+
+        items = iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=3)
+
+        assert ['foo', 'bar', 'buzz', 'qux', 'quux'] == list(items)
+        assert [
+            call(params={'query_params': {'offset': 0, 'limit': 3}}),
+            call(params={'query_params': {'offset': 2, 'limit': 2}}),
+            call(params={'query_params': {'offset': 4, 'limit': 2}})
+        ] == resource_func.call_args_list
+
+    def test_iterate_over_pageable_resource_stops_on_empty_page_with_next_page(self):
+        resource_func = mock.Mock(return_value={'items': [], 'paging': {'count': 5, 'next': ['/objects?offset=0']}})
+
+        assert [] == list(iterate_over_pageable_resource(resource_func, {'query_params': {}}))
+        assert 1 == resource_func.call_count
+
+    def test_iterate_over_pageable_resource_ignores_invalid_paging_metadata(self):
+        resource_func = mock.Mock(side_effect=[
+            {'items': ['foo'], 'paging': None},
+            {'items': [], 'paging': {'count': 'many'}},
+        ])
+
+        assert ['foo'] == list(iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=1))
+        assert 2 == resource_func.call_count
+
+    def test_get_total_items_count(self):
+        assert 42 == get_total_items_count({'items': [], 'paging': {'count': 42, 'next': []}})
+        assert get_total_items_count({'items': []}) is None
+        assert get_total_items_count({'items': [], 'paging': {'next': []}}) is None
+        assert get_total_items_count({'items': [], 'paging': {'count': True}}) is None
+        assert get_total_items_count({'items': [], 'paging': {'count': -1}}) is None
+
+    @staticmethod
+    def _paging_resource(items, max_limit=None):
+        def get_page(params):
+            offset, limit = params['query_params']['offset'], params['query_params']['limit']
+            page_items = items[offset:offset + min(limit, max_limit or limit)]
+            next_pages = ['/objects?offset=%s' % (offset + len(page_items))] \
+                if offset + len(page_items) < len(items) else []
+            return {'items': page_items, 'paging': {'count': len(items), 'next': next_pages}}
+
+        return mock.Mock(side_effect=get_page)
+
+    def test_iterate_over_pageable_resource_fetches_pages_concurrently(self):
+        items = list(range(95))
+        resource_func = self._paging_resource(items)
+        metrics = {}
+
+        result = iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=10, metrics=metrics,
+                                                max_concurrent_pages=4)
+
+        assert items == list(result)
+        assert [(offset, 10) for offset in range(0, 95, 10)] == sorted(
+            (c[1]['params']['query_params']['offset'], c[1]['params']['query_params']['limit'])
+            for c in resource_func.call_args_list
+        )
+        assert {MetricName.PAGES_FETCHED: 10, MetricName.OBJECTS_FETCHED: 95} == metrics
+
+    def test_iterate_over_pageable_resource_does_not_prefetch_pages_without_total_count(self):
+        resource_func = mock.Mock(side_effect=[
+            {'items': ['foo']},
+            {'items': ['bar']},
+            {'items': []},
+        ])
+
+        items = iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=1,
+                                               max_concurrent_pages=4)
+
+        assert ['foo', 'bar'] == list(items)
+        assert 3 == resource_func.call_count
+
+    def test_iterate_over_pageable_resource_falls_back_to_serial_mode_when_list_changes(self):
+        items = list(range(30))
+        resource_func = self._paging_resource(items)
+        get_page = resource_func.side_effect
+
+        def get_page_of_changing_list(params):
+            page = get_page(params)
+            if params['query_params']['offset'] == 0:
+                # an object is added to the list after the first page is fetched
+                items.append(30)
+            return page
+
+        resource_func.side_effect = get_page_of_changing_list
+
+        result = iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=10,
+                                                max_concurrent_pages=2)
+
+        assert list(range(31)) == list(result)
+        assert call(params={'query_params': {'offset': 10, 'limit': 10}}) in resource_func.call_args_list
+
+    def test_iterate_over_pageable_resource_continues_serially_after_prefetch_when_server_reports_next_page(self):
+        resource_func = mock.Mock(side_effect=[
+            {'items': ['foo'], 'paging': {'count': 2, 'next': ['/objects?offset=1']}},
+            {'items': ['bar'], 'paging': {'count': 2, 'next': ['/objects?offset=2']}},
+            {'items': [], 'paging': {'count': 2, 'next': []}},
+        ])
+
+        items = iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=1,
+                                               max_concurrent_pages=2)
+
+        assert ['foo', 'bar'] == list(items)
+        assert call(params={'query_params': {'offset': 2, 'limit': 1}}) == resource_func.call_args_list[-1]
+
+    def test_iterate_over_pageable_resource_stops_prefetch_when_iteration_is_closed(self):
+        resource_func = self._paging_resource(list(range(1000)))
+
+        items = iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=10,
+                                               max_concurrent_pages=3)
+        # the first page and the first item of the second page are consumed
+        assert list(range(11)) == [next(items) for _ in range(11)]
+        items.close()
+
+        # the first page, the consumed prefetched page and up to `max_concurrent_pages` pending pages are requested
+        assert resource_func.call_count <= 5
+
+    def test_iterate_over_pageable_resource_raises_error_of_prefetched_page(self):
+        resource_func = self._paging_resource(list(range(50)))
+        get_page = resource_func.side_effect
+
+        def get_page_with_error(params):
+            if params['query_params']['offset'] == 20:
+                raise FtdServerError({'error': 'foo'}, 500)
+            return get_page(params)
+
+        resource_func.side_effect = get_page_with_error
+        items = iterate_over_pageable_resource(resource_func, {'query_params': {}}, page_size=10,
+                                               max_concurrent_pages=4)
+
+        with pytest.raises(FtdServerError):
+            list(items)
+
+    def test_iterate_over_pageable_resource_does_not_copy_or_mutate_params(self):
+        data = {'name': 'foo', 'items': [{'id': i} for i in range(100)]}
+        params = {'query_params': {'filter': 'name:foo'}, 'path_params': {'parentId': '1'}, 'data': data}
+        received_params = []
+
+        def get_page(params):
+            received_params.append(params)
+            return {'items': ['foo'] if params['query_params']['offset'] < 2 else []}
+
+        assert ['foo', 'foo'] == list(iterate_over_pageable_resource(get_page, params, page_size=1))
+
+        assert {'query_params': {'filter': 'name:foo'}, 'path_params': {'parentId': '1'}, 'data': data} == params
+        assert [0, 1, 2] == [p['query_params']['offset'] for p in received_params]
+        assert all(p['data'] is data and p['path_params'] is params['path_params'] for p in received_params)
+
+
+class TestPageRequestParams(object):
+
+    def test_query_params_are_merged_with_defaults(self):
+        params = {'query_params': {'limit': 5}, 'path_params': {'objId': '1'}}
+
+        page_params = PageRequestParams(params, limit=10, offset=0)
+
+        assert {'query_params': {'limit': 5, 'offset': 0}, 'path_params': {'objId': '1'}} == page_params
+        assert {'query_params': {'limit': 5}, 'path_params': {'objId': '1'}} == params
+
+    def test_query_params_are_added_when_missing(self):
+        page_params = PageRequestParams({'path_params': {}}, offset=0)
+
+        assert ['path_params', 'query_params'] == list(page_params)
+        assert 2 == len(page_params)
+        assert {'offset': 0} == page_params.get('query_params')
+
+    def test_with_query_params_creates_independent_params(self):
+        data = {'name': 'foo'}
+        page_params = PageRequestParams({'query_params': {'offset': 0, 'limit': 10}, 'data': data})
+
+        next_page_params = page_params.with_query_params(offset=10)
+
+        assert {'offset': 0, 'limit': 10} == page_params['query_params']
+        assert {'offset': 10, 'limit': 10} == next_page_params['query_params']
+        assert next_page_params['data'] is data
+
+    def test_params_are_read_only(self):
+        page_params = PageRequestParams({'query_params': {}})
+
+        with pytest.raises(TypeError):
+            page_params['data'] = {}
+
 
 class TestOperationCheckerClass(unittest.TestCase):
     def setUp(self):
@@ -590,3 +1334,26 @@ class TestOperationCheckerClass(unittest.TestCase):
         assert not self._checker.is_upsert_operation_supported({'getList': get_list_op_spec})
         assert not self._checker.is_upsert_operation_supported({'edit': edit_op_spec})
         assert not self._checker.is_upsert_operation_supported({'getList': get_list_op_spec, 'add': add_op_spec})
+
+
+class TestOperationErrorSerialization(object):
+
+    @pytest.mark.parametrize("error, attrs", [
+        (FtdInvalidOperationNameError('getTest'), {'operation_name': 'getTest'}),
+        (FtdConfigurationError('Error', {'id': '1'}), {'msg': 'Error', 'obj': {'id': '1'}}),
+        (FtdServerError({'error': 'foo'}, 500), {'response': {'error': 'foo'}, 'code': 500}),
+        (FtdUnexpectedResponse('Unexpected'), {'args': ('Unexpected',)}),
+        (ValidationError({'Invalid data provided': 'report'}), {'args': ({'Invalid data provided': 'report'},)})
+    ])
+    def test_operation_error_is_raised_after_serialization(self, error, attrs):
+        serialized_error = json.loads(json.dumps(serialize_operation_error(error)))
+
+        with pytest.raises(type(error)) as e_info:
+            raise_operation_error(serialized_error)
+
+        for attr_name, value in attrs.items():
+            assert value == getattr(e_info.value, attr_name)
+
+    def test_unexpected_errors_are_not_serialized(self):
+        assert serialize_operation_error(KeyError('key')) is None
+        assert serialize_operation_error(Exception('error')) is None
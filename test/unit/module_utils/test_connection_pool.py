@@ -0,0 +1,181 @@
+import errno
+import socket
+import threading
+import time
+import unittest
+
+from ansible.module_utils.six.moves import BaseHTTPServer, http_client
+from units.compat import mock
+
+try:
+    from ansible.module_utils.connection_pool import HTTPConnectionPool, ConnectionPoolError, \
+        ConnectionPoolStatsField
+except ImportError:
+    from module_utils.connection_pool import HTTPConnectionPool, ConnectionPoolError, ConnectionPoolStatsField
+
+
+class KeepAliveRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.client_ports.add(self.client_address[1])
+        self.server.request_lines.append(self.requestline)
+        body = self.path.encode('ascii')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # the connection is kept alive by the client, but dropped by the server
+        self.close_connection = self.server.drop_connections
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHTTPConnectionPoolWithServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), KeepAliveRequestHandler)
+        self.server.daemon_threads = True
+        self.server.client_ports = set()
+        self.server.request_lines = []
+        self.server.drop_connections = False
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        self.pool = HTTPConnectionPool('http://127.0.0.1:%s' % self.server.server_address[1], max_size=2, timeout=5)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_request_reuses_connection(self):
+        responses = [self.pool.request('GET', '/page/%s' % i) for i in range(3)]
+
+        assert [b'/page/0', b'/page/1', b'/page/2'] == [response.read() for response in responses]
+        assert [200, 200, 200] == [response.getcode() for response in responses]
+        assert 1 == len(self.server.client_ports)
+        assert {
+            ConnectionPoolStatsField.HITS: 2,
+            ConnectionPoolStatsField.MISSES: 1,
+            ConnectionPoolStatsField.DISCARDED: 0,
+            ConnectionPoolStatsField.IDLE_CONNECTIONS: 1
+        } == self.pool.get_stats()
+
+    def test_request_sends_method_in_upper_case(self):
+        response = self.pool.request('get', '/api/x')
+
+        assert 200 == response.getcode()
+        assert ['GET /api/x HTTP/1.1'] == self.server.request_lines
+
+    def test_request_replaces_connection_closed_by_server(self):
+        self.server.drop_connections = True
+        self.pool.request('GET', '/first')
+        # gives the server time to close the connection
+        time.sleep(0.1)
+
+        response = self.pool.request('GET', '/second')
+
+        assert b'/second' == response.read()
+        assert 2 == len(self.server.client_ports)
+        stats = self.pool.get_stats()
+        assert 2 == stats[ConnectionPoolStatsField.MISSES]
+        assert 1 == stats[ConnectionPoolStatsField.DISCARDED]
+
+
+class TestHTTPConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = HTTPConnectionPool('https://192.168.0.1:443', max_size=1)
+
+    @staticmethod
+    def _connection_mock(*errors):
+        conn = mock.MagicMock()
+        conn.request.side_effect = list(errors) or None
+        response = conn.getresponse.return_value
+        response.status = 200
+        response.reason = 'OK'
+        response.will_close = False
+        response.read.return_value = b'{}'
+        return conn
+
+    @mock.patch('module_utils.connection_pool._is_connection_alive', return_value=True)
+    def test_request_is_resent_when_reused_connection_was_closed_while_sending(self, _):
+        closed_conn = self._connection_mock(None, socket.error(errno.EPIPE, 'Broken pipe'))
+        new_conn = self._connection_mock()
+        with mock.patch.object(self.pool, '_create_connection', side_effect=[closed_conn, new_conn]):
+            self.pool.request('POST', '/first', b'{}')
+            response = self.pool.request('POST', '/second', b'{}')
+
+        assert b'{}' == response.read()
+        closed_conn.close.assert_called_once_with()
+        new_conn.request.assert_called_once_with('POST', '/second', b'{}', {})
+        assert {
+            ConnectionPoolStatsField.HITS: 1,
+            ConnectionPoolStatsField.MISSES: 2,
+            ConnectionPoolStatsField.DISCARDED: 1,
+            ConnectionPoolStatsField.IDLE_CONNECTIONS: 1
+        } == self.pool.get_stats()
+
+    @mock.patch('module_utils.connection_pool._is_connection_alive', return_value=True)
+    def test_idempotent_request_is_resent_when_reused_connection_was_closed_before_response(self, _):
+        closed_conn = self._connection_mock()
+        closed_conn.getresponse.side_effect = [closed_conn.getresponse.return_value, http_client.BadStatusLine('')]
+        new_conn = self._connection_mock()
+        with mock.patch.object(self.pool, '_create_connection', side_effect=[closed_conn, new_conn]):
+            self.pool.request('get', '/first')
+            response = self.pool.request('get', '/second')
+
+        assert b'{}' == response.read()
+        new_conn.request.assert_called_once_with('GET', '/second', None, {})
+
+    @mock.patch('module_utils.connection_pool._is_connection_alive', return_value=True)
+    def test_post_request_is_not_resent_when_reused_connection_was_closed_before_response(self, _):
+        closed_conn = self._connection_mock()
+        closed_conn.getresponse.side_effect = [closed_conn.getresponse.return_value, http_client.BadStatusLine('')]
+        with mock.patch.object(self.pool, '_create_connection', side_effect=[closed_conn]) as create_mock:
+            self.pool.request('POST', '/first', b'{}')
+            with self.assertRaises(ConnectionPoolError):
+                self.pool.request('POST', '/second', b'{}')
+
+        assert 1 == create_mock.call_count
+        assert 2 == closed_conn.request.call_count
+
+    @mock.patch('module_utils.connection_pool._is_connection_alive', return_value=True)
+    def test_request_is_not_resent_after_timeout(self, _):
+        conn = self._connection_mock(None, socket.timeout('timed out'))
+        with mock.patch.object(self.pool, '_create_connection', side_effect=[conn]):
+            self.pool.request('POST', '/first', b'{}')
+            with self.assertRaises(ConnectionPoolError):
+                self.pool.request('POST', '/second', b'{}')
+
+        assert 0 == self.pool.get_stats()[ConnectionPoolStatsField.IDLE_CONNECTIONS]
+
+    def test_request_fails_when_new_connection_fails(self):
+        conn = self._connection_mock(socket.error(111, 'Connection refused'))
+        with mock.patch.object(self.pool, '_create_connection', return_value=conn):
+            with self.assertRaises(ConnectionPoolError):
+                self.pool.request('GET', '/')
+
+        conn.request.assert_called_once_with('GET', '/', None, {})
+
+    def test_connection_is_closed_when_server_asks_to(self):
+        conn = self._connection_mock()
+        conn.getresponse.return_value.will_close = True
+        with mock.patch.object(self.pool, '_create_connection', return_value=conn):
+            self.pool.request('GET', '/')
+
+        conn.close.assert_called_once_with()
+        assert 0 == self.pool.get_stats()[ConnectionPoolStatsField.IDLE_CONNECTIONS]
+
+    def test_extra_connections_are_closed_when_pool_is_full(self):
+        connections = [self._connection_mock(), self._connection_mock()]
+        with mock.patch.object(self.pool, '_create_connection', side_effect=connections):
+            acquired = [self.pool._acquire()[0], self.pool._acquire()[0]]
+        for conn in acquired:
+            self.pool._release(conn)
+
+        connections[0].close.assert_not_called()
+        connections[1].close.assert_called_once_with()
+        assert 1 == self.pool.get_stats()[ConnectionPoolStatsField.IDLE_CONNECTIONS]
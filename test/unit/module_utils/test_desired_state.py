@@ -0,0 +1,233 @@
+from __future__ import absolute_import
+
+import pytest
+from units.compat import mock
+
+try:
+    from ansible.module_utils.common import FtdConfigurationError, HTTPMethod, ResponseParams
+    from ansible.module_utils.configuration import BaseConfigurationResource
+    from ansible.module_utils.desired_state import DesiredStateResource, get_failed_plan_steps
+    from ansible.module_utils.fdm_swagger_client import get_operation_roles
+except ImportError:
+    from module_utils.common import FtdConfigurationError, HTTPMethod, ResponseParams
+    from module_utils.configuration import BaseConfigurationResource
+    from module_utils.desired_state import DesiredStateResource, get_failed_plan_steps
+    from module_utils.fdm_swagger_client import get_operation_roles
+
+
+def _model_operations(model_name):
+    url = '/object/%s' % model_name.lower()
+    return {
+        'get%sList' % model_name: {'method': HTTPMethod.GET, 'url': url, 'modelName': model_name,
+                                   'returnMultipleItems': True},
+        'add%s' % model_name: {'method': HTTPMethod.POST, 'url': url, 'modelName': model_name},
+        'edit%s' % model_name: {'method': HTTPMethod.PUT, 'url': url + '/{objId}', 'modelName': model_name},
+        'delete%s' % model_name: {'method': HTTPMethod.DELETE, 'url': url + '/{objId}', 'modelName': model_name}
+    }
+
+
+class TestDesiredStateResource(object):
+
+    @pytest.fixture(autouse=True)
+    def connection_mock(self):
+        self.existing_objects = {'NetworkObject': [], 'NetworkObjectGroup': [], 'SecurityZone': []}
+        self.requests = []
+        self.failing_writes = set()
+        operations = {}
+        for model_name in self.existing_objects:
+            operations[model_name] = _model_operations(model_name)
+        all_operations = dict((name, spec) for ops in operations.values() for name, spec in ops.items())
+
+        def send_request(url_path=None, http_method=None, body_params=None, path_params=None, query_params=None):
+            model_name = next(name for name in operations if url_path.split('/')[2] == name.lower())
+            if http_method == HTTPMethod.GET:
+                response = {'items': self.existing_objects[model_name]}
+            elif body_params and body_params.get('name') in self.failing_writes:
+                self.requests.append((http_method, body_params['name']))
+                return {ResponseParams.SUCCESS: False, ResponseParams.RESPONSE: {'error': 'Invalid value'},
+                        ResponseParams.STATUS_CODE: 422}
+            else:
+                self.requests.append((http_method, body_params.get('name') if body_params else path_params['objId']))
+                response = dict(body_params, id='id-' + body_params['name']) if body_params else {}
+            return {ResponseParams.SUCCESS: True, ResponseParams.RESPONSE: response, ResponseParams.STATUS_CODE: 200}
+
+        connection = mock.MagicMock()
+        connection.get_operation_specs_by_model_name.side_effect = lambda name: operations.get(name)
+        connection.get_operation_spec.side_effect = lambda name: all_operations.get(name)
+        connection.get_model_roles.side_effect = lambda name: get_operation_roles(operations.get(name) or {})
+        connection.get_model_name_by_type.side_effect = \
+            lambda obj_type: next((name for name in operations if name.lower() == obj_type), None)
+        connection.validate_request.return_value = {}
+        connection.get_system_information.return_value = {'databaseInfo': {'buildVersion': '6.4.0'}}
+        connection.send_request = send_request
+        self.resource = DesiredStateResource(BaseConfigurationResource(connection))
+        return connection
+
+    def test_apply_writes_referenced_objects_first(self):
+        self.existing_objects['NetworkObject'] = [
+            {'id': 'id-net1', 'name': 'net1', 'value': '1', 'type': 'networkobject', 'version': 'v1'},
+            {'id': 'id-net2', 'name': 'net2', 'value': '2', 'type': 'networkobject', 'version': 'v1'}
+        ]
+        state = {
+            'NetworkObjectGroup': [
+                {'name': 'group', 'type': 'networkobjectgroup', 'objects': [
+                    {'name': 'net1', 'type': 'networkobject'}, {'name': 'net3', 'type': 'networkobject'}
+                ]}
+            ],
+            'NetworkObject': [
+                {'name': 'net1', 'value': '1', 'type': 'networkobject'},
+                {'name': 'net2', 'value': '20', 'type': 'networkobject'},
+                {'name': 'net3', 'value': '3', 'type': 'networkobject'}
+            ]
+        }
+
+        plan = self.resource.plan(state)
+        result = self.resource.apply(plan)
+
+        assert [['net2', 'net3'], ['group']] == [sorted(step.name for step in wave) for wave in plan.waves]
+        assert {'create': 2, 'update': 1, 'delete': 0, 'unchanged': 1} == plan.get_summary()
+        assert ('update', 'NetworkObject', 'net2') == (result[0]['action'], result[0]['model'], result[0]['name'])
+        assert {'id': 'id-net2', 'name': 'net2', 'value': '20', 'type': 'networkobject', 'version': 'v1'} == \
+            result[0]['object']
+        assert [
+            {'id': 'id-net1', 'name': 'net1', 'type': 'networkobject'},
+            {'id': 'id-net3', 'name': 'net3', 'type': 'networkobject'}
+        ] == result[2]['object']['objects']
+        assert (HTTPMethod.POST, 'group') == self.requests[-1]
+
+    def test_apply_reports_executed_steps_and_stops_after_wave_with_failed_write(self):
+        state = {
+            'NetworkObjectGroup': [
+                {'name': 'group', 'type': 'networkobjectgroup', 'objects': [{'name': 'net1', 'type': 'networkobject'}]}
+            ],
+            'NetworkObject': [{'name': 'net%s' % i, 'value': str(i), 'type': 'networkobject'} for i in range(1, 4)]
+        }
+        self.failing_writes.add('net2')
+        self.resource = DesiredStateResource(self.resource._resource, max_concurrent_requests=2)
+
+        result = self.resource.run(state)
+
+        # the other writes of the wave are sent, the group depending on them is not
+        assert [(HTTPMethod.POST, 'net1'), (HTTPMethod.POST, 'net2'), (HTTPMethod.POST, 'net3')] == \
+            sorted(self.requests)
+        assert result['changed']
+        assert ['net1', 'net2', 'net3'] == [step['name'] for step in result['plan']]
+        assert {'id': 'id-net1', 'name': 'net1', 'value': '1', 'type': 'networkobject'} == result['plan'][0]['object']
+        assert 'error' not in result['plan'][0]
+        assert "Status code: 422. Server response: {'error': 'Invalid value'}" == result['plan'][1]['error']
+        assert ['NetworkObject "net2" (Status code: 422. Server response: {\'error\': \'Invalid value\'})'] == \
+            get_failed_plan_steps(result['plan'])
+
+    def test_run_is_not_changed_when_all_writes_fail(self):
+        self.failing_writes.add('net')
+
+        result = self.resource.run({'NetworkObject': [{'name': 'net', 'type': 'networkobject'}]})
+
+        assert not result['changed']
+        assert 1 == len(get_failed_plan_steps(result['plan']))
+
+    def test_plan_does_not_send_writes(self):
+        self.existing_objects['NetworkObject'] = [{'id': 'id-net1', 'name': 'net1', 'value': '1'}]
+
+        plan = self.resource.plan({'NetworkObject': [{'name': 'net1', 'value': '2'}, {'name': 'net2'}]})
+
+        assert [
+            {'action': 'update', 'model': 'NetworkObject', 'name': 'net1',
+             'object': {'id': 'id-net1', 'name': 'net1', 'value': '1'},
+             'diff': [{'path': 'value', 'before': '1', 'after': '2'}]},
+            {'action': 'create', 'model': 'NetworkObject', 'name': 'net2', 'object': None}
+        ] == plan.to_report()
+        assert [] == self.requests
+
+    def test_plan_reports_diff_with_references_to_objects_created_by_plan(self):
+        self.existing_objects['NetworkObject'] = [{'id': 'id-net1', 'name': 'net1', 'type': 'networkobject'}]
+        self.existing_objects['NetworkObjectGroup'] = [
+            {'id': 'id-group', 'name': 'group', 'type': 'networkobjectgroup',
+             'objects': [{'id': 'id-net1', 'type': 'networkobject'}]}
+        ]
+
+        plan = self.resource.plan({
+            'NetworkObject': [{'name': 'net1', 'type': 'networkobject'}, {'name': 'net2', 'type': 'networkobject'}],
+            'NetworkObjectGroup': [{'name': 'group', 'type': 'networkobjectgroup', 'objects': [
+                {'name': 'net1', 'type': 'networkobject'}, {'name': 'net2', 'type': 'networkobject'}
+            ]}]
+        })
+
+        assert [{
+            'path': 'objects',
+            'before': [{'id': 'id-net1', 'type': 'networkobject'}],
+            'after': [{'id': 'id-net1', 'name': 'net1', 'type': 'networkobject'},
+                      {'name': 'net2', 'type': 'networkobject'}]
+        }] == plan.to_report()[1]['diff']
+
+    def test_prune_deletes_referring_objects_after_writes_and_before_referenced_ones(self):
+        self.existing_objects['NetworkObject'] = [
+            {'id': 'id-old', 'name': 'old', 'type': 'networkobject'},
+            {'id': 'id-any', 'name': 'any', 'type': 'networkobject', 'isSystemDefined': True}
+        ]
+        self.existing_objects['NetworkObjectGroup'] = [
+            {'id': 'id-old-group', 'name': 'old-group', 'type': 'networkobjectgroup',
+             'objects': [{'id': 'id-old', 'type': 'networkobject'}]}
+        ]
+
+        plan = self.resource.plan({'NetworkObject': [{'name': 'net', 'type': 'networkobject'}],
+                                   'NetworkObjectGroup': []}, prune=True)
+        self.resource.apply(plan)
+
+        assert [(HTTPMethod.POST, 'net'), (HTTPMethod.DELETE, 'id-old-group'), (HTTPMethod.DELETE, 'id-old')] == \
+            self.requests
+
+    def test_apply_fails_before_sending_writes_when_command_timeout_would_be_exceeded(self):
+        state = {'NetworkObject': [{'name': 'net%s' % i, 'value': str(i), 'type': 'networkobject'} for i in range(5)]}
+        plan = self.resource.plan(state)
+
+        with mock.patch.object(BaseConfigurationResource, 'check_expected_run_time') as check_mock:
+            check_mock.side_effect = FtdConfigurationError('Timeout')
+            with pytest.raises(FtdConfigurationError):
+                self.resource.apply(plan)
+
+        # five independent objects are written by four workers in two rounds
+        check_mock.assert_called_once_with(2)
+        assert [] == self.requests
+
+    def test_plan_looks_up_referenced_objects_of_models_missing_in_state(self):
+        self.existing_objects['SecurityZone'] = [
+            {'id': 'id-zone', 'name': 'inside', 'type': 'securityzone'},
+            {'id': 'id-other-zone', 'name': 'outside', 'type': 'securityzone'}
+        ]
+
+        plan = self.resource.plan({'NetworkObjectGroup': [
+            {'name': 'group', 'type': 'networkobjectgroup', 'objects': [{'name': 'inside', 'type': 'securityzone'}]}
+        ]})
+        self.resource.apply(plan)
+
+        assert [{'id': 'id-zone', 'name': 'inside', 'type': 'securityzone'}] == \
+            plan.steps[0].result['objects']
+
+    def test_plan_fails_when_objects_refer_to_each_other_in_a_cycle(self):
+        state = {'NetworkObjectGroup': [
+            {'name': 'a', 'type': 'networkobjectgroup', 'objects': [{'name': 'b', 'type': 'networkobjectgroup'}]},
+            {'name': 'b', 'type': 'networkobjectgroup', 'objects': [{'name': 'a', 'type': 'networkobjectgroup'}]}
+        ]}
+
+        with pytest.raises(FtdConfigurationError) as exc_info:
+            self.resource.plan(state)
+
+        assert 'Objects refer to each other in a cycle: NetworkObjectGroup a, NetworkObjectGroup b' == \
+            exc_info.value.msg
+
+    def test_plan_fails_when_reference_cannot_be_resolved(self):
+        state = {'NetworkObjectGroup': [
+            {'name': 'group', 'type': 'networkobjectgroup', 'objects': [{'name': 'net', 'type': 'networkobject'}]}
+        ]}
+
+        with pytest.raises(FtdConfigurationError) as exc_info:
+            self.resource.plan(state)
+
+        assert 'Cannot resolve the reference to networkobject "net"' == exc_info.value.msg
+
+    def test_plan_fails_when_model_is_not_supported(self):
+        with pytest.raises(FtdConfigurationError) as exc_info:
+            self.resource.plan({'UnknownObject': []})
+
+        assert 'Model UnknownObject is not supported by the device' == exc_info.value.msg
@@ -17,14 +17,25 @@
 #
 
 import copy
+import json
 import os
 import unittest
 
+from ansible.module_utils.six import BytesIO
+from units.compat.mock import patch
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
 try:
-    from ansible.module_utils.fdm_swagger_client import FdmSwaggerParser
+    from ansible.module_utils.fdm_swagger_client import FdmSwaggerParser, SpecProp, dump_runtime_spec, \
+        load_runtime_spec, get_comparison_schema, get_server_filter_keys
     from ansible.module_utils.common import HTTPMethod
 except ImportError:
-    from module_utils.fdm_swagger_client import FdmSwaggerParser
+    from module_utils.fdm_swagger_client import FdmSwaggerParser, SpecProp, dump_runtime_spec, load_runtime_spec, \
+        get_comparison_schema, get_server_filter_keys
     from module_utils.common import HTTPMethod
 
 DIR_PATH = os.path.dirname(os.path.realpath(__file__))
@@ -381,3 +392,277 @@ class TestFdmSwaggerParser(unittest.TestCase):
                 'deleteNoneModel': expected_operations['deleteNoneModel']
             }
         } == fdm_data['model_operations']
+        assert {
+            'Model1': {'add': None, 'edit': 'editSomeModel', 'get': None, 'getList': 'getSomeModelList',
+                       'delete': None, 'upsert': True},
+            'Model2': {'add': 'addSomeModel', 'edit': None, 'get': None, 'getList': None, 'delete': None,
+                       'upsert': False},
+            'Model3': {'add': None, 'edit': None, 'get': 'getSomeModel', 'getList': None, 'delete': 'deleteModel3',
+                       'upsert': False},
+            None: {'add': None, 'edit': None, 'get': None, 'getList': None, 'delete': 'deleteNoneModel',
+                   'upsert': False}
+        } == fdm_data['model_roles']
+
+
+class TestServerFilterKeys(unittest.TestCase):
+
+    def test_get_server_filter_keys_from_filter_description(self):
+        description = ('It should have the following format: {key}{operator}{value}[;{key}{operator}{value}]. '
+                       'Supported operators are: "!"(not equals), ":"(equals), "~"(similar). '
+                       'Supported keys are: "name", "hardwareName" and "fts".')
+        operation = {'parameters': {'query': {'filter': {'type': 'string', 'description': description}}}}
+
+        assert frozenset(['name', 'hardwareName']) == get_server_filter_keys(operation)
+
+    def test_get_server_filter_keys_returns_none_when_keys_are_not_listed(self):
+        assert get_server_filter_keys({'parameters': {'query': {'filter': {'type': 'string'}}}}) is None
+        assert get_server_filter_keys({'parameters': {'query': {'filter': {'description': 'Filter.'}}}}) is None
+        assert get_server_filter_keys({'parameters': {'query': {'limit': {'type': 'integer'}}}}) is None
+        assert get_server_filter_keys({'url': '/objects'}) is None
+
+    def test_get_server_filter_keys_from_model_of_spec_served_by_device(self):
+        with open(os.path.join(TEST_DATA_FOLDER, 'ngfw_with_ex.json')) as f:
+            spec = load_runtime_spec(dump_runtime_spec(FdmSwaggerParser().parse_spec(json.load(f))))
+        operation = spec[SpecProp.OPERATIONS]['getPhysicalInterfaceList']
+        model = spec[SpecProp.MODELS]['PhysicalInterface']
+
+        keys = get_server_filter_keys(operation, model)
+
+        assert {'name', 'hardwareName', 'macAddress', 'mtu', 'id'} <= keys
+        # references, enums, flags and constant or ever-changing fields are not pushed to the server
+        assert not {'ipv4', 'mode', 'enabled', 'type', 'version'} & keys
+
+    def test_get_server_filter_keys_prefers_keys_listed_in_description(self):
+        description = 'Supported keys are: "name", "fts".'
+        operation = {'parameters': {'query': {'filter': {'type': 'string', 'description': description}}}}
+        model = {'properties': {'name': {'type': 'string'}, 'hardwareName': {'type': 'string'}}}
+
+        assert frozenset(['name']) == get_server_filter_keys(operation, model)
+        assert get_server_filter_keys({'parameters': {'query': {}}}, model) is None
+
+
+class TestRuntimeSpec(unittest.TestCase):
+
+    def setUp(self):
+        docs = {
+            'definitions': {
+                'NetworkObject': {
+                    'description': 'Description for Network Object',
+                    'properties': {'name': 'Description for name field'}
+                }
+            },
+            'paths': {
+                '/object/networks': {
+                    'get': {
+                        'description': 'Description for getNetworkObjectList operation',
+                        'parameters': [
+                            {'name': 'offset', 'description': 'Description for offset field'},
+                            {'name': 'filter', 'description': 'Supported keys are: "name", "value", "fts".'}
+                        ]
+                    }
+                }
+            }
+        }
+        api_spec = copy.deepcopy(base)
+        api_spec['definitions']['NetworkObject']['example'] = {'name': 'example', 'type': 'networkobject'}
+        self.fdm_data = FdmSwaggerParser().parse_spec(api_spec, docs)
+
+    def test_runtime_spec_should_not_contain_docs(self):
+        runtime_spec = load_runtime_spec(dump_runtime_spec(self.fdm_data))
+
+        network_object = runtime_spec[SpecProp.MODELS]['NetworkObject']
+        assert 'description' not in network_object
+        assert 'example' not in network_object
+        # 'description' is a regular field of the model, so it must be preserved
+        assert {'type': 'string', 'required': False} == network_object['properties']['description']
+        assert {'type': 'string', 'required': True} == network_object['properties']['name']
+        assert ['subType', 'type', 'value', 'name'] == network_object['required']
+
+        get_list_op = runtime_spec[SpecProp.OPERATIONS]['getNetworkObjectList']
+        assert 'description' not in get_list_op
+        assert 'tags' not in get_list_op
+        assert {'type': 'integer', 'required': False} == get_list_op['parameters']['query']['offset']
+        assert '/api/fdm/v2/object/networks' == get_list_op['url']
+        # keys supported by the server are listed in the description of the filter
+        assert frozenset(['name', 'value']) == get_server_filter_keys(get_list_op)
+
+    def test_runtime_spec_should_contain_all_operations_and_models(self):
+        runtime_spec = load_runtime_spec(dump_runtime_spec(self.fdm_data))
+
+        assert sorted(self.fdm_data[SpecProp.MODELS]) == sorted(runtime_spec[SpecProp.MODELS])
+        assert sorted(self.fdm_data[SpecProp.OPERATIONS]) == sorted(runtime_spec[SpecProp.OPERATIONS])
+        assert sorted(self.fdm_data[SpecProp.MODEL_OPERATIONS]['NetworkObject']) == \
+            sorted(runtime_spec[SpecProp.MODEL_OPERATIONS]['NetworkObject'])
+        assert runtime_spec[SpecProp.OPERATIONS].get('nonExistingOperation') is None
+        assert self.fdm_data[SpecProp.MODEL_ROLES] == runtime_spec[SpecProp.MODEL_ROLES]
+
+    def test_runtime_spec_items_should_be_decoded_on_first_access(self):
+        runtime_spec = load_runtime_spec(dump_runtime_spec(self.fdm_data))
+        operations = runtime_spec[SpecProp.OPERATIONS]
+
+        assert 0 == operations.decoded_count
+        assert operations['addNetworkObject'] is runtime_spec[SpecProp.MODEL_OPERATIONS]['NetworkObject'][
+            'addNetworkObject']
+        assert 1 == operations.decoded_count
+        assert 0 == runtime_spec[SpecProp.MODELS].decoded_count
+
+    def test_runtime_spec_can_be_loaded_from_offset(self):
+        buffer = b'header\n' + dump_runtime_spec(self.fdm_data)
+
+        runtime_spec = load_runtime_spec(buffer, len(b'header\n'))
+
+        assert 'NetworkObject' == runtime_spec[SpecProp.OPERATIONS]['getNetworkObject']['modelName']
+
+    def test_load_runtime_spec_raises_exception_when_invalid_data(self):
+        with self.assertRaises(ValueError):
+            load_runtime_spec(b'no table of contents')
+        with self.assertRaises(ValueError):
+            load_runtime_spec(b'{"operations": {}}\n')
+        with self.assertRaises(ValueError):
+            load_runtime_spec(b'not a json\n{}')
+
+    def test_runtime_spec_with_real_data(self):
+        with open(os.path.join(TEST_DATA_FOLDER, 'ngfw_with_ex.json'), 'rb') as f:
+            spec_content = f.read()
+        fdm_data = FdmSwaggerParser().parse_spec(json.loads(spec_content.decode('utf-8')))
+
+        runtime_spec_content = dump_runtime_spec(fdm_data)
+        runtime_spec = load_runtime_spec(runtime_spec_content)
+
+        assert len(runtime_spec_content) < len(spec_content) / 2
+        for op_name, op_spec in fdm_data[SpecProp.OPERATIONS].items():
+            expected_op_spec = dict(op_spec)
+            del expected_op_spec['tags']
+            assert expected_op_spec == runtime_spec[SpecProp.OPERATIONS][op_name]
+        for model_name, model in fdm_data[SpecProp.MODELS].items():
+            runtime_model = runtime_spec[SpecProp.MODELS][model_name]
+            assert sorted(k for k in model if k not in ('example', 'description')) == sorted(runtime_model)
+
+
+class TestFdmSwaggerParserStream(unittest.TestCase):
+
+    def test_parse_spec_stream_returns_the_same_data_as_parse_spec(self):
+        docs = {
+            'definitions': {'NetworkObject': {'description': 'Description for Network Object'}},
+            'paths': {'/object/networks': {'get': {'description': 'Description for getNetworkObjectList'}}}
+        }
+        expected_data = FdmSwaggerParser().parse_spec(copy.deepcopy(base), copy.deepcopy(docs))
+
+        data = FdmSwaggerParser().parse_spec_stream(BytesIO(json.dumps(base, indent=2).encode()), docs)
+
+        assert expected_data == data
+
+    def test_parse_spec_stream_when_paths_precede_definitions(self):
+        api_spec = copy.deepcopy(base)
+        raw_spec = '{"paths": %s, "definitions": %s, "basePath": "/api/fdm/v2"}' % (
+            json.dumps(api_spec['paths']), json.dumps(api_spec['definitions']))
+
+        data = FdmSwaggerParser().parse_spec_stream(BytesIO(raw_spec.encode()))
+
+        assert FdmSwaggerParser().parse_spec(api_spec) == data
+
+    @patch('%s.STREAM_CHUNK_SIZE' % FdmSwaggerParser.__module__, 7)
+    def test_parse_spec_stream_with_values_split_between_chunks(self):
+        api_spec = copy.deepcopy(base)
+        api_spec['definitions']['NetworkObject']['example'] = {
+            'value': 12345678901234,
+            'name': u'\u0441\u0435\u0442\u044c'
+        }
+
+        data = FdmSwaggerParser().parse_spec_stream(BytesIO(json.dumps(api_spec, ensure_ascii=False).encode('utf-8')))
+
+        assert FdmSwaggerParser().parse_spec(copy.deepcopy(api_spec)) == data
+
+    def test_parse_spec_stream_with_numbers_split_between_chunks(self):
+        api_spec = copy.deepcopy(base)
+        api_spec['definitions']['NetworkObject']['example'] = {
+            'rate': 1.25, 'ratio': -0.5, 'big': 1.5e+300, 'small': 2.5E-10, 'count': 1200, 'limit': -3e5
+        }
+        api_spec['definitions']['NetworkObject']['properties']['value']['default'] = 1.25
+        raw_spec = json.dumps(api_spec).encode()
+        expected_data = FdmSwaggerParser().parse_spec(copy.deepcopy(api_spec))
+
+        # every number is split at every position by one of the chunk sizes
+        for chunk_size in range(1, 12):
+            with patch('%s.STREAM_CHUNK_SIZE' % FdmSwaggerParser.__module__, chunk_size):
+                assert expected_data == FdmSwaggerParser().parse_spec_stream(BytesIO(raw_spec)), chunk_size
+
+    def test_parse_spec_stream_raises_exception_when_invalid_json(self):
+        invalid_specs = [b'', b'[]', b'{"definitions": {}, "basePath": "/api"', b'{"definitions": {} "paths": {}}',
+                         b'{"definitions": {"Model": {"type": obj}}}']
+        for raw_spec in invalid_specs:
+            with self.assertRaises(ValueError):
+                FdmSwaggerParser().parse_spec_stream(BytesIO(raw_spec))
+
+    def test_parse_spec_stream_raises_exception_when_required_section_is_missing(self):
+        with self.assertRaises(KeyError):
+            FdmSwaggerParser().parse_spec_stream(BytesIO(b'{"basePath": "/api", "paths": {}}'))
+        with self.assertRaises(KeyError):
+            FdmSwaggerParser().parse_spec_stream(BytesIO(b'{"definitions": {}, "paths": {}}'))
+
+    def test_parse_spec_stream_with_real_data(self):
+        spec_path = os.path.join(TEST_DATA_FOLDER, 'ngfw_with_ex.json')
+        with open(spec_path, 'rb') as f:
+            expected_data = FdmSwaggerParser().parse_spec(json.loads(f.read().decode('utf-8')))
+
+        with open(spec_path, 'rb') as f:
+            assert expected_data == FdmSwaggerParser().parse_spec_stream(f)
+
+    @unittest.skipIf(tracemalloc is None, 'tracemalloc is not available')
+    def test_parse_spec_stream_reduces_peak_memory(self):
+        spec_path = os.path.join(TEST_DATA_FOLDER, 'ngfw_with_ex.json')
+
+        def parse_spec():
+            with open(spec_path, 'rb') as f:
+                return FdmSwaggerParser().parse_spec(json.loads(f.read().decode('utf-8')))
+
+        def parse_spec_stream():
+            with open(spec_path, 'rb') as f:
+                return FdmSwaggerParser().parse_spec_stream(f)
+
+        def get_peak_memory(parse):
+            tracemalloc.start()
+            try:
+                parse()
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        # the full spec is about 12.7 MB at peak vs 7.7 MB when streamed, most of which is the parsed spec itself
+        assert get_peak_memory(parse_spec_stream) < get_peak_memory(parse_spec) * 0.75
+
+
+class TestComparisonSchema(unittest.TestCase):
+
+    def test_get_comparison_schema_with_real_data(self):
+        with open(os.path.join(TEST_DATA_FOLDER, 'ngfw_with_ex.json'), 'rb') as f:
+            models = FdmSwaggerParser().parse_spec_stream(f)[SpecProp.MODELS]
+
+        schema = get_comparison_schema('AccessRule', models.get)
+
+        assert {'sourceZones', 'destinationZones', 'sourceNetworks', 'destinationNetworks', 'sourcePorts',
+                'destinationPorts', 'users'} == schema.unordered_fields
+        assert {'type': 'accessrule'} == schema.defaults
+        assert {'urlObjects'} == schema.nested['urlFilter'].unordered_fields
+        assert get_comparison_schema('UnknownModel', models.get) is None
+
+    def test_get_comparison_schema_with_nested_and_base_models(self):
+        ref_items = {'type': 'array', 'items': {'type': 'object', '$ref': '#/definitions/ReferenceModel'}}
+        models = {
+            'Base': {'type': 'object', 'properties': {'objects': ref_items, 'enabled': {'default': True}}},
+            'Item': {'type': 'object', 'properties': {'ports': ref_items, 'children': {
+                'type': 'array', 'items': {'$ref': '#/definitions/Item'}
+            }}},
+            'Model': {'allOf': [{'$ref': '#/definitions/Base'}, {'properties': {'items': {
+                'type': 'array', 'items': {'$ref': '#/definitions/Item'}
+            }}}], 'properties': {'mode': {'type': 'string', 'default': 'AUTO'}}}
+        }
+        schemas = {}
+
+        schema = get_comparison_schema('Model', models.get, schemas)
+
+        assert {'objects'} == schema.unordered_fields
+        assert {'enabled': True, 'mode': 'AUTO'} == schema.defaults
+        assert {'ports'} == schema.nested['items'].unordered_fields
+        assert schema.nested['items'] is schema.nested['items'].nested['children']
+        assert ['Base', 'Item', 'Model'] == sorted(schemas)
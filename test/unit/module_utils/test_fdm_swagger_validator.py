@@ -16,10 +16,13 @@
 # along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
 #
 import copy
+import functools
 import os
+import sys
 import unittest
 
 import pytest
+from units.compat import mock
 
 try:
     from ansible.module_utils.fdm_swagger_client import FdmSwaggerValidator, IllegalArgumentException
@@ -1137,3 +1140,72 @@ class TestFdmSwaggerValidator(unittest.TestCase):
                     'expected_type': 'object',
                     'actually_value': []}
             ]}) == sort_validator_rez(rez)
+
+
+class TestCompiledFdmSwaggerValidator(TestFdmSwaggerValidator):
+    """
+    Runs all validator tests in the compiled mode, since both modes must return the same reports.
+    """
+
+    def setUp(self):
+        compiled_validator = functools.partial(FdmSwaggerValidator, compiled=True)
+        patcher = mock.patch.object(sys.modules[__name__], 'FdmSwaggerValidator', compiled_validator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_models_are_compiled_once(self):
+        validator = FdmSwaggerValidator(mock_data)
+        data = {'subType': 'HOST', 'name': 'test', 'type': 'networkobject', 'value': '1.1.1.1'}
+
+        with mock.patch.object(validator, '_compile_model', wraps=validator._compile_model) as compile_mock:
+            assert (True, None) == validator.validate_data('getNetworkObjectList', data)
+            compile_count = compile_mock.call_count
+            assert (True, None) == validator.validate_data('getNetworkObjectList', data)
+
+        assert compile_count > 0
+        assert compile_count == compile_mock.call_count
+
+    def test_recursive_models(self):
+        spec = {
+            'models': {
+                'Node': {
+                    'type': 'object',
+                    'required': ['name'],
+                    'properties': {
+                        'name': {'type': 'string'},
+                        'children': {'type': 'array', 'items': {'$ref': '#/definitions/Node'}}
+                    }
+                }
+            },
+            'operations': {'addNode': {'method': 'post', 'modelName': 'Node'}}
+        }
+        data = {'name': 'root', 'children': [{'name': 'child', 'children': [{'name': 1}, {}]}]}
+
+        valid, rez = FdmSwaggerValidator(spec).validate_data('addNode', data)
+
+        assert not valid
+        assert {
+            'required': ['children[0].children[1].name'],
+            'invalid_type': [{'path': 'children[0].children[0].name', 'expected_type': 'string', 'actually_value': 1}]
+        } == rez
+
+    def test_errors_in_model_are_raised_on_validation(self):
+        spec = {
+            'models': {
+                'Model': {
+                    'type': 'object',
+                    'properties': {
+                        'refs': {'type': 'array'},
+                        'ref': {'$ref': '#/definitions/NonExistingModel'}
+                    }
+                }
+            },
+            'operations': {'addModel': {'method': 'post', 'modelName': 'Model'}}
+        }
+        validator = FdmSwaggerValidator(spec)
+
+        assert (True, None) == validator.validate_data('addModel', {})
+        with pytest.raises(KeyError):
+            validator.validate_data('addModel', {'refs': []})
+        with pytest.raises(KeyError):
+            validator.validate_data('addModel', {'ref': None})
@@ -1,5 +1,7 @@
+import copy
 import json
 import os
+import random
 import unittest
 
 try:
@@ -76,3 +78,38 @@ class TestFdmSwagger(unittest.TestCase):
             without_model_name)
         assert sorted(self.fdm_data['model_operations'][None].keys()) == sorted(['deleteDeployment', 'startUpgrade'])
         assert expected_operations_counter == len(operations)
+
+    def test_compiled_validator_returns_the_same_results(self):
+        fdm_data = FdmSwaggerParser().parse_spec(self.base_data)
+        validator = FdmSwaggerValidator(fdm_data)
+        compiled_validator = FdmSwaggerValidator(fdm_data, compiled=True)
+        models = fdm_data['models']
+        operations = fdm_data['operations']
+        rnd = random.Random(0)
+        invalid_values = [None, 1, '1', 'a', True, 1.5, [], {}, [{}], ['a']]
+
+        def mutate(data):
+            # replaces random values in the example, so that invalid data is validated as well
+            if isinstance(data, dict):
+                for key in data:
+                    if rnd.random() < 0.2:
+                        data[key] = rnd.choice(invalid_values)
+                    else:
+                        mutate(data[key])
+            elif isinstance(data, list):
+                for item in data:
+                    mutate(item)
+            return data
+
+        def validate(current_validator, operation, data):
+            try:
+                return current_validator.validate_data(operation, data)
+            except Exception as e:
+                return type(e), str(e)
+
+        for operation in sorted(operations):
+            model_name = operations[operation]['modelName']
+            if operations[operation]['method'] != 'get' and 'example' in models.get(model_name, {}):
+                example = models[model_name]['example']
+                for data in [example, mutate(copy.deepcopy(example)), mutate(copy.deepcopy(example))]:
+                    assert validate(validator, operation, data) == validate(compiled_validator, operation, data)
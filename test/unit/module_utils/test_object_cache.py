@@ -0,0 +1,136 @@
+import unittest
+
+try:
+    from ansible.module_utils.object_cache import ObjectCache, ObjectCacheStatsField
+except ImportError:
+    from module_utils.object_cache import ObjectCache, ObjectCacheStatsField
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestObjectCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ObjectCache(ttl=60, max_objects=5, clock=self.clock)
+
+    def test_find_by_name_returns_none_when_list_is_not_loaded(self):
+        assert self.cache.find_by_name('NetworkObject', 'net') is None
+        assert not self.cache.is_loaded('NetworkObject')
+        assert 1 == self.cache.get_stats()[ObjectCacheStatsField.MISSES]
+
+    def test_find_by_name_returns_copies_of_loaded_objects(self):
+        objects = [{'id': '1', 'name': 'net1'}, {'id': '2', 'name': 'net2'}]
+        self.cache.load('NetworkObject', objects)
+        objects[0]['name'] = 'changed'
+
+        found = self.cache.find_by_name('NetworkObject', 'net1')
+        found[0]['description'] = 'changed'
+
+        assert [{'id': '1', 'name': 'net1'}] == self.cache.find_by_name('NetworkObject', 'net1')
+        assert [] == self.cache.find_by_name('NetworkObject', 'net3')
+        assert 3 == self.cache.get_stats()[ObjectCacheStatsField.HITS]
+
+    def test_lists_are_keyed_by_path_params(self):
+        self.cache.load('SubInterface', [{'id': '1', 'name': 'sub'}], {'parentId': 'eth1'})
+
+        assert self.cache.is_loaded('SubInterface', {'parentId': 'eth1'})
+        assert not self.cache.is_loaded('SubInterface', {'parentId': 'eth2'})
+        assert not self.cache.is_loaded('SubInterface')
+
+    def test_list_expires_after_ttl(self):
+        self.cache.load('NetworkObject', [{'id': '1', 'name': 'net1'}])
+        self.clock.now += 59
+        assert self.cache.is_loaded('NetworkObject')
+
+        self.clock.now += 1
+        assert not self.cache.is_loaded('NetworkObject')
+
+    def test_put_adds_and_replaces_objects(self):
+        self.cache.load('NetworkObject', [{'id': '1', 'name': 'net1'}])
+
+        self.cache.put('NetworkObject', {'id': '2', 'name': 'net2'})
+        self.cache.put('NetworkObject', {'id': '1', 'name': 'renamed'})
+        self.cache.put('PortObject', {'id': '3', 'name': 'port'})
+
+        assert [] == self.cache.find_by_name('NetworkObject', 'net1')
+        assert [{'id': '1', 'name': 'renamed'}] == self.cache.find_by_name('NetworkObject', 'renamed')
+        assert [{'id': '2', 'name': 'net2'}] == self.cache.find_by_name('NetworkObject', 'net2')
+        assert not self.cache.is_loaded('PortObject')
+
+    def test_remove_deletes_object_from_all_lists_of_model(self):
+        self.cache.load('SubInterface', [{'id': '1', 'name': 'sub'}], {'parentId': 'eth1'})
+        self.cache.load('SubInterface', [{'id': '2', 'name': 'sub'}], {'parentId': 'eth2'})
+
+        self.cache.remove('SubInterface', '1')
+
+        assert [] == self.cache.find_by_name('SubInterface', 'sub', {'parentId': 'eth1'})
+        assert [{'id': '2', 'name': 'sub'}] == self.cache.find_by_name('SubInterface', 'sub', {'parentId': 'eth2'})
+
+    def test_least_recently_used_lists_are_evicted(self):
+        self.cache.load('NetworkObject', [{'id': str(i), 'name': 'net%s' % i} for i in range(2)])
+        self.cache.load('PortObject', [{'id': str(i), 'name': 'port%s' % i} for i in range(2)])
+        assert self.cache.is_loaded('NetworkObject')
+
+        self.cache.load('UrlObject', [{'id': str(i), 'name': 'url%s' % i} for i in range(2)])
+
+        assert self.cache.is_loaded('NetworkObject')
+        assert not self.cache.is_loaded('PortObject')
+        assert self.cache.is_loaded('UrlObject')
+        assert {ObjectCacheStatsField.HITS: 0, ObjectCacheStatsField.MISSES: 0, ObjectCacheStatsField.LOADS: 3,
+                ObjectCacheStatsField.EVICTIONS: 1, ObjectCacheStatsField.CACHED_OBJECTS: 4} == self.cache.get_stats()
+
+    def test_list_exceeding_size_limit_is_not_cached(self):
+        self.cache.load('NetworkObject', [{'id': str(i), 'name': 'net%s' % i} for i in range(6)])
+
+        assert not self.cache.is_loaded('NetworkObject')
+
+    def test_invalidate(self):
+        self.cache.load('NetworkObject', [])
+        self.cache.load('PortObject', [])
+        self.cache.load('UrlObject', [])
+
+        assert 1 == self.cache.invalidate('NetworkObject')
+        assert not self.cache.is_loaded('NetworkObject')
+        assert self.cache.is_loaded('PortObject')
+
+        assert 2 == self.cache.invalidate()
+        assert not self.cache.is_loaded('UrlObject')
+
+    def test_cached_objects_are_counted_on_every_change(self):
+        def cached_objects():
+            return self.cache.get_stats()[ObjectCacheStatsField.CACHED_OBJECTS]
+
+        self.cache.load('NetworkObject', [{'id': '1', 'name': 'net1'}, {'name': 'net-without-id'}])
+        self.cache.load('PortObject', [{'id': '2', 'name': 'port'}])
+        assert 3 == cached_objects()
+
+        self.cache.put('NetworkObject', {'id': '1', 'name': 'renamed'})
+        self.cache.put('NetworkObject', {'id': '3', 'name': 'net3'})
+        assert 4 == cached_objects()
+
+        self.cache.remove('NetworkObject', '3')
+        self.cache.remove('NetworkObject', 'unknown')
+        assert 3 == cached_objects()
+
+        self.cache.load('NetworkObject', [{'id': '1', 'name': 'net1'}])
+        assert 2 == cached_objects()
+
+        self.cache.put('PortObject', {'id': '4', 'name': 'port4'})
+        self.cache.load('UrlObject', [{'id': str(i), 'name': 'url%s' % i} for i in range(3)])
+        # the network objects are the least recently used ones
+        assert not self.cache.is_loaded('NetworkObject')
+        assert 5 == cached_objects()
+
+        self.clock.now += 60
+        assert not self.cache.is_loaded('PortObject')
+        assert 3 == cached_objects()
+
+        self.cache.invalidate()
+        assert 0 == cached_objects()
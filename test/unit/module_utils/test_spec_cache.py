@@ -0,0 +1,227 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from units.compat import mock
+
+try:
+    from ansible.module_utils.fdm_swagger_client import SpecProp, FdmSwaggerParser, FdmSwaggerValidator
+    from ansible.module_utils.spec_cache import SpecCache, MemoryUsageField, get_spec_hash, get_spec_stats, \
+        get_memory_usage, SPECS_DIR, PROC_STATUS_PATH
+except ImportError:
+    from module_utils.fdm_swagger_client import SpecProp, FdmSwaggerParser, FdmSwaggerValidator
+    from module_utils.spec_cache import SpecCache, MemoryUsageField, get_spec_hash, get_spec_stats, \
+        get_memory_usage, SPECS_DIR, PROC_STATUS_PATH
+
+DIR_PATH = os.path.dirname(os.path.realpath(__file__))
+TEST_DATA_FOLDER = os.path.join(DIR_PATH, 'test_data')
+
+PARSED_SPEC = {
+    SpecProp.MODELS: {
+        'NetworkObject': {'type': 'object', 'properties': {'name': {'type': 'string'}}}
+    },
+    SpecProp.OPERATIONS: {
+        'getNetworkObjectList': {'method': 'get', 'url': '/object/networks', 'modelName': 'NetworkObject',
+                                 'returnMultipleItems': True, 'tags': []},
+        'deleteDeployment': {'method': 'delete', 'url': '/deploy/{objId}', 'modelName': None,
+                             'returnMultipleItems': False, 'tags': []}
+    },
+    SpecProp.MODEL_OPERATIONS: {
+        'NetworkObject': {
+            'getNetworkObjectList': {'method': 'get', 'url': '/object/networks', 'modelName': 'NetworkObject',
+                                     'returnMultipleItems': True, 'tags': []}
+        },
+        None: {
+            'deleteDeployment': {'method': 'delete', 'url': '/deploy/{objId}', 'modelName': None,
+                                 'returnMultipleItems': False, 'tags': []}
+        }
+    },
+    SpecProp.MODEL_ROLES: {
+        'NetworkObject': {'add': None, 'edit': None, 'get': None, 'getList': 'getNetworkObjectList', 'delete': None,
+                          'upsert': False},
+        None: {'add': None, 'edit': None, 'get': None, 'getList': None, 'delete': 'deleteDeployment', 'upsert': False}
+    }
+}
+# documentation is not stored in the cache
+CACHED_SPEC = {
+    SpecProp.MODELS: PARSED_SPEC[SpecProp.MODELS],
+    SpecProp.OPERATIONS: {
+        'getNetworkObjectList': {'method': 'get', 'url': '/object/networks', 'modelName': 'NetworkObject',
+                                 'returnMultipleItems': True},
+        'deleteDeployment': {'method': 'delete', 'url': '/deploy/{objId}', 'modelName': None,
+                             'returnMultipleItems': False}
+    },
+    SpecProp.MODEL_OPERATIONS: {
+        'NetworkObject': {
+            'getNetworkObjectList': {'method': 'get', 'url': '/object/networks', 'modelName': 'NetworkObject',
+                                     'returnMultipleItems': True}
+        },
+        None: {
+            'deleteDeployment': {'method': 'delete', 'url': '/deploy/{objId}', 'modelName': None,
+                                 'returnMultipleItems': False}
+        }
+    },
+    SpecProp.MODEL_ROLES: PARSED_SPEC[SpecProp.MODEL_ROLES]
+}
+
+
+class TestSpecCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = SpecCache(os.path.join(self.cache_dir, 'cache'))
+        self.spec_hash = get_spec_hash('{"raw": "spec"}')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_get_spec_hash_is_the_same_for_text_and_bytes(self):
+        assert get_spec_hash(u'{"raw": "spec"}') == get_spec_hash(b'{"raw": "spec"}')
+        assert get_spec_hash('{"raw": "spec"}') != get_spec_hash('{"raw": "other_spec"}')
+
+    def test_get_returns_none_when_cache_is_empty(self):
+        assert self.cache.get_by_hash(self.spec_hash) is None
+        assert self.cache.get_by_build('6.4.0') is None
+
+    def test_get_by_hash_returns_stored_spec(self):
+        self.cache.put(self.spec_hash, PARSED_SPEC)
+
+        assert CACHED_SPEC == self.cache.get_by_hash(self.spec_hash)
+        assert self.cache.get_by_build('6.4.0') is None
+
+    def test_get_by_build_returns_stored_spec(self):
+        self.cache.put(self.spec_hash, PARSED_SPEC, '6.4.0')
+
+        assert CACHED_SPEC == self.cache.get_by_build('6.4.0')
+        assert self.cache.get_by_build('6.5.0') is None
+
+    def test_get_by_build_returns_the_latest_spec_stored_for_build(self):
+        other_spec = dict(PARSED_SPEC, models={})
+        cached_other_spec = dict(CACHED_SPEC, models={})
+        other_spec_hash = get_spec_hash('{"raw": "other_spec"}')
+        self.cache.put(self.spec_hash, PARSED_SPEC, '6.4.0')
+        self.cache.put(other_spec_hash, other_spec, '6.4.0')
+
+        assert cached_other_spec == self.cache.get_by_build('6.4.0')
+        assert CACHED_SPEC == self.cache.get_by_hash(self.spec_hash)
+
+    def test_get_ignores_corrupted_entry(self):
+        self.cache.put(self.spec_hash, PARSED_SPEC, '6.4.0')
+        spec_path = os.path.join(self.cache.cache_dir, SPECS_DIR, self.spec_hash + '.json')
+        with open(spec_path, 'rb') as f:
+            content = f.read()
+        with open(spec_path, 'wb') as f:
+            f.write(content[:-10])
+
+        assert self.cache.get_by_hash(self.spec_hash) is None
+        assert self.cache.get_by_build('6.4.0') is None
+
+    def test_get_ignores_entry_with_invalid_format(self):
+        self.cache.put(self.spec_hash, PARSED_SPEC, '6.4.0')
+        spec_path = os.path.join(self.cache.cache_dir, SPECS_DIR, self.spec_hash + '.json')
+        with open(spec_path, 'wb') as f:
+            f.write(b'not a cache entry')
+
+        assert self.cache.get_by_build('6.4.0') is None
+
+    def test_get_ignores_entry_created_by_other_format_version(self):
+        with mock.patch('module_utils.spec_cache.CACHE_FORMAT_VERSION', 0):
+            self.cache.put(self.spec_hash, PARSED_SPEC, '6.4.0')
+
+        assert self.cache.get_by_build('6.4.0') is None
+
+    def test_put_overwrites_corrupted_entry(self):
+        self.cache.put(self.spec_hash, PARSED_SPEC)
+        spec_path = os.path.join(self.cache.cache_dir, SPECS_DIR, self.spec_hash + '.json')
+        with open(spec_path, 'wb') as f:
+            f.write(b'corrupted')
+
+        self.cache.put(self.spec_hash, PARSED_SPEC)
+
+        assert CACHED_SPEC == self.cache.get_by_hash(self.spec_hash)
+
+    def test_build_key_is_sanitized(self):
+        self.cache.put(self.spec_hash, PARSED_SPEC, '../6.4.0 beta')
+
+        assert CACHED_SPEC == self.cache.get_by_build('../6.4.0 beta')
+        assert not os.path.exists(os.path.join(self.cache_dir, '6.4.0 beta'))
+
+
+class TestMappedSpec(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = SpecCache(self.cache_dir)
+        self.spec_hash = get_spec_hash('{"raw": "spec"}')
+        self.cache.put(self.spec_hash, PARSED_SPEC, '6.4.0')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_items_are_decoded_on_first_access(self):
+        spec = self.cache.get_by_build('6.4.0')
+
+        assert {'lazy': True, 'operations': {'total': 2, 'decoded': 0},
+                'models': {'total': 1, 'decoded': 0}} == get_spec_stats(spec)
+
+        operation = spec[SpecProp.OPERATIONS]['getNetworkObjectList']
+        assert operation is spec[SpecProp.OPERATIONS]['getNetworkObjectList']
+        assert operation is spec[SpecProp.MODEL_OPERATIONS]['NetworkObject']['getNetworkObjectList']
+        assert {'lazy': True, 'operations': {'total': 2, 'decoded': 1},
+                'models': {'total': 1, 'decoded': 0}} == get_spec_stats(spec)
+
+    def test_mapped_sections_behave_as_read_only_dicts(self):
+        spec = self.cache.get_by_build('6.4.0')
+        operations = spec[SpecProp.OPERATIONS]
+
+        assert 'deleteDeployment' in operations
+        assert 'nonExistingOperation' not in operations
+        assert operations.get('nonExistingOperation') is None
+        assert sorted(PARSED_SPEC[SpecProp.OPERATIONS].keys()) == sorted(operations)
+        assert None in spec[SpecProp.MODEL_OPERATIONS]
+        with self.assertRaises(KeyError):
+            spec[SpecProp.MODELS]['NonExistingModel']
+        with self.assertRaises(TypeError):
+            operations['newOperation'] = {}
+
+    def test_get_spec_stats_of_not_mapped_spec(self):
+        assert {'lazy': False, 'operations': {'total': 2, 'decoded': 2},
+                'models': {'total': 1, 'decoded': 1}} == get_spec_stats(PARSED_SPEC)
+
+    def test_get_memory_usage(self):
+        usage = get_memory_usage()
+
+        assert usage[MemoryUsageField.MAX_RESIDENT] > 0
+        if os.path.exists(PROC_STATUS_PATH):
+            assert usage[MemoryUsageField.RESIDENT] > 0
+            assert MemoryUsageField.RESIDENT_ANONYMOUS in usage
+
+    def test_validator_works_with_mapped_spec(self):
+        with open(os.path.join(TEST_DATA_FOLDER, 'ngfw_with_ex.json'), 'rb') as f:
+            spec_content = f.read()
+        parsed_spec = FdmSwaggerParser().parse_spec(json.loads(spec_content.decode('utf-8')))
+        spec_hash = get_spec_hash(spec_content)
+        self.cache.put(spec_hash, parsed_spec)
+        mapped_spec = self.cache.get_by_hash(spec_hash)
+
+        validator = FdmSwaggerValidator(parsed_spec)
+        mapped_spec_validator = FdmSwaggerValidator(mapped_spec)
+        for op_name, op_spec in parsed_spec[SpecProp.OPERATIONS].items():
+            model = parsed_spec[SpecProp.MODELS].get(op_spec['modelName']) or {}
+            if op_spec['method'] != 'get' and 'example' in model:
+                try:
+                    expected_result = validator.validate_data(op_name, model['example'])
+                except Exception as e:
+                    expected_result = str(e)
+                try:
+                    result = mapped_spec_validator.validate_data(op_name, model['example'])
+                except Exception as e:
+                    result = str(e)
+                assert expected_result == result
+            assert validator.validate_path_params(op_name, {}) == \
+                mapped_spec_validator.validate_path_params(op_name, {})
+
+        assert sorted(parsed_spec[SpecProp.MODEL_OPERATIONS]['NetworkObject']) == \
+            sorted(mapped_spec[SpecProp.MODEL_OPERATIONS]['NetworkObject'])
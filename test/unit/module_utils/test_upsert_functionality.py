@@ -5,21 +5,27 @@ import json
 import unittest
 
 import pytest
+from ansible.module_utils.connection import ConnectionError
 from units.compat import mock
 
 try:
     from ansible.module_utils.common import FtdServerError, HTTPMethod, ResponseParams, FtdConfigurationError
     from ansible.module_utils.configuration import DUPLICATE_NAME_ERROR_MESSAGE, UNPROCESSABLE_ENTITY_STATUS, \
         MULTIPLE_DUPLICATES_FOUND_ERROR, BaseConfigurationResource, FtdInvalidOperationNameError, QueryParams, \
-        ADD_OPERATION_NOT_SUPPORTED_ERROR, ParamName
+        ADD_OPERATION_NOT_SUPPORTED_ERROR, ParamName, DUPLICATE_ERROR, BULK_OPERATION_NOT_SUPPORTED_ERROR
     from ansible.module_utils.fdm_swagger_client import ValidationError
 except ImportError:
     from module_utils.common import FtdServerError, HTTPMethod, ResponseParams, FtdConfigurationError
     from module_utils.configuration import DUPLICATE_NAME_ERROR_MESSAGE, UNPROCESSABLE_ENTITY_STATUS, \
         MULTIPLE_DUPLICATES_FOUND_ERROR, BaseConfigurationResource, FtdInvalidOperationNameError, QueryParams, \
-        ADD_OPERATION_NOT_SUPPORTED_ERROR, ParamName
+        ADD_OPERATION_NOT_SUPPORTED_ERROR, ParamName, DUPLICATE_ERROR, BULK_OPERATION_NOT_SUPPORTED_ERROR
     from module_utils.fdm_swagger_client import ValidationError
 
+try:
+    from ansible.module_utils.object_cache import ObjectCache
+except ImportError:
+    from module_utils.object_cache import ObjectCache
+
 ADD_RESPONSE = {'status': 'Object added'}
 EDIT_RESPONSE = {'status': 'Object edited'}
 DELETE_RESPONSE = {'status': 'Object deleted'}
@@ -38,65 +44,55 @@ class TestUpsertOperationUnitTests(unittest.TestCase):
             }
         }
 
-    def test_get_operation_name(self):
-        operation_a = mock.MagicMock()
-        operation_b = mock.MagicMock()
+    def test_get_model_roles_is_requested_once_per_model(self):
+        self._conn.get_model_roles.return_value = {'getList': 'getFooList', 'upsert': False}
 
-        def checker_wrapper(expected_object):
-            def checker(obj, *args, **kwargs):
-                return obj == expected_object
+        assert {'getList': 'getFooList', 'upsert': False} == self._resource.get_model_roles('Foo')
+        assert {'getList': 'getFooList', 'upsert': False} == self._resource.get_model_roles('Foo')
 
-            return checker
+        self._conn.get_model_roles.assert_called_once_with('Foo')
 
-        operations = {
-            operation_a: "spec",
-            operation_b: "spec"
+    def test_get_model_roles_are_derived_from_model_operations_when_not_supported_by_connection(self):
+        self._conn.get_model_roles.side_effect = ConnectionError('Method not found', code=-32601)
+        self._conn.get_operation_specs_by_model_name.return_value = {
+            'getFooList': {'method': HTTPMethod.GET, 'url': '/foo', 'modelName': 'Foo', 'returnMultipleItems': True},
+            'editFoo': {'method': HTTPMethod.PUT, 'url': '/foo/{objId}', 'modelName': 'Foo'}
         }
 
-        assert operation_a == self._resource._get_operation_name(checker_wrapper(operation_a), operations)
-        assert operation_b == self._resource._get_operation_name(checker_wrapper(operation_b), operations)
-        assert self._resource._get_operation_name(checker_wrapper(None), operations) is None
+        roles = self._resource.get_model_roles('Foo')
+        self._resource.get_model_roles('Bar')
+
+        assert {'add': None, 'edit': 'editFoo', 'get': None, 'getList': 'getFooList', 'delete': None,
+                'upsert': True} == roles
+        self._conn.get_model_roles.assert_called_once_with('Foo')
 
-    @mock.patch.object(BaseConfigurationResource, "_get_operation_name")
     @mock.patch.object(BaseConfigurationResource, "add_object")
-    def test_add_upserted_object(self, add_object_mock, get_operation_mock):
-        model_operations = mock.MagicMock()
+    def test_add_upserted_object(self, add_object_mock):
         params = mock.MagicMock()
-        add_op_name = get_operation_mock.return_value
 
-        assert add_object_mock.return_value == self._resource._add_upserted_object(model_operations, params)
+        assert add_object_mock.return_value == self._resource._add_upserted_object({'add': 'addFoo'}, params)
 
-        get_operation_mock.assert_called_once_with(
-            self._resource._operation_checker.is_add_operation,
-            model_operations)
-        add_object_mock.assert_called_once_with(add_op_name, params)
+        add_object_mock.assert_called_once_with('addFoo', params)
 
-    @mock.patch.object(BaseConfigurationResource, "_get_operation_name")
     @mock.patch.object(BaseConfigurationResource, "add_object")
-    def test_add_upserted_object_with_no_add_operation(self, add_object_mock, get_operation_mock):
-        model_operations = mock.MagicMock()
-        get_operation_mock.return_value = None
-
+    def test_add_upserted_object_with_no_add_operation(self, add_object_mock):
         with pytest.raises(FtdConfigurationError) as exc_info:
-            self._resource._add_upserted_object(model_operations, mock.MagicMock())
+            self._resource._add_upserted_object({'add': None}, mock.MagicMock())
         assert ADD_OPERATION_NOT_SUPPORTED_ERROR in str(exc_info.value)
 
-        get_operation_mock.assert_called_once_with(self._resource._operation_checker.is_add_operation, model_operations)
         add_object_mock.assert_not_called()
 
-    @mock.patch.object(BaseConfigurationResource, "_get_operation_name")
     @mock.patch.object(BaseConfigurationResource, "edit_object")
     @mock.patch("module_utils.configuration.copy_identity_properties")
     @mock.patch("module_utils.configuration._set_default")
-    def test_edit_upserted_object(self, _set_default_mock, copy_properties_mock, edit_object_mock, get_operation_mock):
-        model_operations = mock.MagicMock()
+    def test_edit_upserted_object(self, _set_default_mock, copy_properties_mock, edit_object_mock):
         existing_object = mock.MagicMock()
         params = {
             'path_params': {},
             'data': {}
         }
 
-        result = self._resource._edit_upserted_object(model_operations, existing_object, params)
+        result = self._resource._edit_upserted_object({'edit': 'editFoo'}, existing_object, params)
 
         assert result == edit_object_mock.return_value
 
@@ -104,101 +100,85 @@ class TestUpsertOperationUnitTests(unittest.TestCase):
             mock.call(params, 'path_params', {}),
             mock.call(params, 'data', {})
         ])
-        get_operation_mock.assert_called_once_with(
-            self._resource._operation_checker.is_edit_operation,
-            model_operations
-        )
         copy_properties_mock.assert_called_once_with(
             existing_object,
             params['data']
         )
-        edit_object_mock.assert_called_once_with(
-            get_operation_mock.return_value,
-            params
-        )
+        edit_object_mock.assert_called_once_with('editFoo', params, existing_object)
 
-    @mock.patch("module_utils.configuration.OperationChecker.is_upsert_operation_supported")
-    @mock.patch.object(BaseConfigurationResource, "get_operation_specs_by_model_name")
+    @mock.patch.object(BaseConfigurationResource, "get_model_roles")
     @mock.patch.object(BaseConfigurationResource, "_find_object_matching_params")
     @mock.patch.object(BaseConfigurationResource, "_add_upserted_object")
     @mock.patch.object(BaseConfigurationResource, "_edit_upserted_object")
-    def test_upsert_object_successfully_added(self, edit_mock, add_mock, find_object, get_operation_mock,
-                                              is_upsert_supported_mock):
+    def test_upsert_object_successfully_added(self, edit_mock, add_mock, find_object, get_roles_mock):
         params = mock.MagicMock()
 
-        is_upsert_supported_mock.return_value = True
+        get_roles_mock.return_value = {'upsert': True}
         find_object.return_value = None
 
         result = self._resource.upsert_object('upsertFoo', params)
 
         assert result == add_mock.return_value
         self._conn.get_model_spec.assert_called_once_with('Foo')
-        is_upsert_supported_mock.assert_called_once_with(get_operation_mock.return_value)
-        get_operation_mock.assert_called_once_with('Foo')
+        get_roles_mock.assert_called_once_with('Foo')
         find_object.assert_called_once_with('Foo', params)
-        add_mock.assert_called_once_with(get_operation_mock.return_value, params)
+        add_mock.assert_called_once_with(get_roles_mock.return_value, params)
         edit_mock.assert_not_called()
 
-    @mock.patch("module_utils.configuration.equal_objects")
-    @mock.patch("module_utils.configuration.OperationChecker.is_upsert_operation_supported")
-    @mock.patch.object(BaseConfigurationResource, "get_operation_specs_by_model_name")
+    @mock.patch("module_utils.configuration.object_diff")
+    @mock.patch.object(BaseConfigurationResource, "get_model_roles")
     @mock.patch.object(BaseConfigurationResource, "_find_object_matching_params")
     @mock.patch.object(BaseConfigurationResource, "_add_upserted_object")
     @mock.patch.object(BaseConfigurationResource, "_edit_upserted_object")
-    def test_upsert_object_successfully_edited(self, edit_mock, add_mock, find_object, get_operation_mock,
-                                               is_upsert_supported_mock, equal_objects_mock):
+    def test_upsert_object_successfully_edited(self, edit_mock, add_mock, find_object, get_roles_mock,
+                                               object_diff_mock):
         params = mock.MagicMock()
         existing_obj = mock.MagicMock()
 
-        is_upsert_supported_mock.return_value = True
+        get_roles_mock.return_value = {'upsert': True}
         find_object.return_value = existing_obj
-        equal_objects_mock.return_value = False
+        object_diff_mock.return_value = [{'path': 'name', 'before': 'foo', 'after': 'bar'}]
 
         result = self._resource.upsert_object('upsertFoo', params)
 
         assert result == edit_mock.return_value
         self._conn.get_model_spec.assert_called_once_with('Foo')
-        get_operation_mock.assert_called_once_with('Foo')
-        is_upsert_supported_mock.assert_called_once_with(get_operation_mock.return_value)
+        get_roles_mock.assert_called_once_with('Foo')
         add_mock.assert_not_called()
-        equal_objects_mock.assert_called_once_with(existing_obj, params[ParamName.DATA])
-        edit_mock.assert_called_once_with(get_operation_mock.return_value, existing_obj, params)
+        object_diff_mock.assert_called_once_with(existing_obj, params[ParamName.DATA], schema=mock.ANY)
+        edit_mock.assert_called_once_with(get_roles_mock.return_value, existing_obj, params)
 
-    @mock.patch("module_utils.configuration.equal_objects")
-    @mock.patch("module_utils.configuration.OperationChecker.is_upsert_operation_supported")
-    @mock.patch.object(BaseConfigurationResource, "get_operation_specs_by_model_name")
+    @mock.patch("module_utils.configuration.object_diff")
+    @mock.patch.object(BaseConfigurationResource, "get_model_roles")
     @mock.patch.object(BaseConfigurationResource, "_find_object_matching_params")
     @mock.patch.object(BaseConfigurationResource, "_add_upserted_object")
     @mock.patch.object(BaseConfigurationResource, "_edit_upserted_object")
-    def test_upsert_object_returned_without_modifications(self, edit_mock, add_mock, find_object, get_operation_mock,
-                                                          is_upsert_supported_mock, equal_objects_mock):
+    def test_upsert_object_returned_without_modifications(self, edit_mock, add_mock, find_object, get_roles_mock,
+                                                          object_diff_mock):
         params = mock.MagicMock()
         existing_obj = mock.MagicMock()
 
-        is_upsert_supported_mock.return_value = True
+        get_roles_mock.return_value = {'upsert': True}
         find_object.return_value = existing_obj
-        equal_objects_mock.return_value = True
+        object_diff_mock.return_value = []
 
         result = self._resource.upsert_object('upsertFoo', params)
 
         assert result == existing_obj
         self._conn.get_model_spec.assert_called_once_with('Foo')
-        get_operation_mock.assert_called_once_with('Foo')
-        is_upsert_supported_mock.assert_called_once_with(get_operation_mock.return_value)
+        get_roles_mock.assert_called_once_with('Foo')
         add_mock.assert_not_called()
-        equal_objects_mock.assert_called_once_with(existing_obj, params[ParamName.DATA])
+        object_diff_mock.assert_called_once_with(existing_obj, params[ParamName.DATA], schema=mock.ANY)
         edit_mock.assert_not_called()
 
-    @mock.patch("module_utils.configuration.OperationChecker.is_upsert_operation_supported")
-    @mock.patch.object(BaseConfigurationResource, "get_operation_specs_by_model_name")
+    @mock.patch.object(BaseConfigurationResource, "get_model_roles")
     @mock.patch.object(BaseConfigurationResource, "_find_object_matching_params")
     @mock.patch.object(BaseConfigurationResource, "_add_upserted_object")
     @mock.patch.object(BaseConfigurationResource, "_edit_upserted_object")
-    def test_upsert_object_not_supported(self, edit_mock, add_mock, find_object, get_operation_mock,
-                                         is_upsert_supported_mock):
+    def test_upsert_object_not_supported(self, edit_mock, add_mock, find_object, get_roles_mock):
         params = mock.MagicMock()
 
-        is_upsert_supported_mock.return_value = False
+        get_roles_mock.return_value = {'upsert': False}
 
         self.assertRaises(
             FtdInvalidOperationNameError,
@@ -206,19 +186,16 @@ class TestUpsertOperationUnitTests(unittest.TestCase):
         )
 
         self._conn.get_model_spec.assert_called_once_with('Foo')
-        get_operation_mock.assert_called_once_with('Foo')
-        is_upsert_supported_mock.assert_called_once_with(get_operation_mock.return_value)
+        get_roles_mock.assert_called_once_with('Foo')
         find_object.assert_not_called()
         add_mock.assert_not_called()
         edit_mock.assert_not_called()
 
-    @mock.patch("module_utils.configuration.OperationChecker.is_upsert_operation_supported")
-    @mock.patch.object(BaseConfigurationResource, "get_operation_specs_by_model_name")
+    @mock.patch.object(BaseConfigurationResource, "get_model_roles")
     @mock.patch.object(BaseConfigurationResource, "_find_object_matching_params")
     @mock.patch.object(BaseConfigurationResource, "_add_upserted_object")
     @mock.patch.object(BaseConfigurationResource, "_edit_upserted_object")
-    def test_upsert_object_when_model_not_supported(self, edit_mock, add_mock, find_object, get_operation_mock,
-                                                    is_upsert_supported_mock):
+    def test_upsert_object_when_model_not_supported(self, edit_mock, add_mock, find_object, get_roles_mock):
         params = mock.MagicMock()
         self._conn.get_model_spec.return_value = None
 
@@ -228,26 +205,24 @@ class TestUpsertOperationUnitTests(unittest.TestCase):
         )
 
         self._conn.get_model_spec.assert_called_once_with('NonExisting')
-        get_operation_mock.assert_not_called()
-        is_upsert_supported_mock.assert_not_called()
+        get_roles_mock.assert_not_called()
         find_object.assert_not_called()
         add_mock.assert_not_called()
         edit_mock.assert_not_called()
 
-    @mock.patch("module_utils.configuration.equal_objects")
-    @mock.patch("module_utils.configuration.OperationChecker.is_upsert_operation_supported")
-    @mock.patch.object(BaseConfigurationResource, "get_operation_specs_by_model_name")
+    @mock.patch("module_utils.configuration.object_diff")
+    @mock.patch.object(BaseConfigurationResource, "get_model_roles")
     @mock.patch.object(BaseConfigurationResource, "_find_object_matching_params")
     @mock.patch.object(BaseConfigurationResource, "_add_upserted_object")
     @mock.patch.object(BaseConfigurationResource, "_edit_upserted_object")
-    def test_upsert_object_with_fatal_error_during_edit(self, edit_mock, add_mock, find_object, get_operation_mock,
-                                                        is_upsert_supported_mock, equal_objects_mock):
+    def test_upsert_object_with_fatal_error_during_edit(self, edit_mock, add_mock, find_object, get_roles_mock,
+                                                        object_diff_mock):
         params = mock.MagicMock()
         existing_obj = mock.MagicMock()
 
-        is_upsert_supported_mock.return_value = True
+        get_roles_mock.return_value = {'upsert': True}
         find_object.return_value = existing_obj
-        equal_objects_mock.return_value = False
+        object_diff_mock.return_value = [{'path': 'name', 'before': 'foo', 'after': 'bar'}]
         edit_mock.side_effect = FtdConfigurationError("Some object edit error")
 
         self.assertRaises(
@@ -255,23 +230,20 @@ class TestUpsertOperationUnitTests(unittest.TestCase):
             self._resource.upsert_object, 'upsertFoo', params
         )
 
-        is_upsert_supported_mock.assert_called_once_with(get_operation_mock.return_value)
         self._conn.get_model_spec.assert_called_once_with('Foo')
-        get_operation_mock.assert_called_once_with('Foo')
+        get_roles_mock.assert_called_once_with('Foo')
         find_object.assert_called_once_with('Foo', params)
         add_mock.assert_not_called()
-        edit_mock.assert_called_once_with(get_operation_mock.return_value, existing_obj, params)
+        edit_mock.assert_called_once_with(get_roles_mock.return_value, existing_obj, params)
 
-    @mock.patch("module_utils.configuration.OperationChecker.is_upsert_operation_supported")
-    @mock.patch.object(BaseConfigurationResource, "get_operation_specs_by_model_name")
+    @mock.patch.object(BaseConfigurationResource, "get_model_roles")
     @mock.patch.object(BaseConfigurationResource, "_find_object_matching_params")
     @mock.patch.object(BaseConfigurationResource, "_add_upserted_object")
     @mock.patch.object(BaseConfigurationResource, "_edit_upserted_object")
-    def test_upsert_object_with_fatal_error_during_add(self, edit_mock, add_mock, find_object, get_operation_mock,
-                                                       is_upsert_supported_mock):
+    def test_upsert_object_with_fatal_error_during_add(self, edit_mock, add_mock, find_object, get_roles_mock):
         params = mock.MagicMock()
 
-        is_upsert_supported_mock.return_value = True
+        get_roles_mock.return_value = {'upsert': True}
         find_object.return_value = None
 
         error = FtdConfigurationError("Obj duplication error")
@@ -282,11 +254,10 @@ class TestUpsertOperationUnitTests(unittest.TestCase):
             self._resource.upsert_object, 'upsertFoo', params
         )
 
-        is_upsert_supported_mock.assert_called_once_with(get_operation_mock.return_value)
         self._conn.get_model_spec.assert_called_once_with('Foo')
-        get_operation_mock.assert_called_once_with('Foo')
+        get_roles_mock.assert_called_once_with('Foo')
         find_object.assert_called_once_with('Foo', params)
-        add_mock.assert_called_once_with(get_operation_mock.return_value, params)
+        add_mock.assert_called_once_with(get_roles_mock.return_value, params)
         edit_mock.assert_not_called()
 
 
@@ -300,6 +271,9 @@ class TestUpsertOperationFunctionalTests(object):
         connection_instance.validate_data.return_value = True, None
         connection_instance.validate_query_params.return_value = True, None
         connection_instance.validate_path_params.return_value = True, None
+        connection_instance.validate_request.return_value = {}
+        # operation roles are derived from model operations, as with older connection plugins
+        connection_instance.get_model_roles.side_effect = ConnectionError('Method not found', code=-32601)
         return connection_instance
 
     def test_module_should_create_object_when_upsert_operation_and_object_does_not_exist(self, connection_mock):
@@ -859,7 +833,7 @@ class TestUpsertOperationFunctionalTests(object):
                 }
             ]
         }
-        connection_mock.validate_data.return_value = (False, json.dumps(report, sort_keys=True, indent=4))
+        connection_mock.validate_request.return_value = {'data': json.dumps(report, sort_keys=True, indent=4)}
         key = 'Invalid data provided'
 
         result = self._resource_execute_operation_with_expected_failure(
@@ -936,8 +910,224 @@ class TestUpsertOperationFunctionalTests(object):
         assert result.msg is MULTIPLE_DUPLICATES_FOUND_ERROR
         assert result.obj is None
 
+    def test_upsert_edits_existing_object_without_fetching_it_again(self, connection_mock):
+        operations = {
+            'getObjectList': {'method': HTTPMethod.GET, 'url': '/test', 'modelName': 'Object',
+                              'returnMultipleItems': True},
+            'getObject': {'method': HTTPMethod.GET, 'url': '/test/{objId}', 'modelName': 'Object',
+                          'returnMultipleItems': False},
+            'addObject': {'method': HTTPMethod.POST, 'url': '/test', 'modelName': 'Object'},
+            'editObject': {'method': HTTPMethod.PUT, 'url': '/test/{objId}', 'modelName': 'Object'}
+        }
+        existing_obj = {'id': '1', 'name': 'obj', 'value': '1', 'version': 'v1', 'type': 'object'}
+        requests = []
+
+        def request_handler(url_path=None, http_method=None, body_params=None, path_params=None, query_params=None):
+            requests.append((http_method, url_path))
+            response = {'items': [existing_obj]} if url_path == '/test' else dict(body_params or existing_obj)
+            return {ResponseParams.SUCCESS: True, ResponseParams.RESPONSE: response, ResponseParams.STATUS_CODE: 200}
+
+        connection_mock.get_operation_spec.side_effect = lambda name: operations[name]
+        connection_mock.get_operation_specs_by_model_name.return_value = operations
+        connection_mock.send_request = request_handler
+
+        result = self._resource_execute_operation(
+            {'operation': 'upsertObject', 'data': {'name': 'obj', 'value': '2', 'type': 'object'}}, connection_mock)
+
+        assert dict(existing_obj, value='2') == result
+        assert [(HTTPMethod.GET, '/test'), (HTTPMethod.PUT, '/test/{objId}')] == requests
+
+    def test_upsert_operations_share_cached_object_list(self, connection_mock):
+        url = '/test'
+        operations = {
+            'getObjectList': {'method': HTTPMethod.GET, 'url': url, 'modelName': 'Object', 'returnMultipleItems': True},
+            'addObject': {'method': HTTPMethod.POST, 'url': url, 'modelName': 'Object'},
+            'editObject': {'method': HTTPMethod.PUT, 'url': '/test/{objId}', 'modelName': 'Object'},
+            'deleteObject': {'method': HTTPMethod.DELETE, 'url': '/test/{objId}', 'modelName': 'Object'}
+        }
+        existing_obj = {'id': '1', 'name': 'existing', 'value': '1', 'version': 'v1', 'type': 'object'}
+        requests = []
+
+        def request_handler(url_path=None, http_method=None, body_params=None, path_params=None, query_params=None):
+            requests.append((http_method, url_path))
+            if http_method == HTTPMethod.GET:
+                response = {'items': [existing_obj]}
+            elif http_method == HTTPMethod.POST:
+                response = dict(body_params, id='2', version='v1')
+            elif http_method == HTTPMethod.PUT:
+                response = dict(body_params, version='v2')
+            else:
+                response = {}
+            return {ResponseParams.SUCCESS: True, ResponseParams.RESPONSE: response, ResponseParams.STATUS_CODE: 200}
+
+        connection_mock.get_operation_spec.side_effect = lambda name: operations[name]
+        connection_mock.get_operation_specs_by_model_name.return_value = operations
+        connection_mock.send_request = request_handler
+        object_cache = ObjectCache()
+
+        def upsert(data):
+            params = {'operation': 'upsertObject', 'data': dict(data)}
+            return self._resource_execute_operation(params, connection_mock, object_cache=object_cache)
+
+        assert existing_obj == upsert({'name': 'existing', 'value': '1', 'type': 'object'})
+        new_obj = upsert({'name': 'new', 'value': '2', 'type': 'object'})
+        assert new_obj == upsert({'name': 'new', 'value': '2', 'type': 'object'})
+        edited_obj = upsert({'name': 'existing', 'value': '3', 'type': 'object'})
+        assert edited_obj == upsert({'name': 'existing', 'value': '3', 'type': 'object'})
+
+        assert [(HTTPMethod.GET, url), (HTTPMethod.POST, url), (HTTPMethod.PUT, '/test/{objId}')] == requests
+
+        self._resource_execute_operation({'operation': 'deleteObject', 'path_params': {'objId': '2'}},
+                                         connection_mock, object_cache=object_cache)
+        assert [] == object_cache.find_by_name('Object', 'new')
+
+        assert {'invalidated_lists': 1} == self._resource_execute_operation(
+            {'operation': 'invalidateObjectCache', 'data': {'model': 'Object'}}, connection_mock,
+            object_cache=object_cache)
+        assert not object_cache.is_loaded('Object')
+
+    def test_bulk_upsert_lists_objects_once_and_sends_only_changed_items(self, connection_mock):
+        existing_objs = [
+            {'id': '1', 'name': 'same', 'value': '1', 'version': 'v1', 'type': 'object'},
+            {'id': '2', 'name': 'changed', 'value': '2', 'version': 'v1', 'type': 'object'}
+        ]
+        requests = self._mock_bulk_connection(connection_mock, existing_objs)
+        params = {
+            'operation': 'upsertObject',
+            'data': [
+                {'name': 'new', 'value': '3', 'type': 'object'},
+                {'name': 'same', 'value': '1', 'type': 'object'},
+                {'name': 'changed', 'value': '4', 'type': 'object'}
+            ],
+            'max_concurrent_requests': 2
+        }
+
+        result = self._resource_execute_operation(params, connection_mock)
+
+        assert [
+            {'name': 'new', 'status': 'created',
+             'object': {'name': 'new', 'value': '3', 'type': 'object', 'id': 'new'}},
+            {'name': 'same', 'status': 'unchanged', 'object': existing_objs[0]},
+            {'name': 'changed', 'status': 'updated',
+             'object': {'id': '2', 'name': 'changed', 'value': '4', 'version': 'v1', 'type': 'object'},
+             'diff': [{'path': 'value', 'before': '2', 'after': '4'}]}
+        ] == result
+        assert 3 == len(requests)
+        assert (HTTPMethod.GET, '/test', {}, {}) == requests[0]
+        assert (HTTPMethod.POST, '/test', params['data'][0], {}) in requests
+        assert (HTTPMethod.PUT, '/test/{objId}', {'id': '2', 'name': 'changed', 'value': '4', 'version': 'v1',
+                                                  'type': 'object'}, {'objId': '2'}) in requests
+
+    def test_bulk_upsert_sends_remaining_items_when_device_rejects_one(self, connection_mock):
+        existing_objs = [{'id': '1', 'name': 'changed', 'value': '1', 'version': 'v1', 'type': 'object'}]
+        requests = self._mock_bulk_connection(connection_mock, existing_objs, rejected_names=['invalid'])
+        params = {
+            'operation': 'upsertObject',
+            'data': [
+                {'name': 'new', 'value': '2', 'type': 'object'},
+                {'name': 'invalid', 'value': 'foo', 'type': 'object'},
+                {'name': 'changed', 'value': '3', 'type': 'object'}
+            ],
+            'max_concurrent_requests': 2
+        }
+
+        result = self._resource_execute_operation(params, connection_mock)
+
+        assert [
+            {'name': 'new', 'status': 'created',
+             'object': {'name': 'new', 'value': '2', 'type': 'object', 'id': 'new'}},
+            {'name': 'invalid', 'status': 'failed', 'object': None,
+             'error': "Status code: 422. Server response: {'error': 'invalid value'}"},
+            {'name': 'changed', 'status': 'updated',
+             'object': {'id': '1', 'name': 'changed', 'value': '3', 'version': 'v1', 'type': 'object'},
+             'diff': [{'path': 'value', 'before': '1', 'after': '3'}]}
+        ] == result
+        assert 4 == len(requests)
+
+    @mock.patch.object(BaseConfigurationResource, 'check_expected_run_time')
+    def test_bulk_upsert_fails_before_sending_requests_when_command_timeout_would_be_exceeded(
+            self, check_expected_run_time_mock, connection_mock):
+        check_expected_run_time_mock.side_effect = FtdConfigurationError('Timeout')
+        requests = self._mock_bulk_connection(connection_mock, [])
+        params = {
+            'operation': 'upsertObject',
+            'data': [{'name': 'obj%s' % i, 'value': str(i), 'type': 'object'} for i in range(5)],
+            'max_concurrent_requests': 2
+        }
+
+        with pytest.raises(FtdConfigurationError):
+            self._resource_execute_operation(params, connection_mock)
+
+        check_expected_run_time_mock.assert_called_once_with(3)
+        assert [HTTPMethod.GET] == [method for method, _, _, _ in requests]
+
+    def test_bulk_add_fails_before_sending_requests_when_existing_object_differs(self, connection_mock):
+        existing_objs = [{'id': '1', 'name': 'changed', 'value': '1', 'version': 'v1', 'type': 'object'}]
+        requests = self._mock_bulk_connection(connection_mock, existing_objs)
+        params = {
+            'operation': 'addObject',
+            'data': [
+                {'name': 'new', 'value': '2', 'type': 'object'},
+                {'name': 'changed', 'value': '3', 'type': 'object'}
+            ]
+        }
+
+        with pytest.raises(FtdConfigurationError) as exc_info:
+            self._resource_execute_operation(params, connection_mock)
+
+        assert DUPLICATE_ERROR == exc_info.value.msg
+        assert existing_objs[0] == exc_info.value.obj
+        assert [HTTPMethod.GET] == [method for method, _, _, _ in requests]
+
+    def test_bulk_upsert_fails_when_data_items_have_the_same_name(self, connection_mock):
+        requests = self._mock_bulk_connection(connection_mock, [])
+        params = {'operation': 'upsertObject', 'data': [{'name': 'obj', 'value': '1'}, {'name': 'obj', 'value': '2'}]}
+
+        with pytest.raises(FtdConfigurationError) as exc_info:
+            self._resource_execute_operation(params, connection_mock)
+
+        assert 'Multiple data items have the same name: obj' == exc_info.value.msg
+        assert [] == requests
+
+    def test_bulk_operation_fails_when_operation_is_not_add_or_upsert(self, connection_mock):
+        self._mock_bulk_connection(connection_mock, [])
+        params = {'operation': 'editObject', 'data': [{'name': 'obj'}]}
+
+        with pytest.raises(FtdConfigurationError) as exc_info:
+            self._resource_execute_operation(params, connection_mock)
+
+        assert BULK_OPERATION_NOT_SUPPORTED_ERROR == exc_info.value.msg
+
+    @staticmethod
+    def _mock_bulk_connection(connection_mock, existing_objs, rejected_names=()):
+        operations = {
+            'getObjectList': {'method': HTTPMethod.GET, 'url': '/test', 'modelName': 'Object',
+                              'returnMultipleItems': True},
+            'addObject': {'method': HTTPMethod.POST, 'url': '/test', 'modelName': 'Object'},
+            'editObject': {'method': HTTPMethod.PUT, 'url': '/test/{objId}', 'modelName': 'Object'}
+        }
+        requests = []
+
+        def request_handler(url_path=None, http_method=None, body_params=None, path_params=None, query_params=None):
+            requests.append((http_method, url_path, body_params, path_params))
+            if body_params and body_params['name'] in rejected_names:
+                return {ResponseParams.SUCCESS: False, ResponseParams.RESPONSE: {'error': 'invalid value'},
+                        ResponseParams.STATUS_CODE: 422}
+            if http_method == HTTPMethod.GET:
+                response = {'items': existing_objs}
+            elif http_method == HTTPMethod.POST:
+                response = dict(body_params, id=body_params['name'])
+            else:
+                response = body_params
+            return {ResponseParams.SUCCESS: True, ResponseParams.RESPONSE: response, ResponseParams.STATUS_CODE: 200}
+
+        connection_mock.get_operation_spec.side_effect = lambda name: operations[name]
+        connection_mock.get_operation_specs_by_model_name.return_value = operations
+        connection_mock.send_request = request_handler
+        return requests
+
     @staticmethod
-    def _resource_execute_operation(params, connection):
+    def _resource_execute_operation(params, connection, object_cache=None):
 
         with mock.patch.object(BaseConfigurationResource, '_fetch_system_info') as fetch_system_info_mock:
             fetch_system_info_mock.return_value = {
@@ -945,7 +1135,7 @@ class TestUpsertOperationFunctionalTests(object):
                     'buildVersion': '6.3.0'
                 }
             }
-            resource = BaseConfigurationResource(connection)
+            resource = BaseConfigurationResource(connection, object_cache=object_cache)
             op_name = params['operation']
 
             resp = resource.execute_operation(op_name, params)
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 
 import pytest
 from ansible.module_utils import basic
+from ansible.module_utils.connection import ConnectionError
 from units.modules.utils import set_module_args, exit_json, fail_json, AnsibleFailJson, AnsibleExitJson
 
 from library import ftd_configuration
@@ -26,7 +27,10 @@ class TestFtdConfiguration(object):
     @pytest.fixture(autouse=True)
     def connection_mock(self, mocker):
         connection_class_mock = mocker.patch('library.ftd_configuration.Connection')
-        return connection_class_mock.return_value
+        connection_instance = connection_class_mock.return_value
+        # operations are executed by the module itself unless a test sets the result of the connection plugin
+        connection_instance.execute_operation.side_effect = ConnectionError('Method not found', code=-32601)
+        return connection_instance
 
     @pytest.fixture
     def resource_mock(self, mocker):
@@ -98,6 +102,114 @@ class TestFtdConfiguration(object):
         result = self._run_module({'operation': operation_name})
         assert result['response'] == {'result': 'ok'}
 
+    def test_module_should_return_result_of_operation_executed_by_connection(self, connection_mock, resource_mock):
+        connection_mock.execute_operation.side_effect = None
+        connection_mock.execute_operation.return_value = {'changed': True, 'response': {'name': 'test', 'type': 'obj'},
+                                                          'metrics': {'pages_fetched': 2}}
+
+        result = self._run_module({'operation': 'addTest', 'data': {'name': 'test'}})
+
+        assert result['changed']
+        assert {'name': 'test', 'type': 'obj'} == result['response']
+        assert {'pages_fetched': 2} == result['metrics']
+        assert {'obj_test': {'name': 'test', 'type': 'obj'}} == result['ansible_facts']
+        connection_mock.execute_operation.assert_called_once_with('addTest', {
+            'operation': 'addTest',
+            'data': {'name': 'test'},
+            'query_params': None,
+            'path_params': None,
+            'register_as': None,
+            'filters': None,
+            'page_size': None,
+            'adaptive_paging': None,
+            'max_concurrent_pages': None,
+            'max_concurrent_requests': None
+        }, False)
+        resource_mock.assert_not_called()
+
+    def test_module_should_return_diff_with_existing_object(self, connection_mock):
+        connection_mock.execute_operation.side_effect = None
+        connection_mock.execute_operation.return_value = {
+            'changed': True, 'response': {'name': 'test'}, 'metrics': {},
+            'diff': [{'path': 'value', 'before': '1', 'after': '2'}]
+        }
+
+        result = self._run_module({'operation': 'upsertTest', 'data': {'name': 'test', 'value': '2'}})
+
+        assert [{'path': 'value', 'before': '1', 'after': '2'}] == result['object_diff']
+
+    def test_module_should_not_return_diff_when_objects_are_not_compared(self, connection_mock):
+        connection_mock.execute_operation.side_effect = None
+        connection_mock.execute_operation.return_value = {'changed': True, 'response': {'name': 'test'},
+                                                          'metrics': {}, 'diff': None}
+
+        result = self._run_module({'operation': 'addTest', 'data': {'name': 'test'}})
+
+        assert 'object_diff' not in result
+
+    def test_module_should_fail_when_data_is_not_dict_or_list(self, connection_mock):
+        result = self._run_module_with_fail_json({'operation': 'addTest', 'data': 'test'})
+
+        assert result['failed']
+        assert 'Data must be a dictionary or a list of dictionaries' == result['msg']
+        connection_mock.execute_operation.assert_not_called()
+
+    @pytest.mark.parametrize('data, expected_data', [
+        ('{"name": "test", "value": "1"}', {'name': 'test', 'value': '1'}),
+        ('name=test value=1', {'name': 'test', 'value': '1'}),
+        ('[{"name": "test1"}, {"name": "test2"}]', [{'name': 'test1'}, {'name': 'test2'}])
+    ])
+    def test_module_should_convert_data_given_as_string(self, connection_mock, data, expected_data):
+        connection_mock.execute_operation.side_effect = None
+        connection_mock.execute_operation.return_value = {'changed': True, 'response': [], 'metrics': {}}
+
+        self._run_module({'operation': 'upsertTest', 'data': data})
+
+        assert expected_data == connection_mock.execute_operation.call_args[0][1]['data']
+
+    def test_module_should_fail_when_data_is_invalid_json_array(self, connection_mock):
+        result = self._run_module_with_fail_json({'operation': 'addTest', 'data': '[{"name": '})
+
+        assert 'Data must be a dictionary or a list of dictionaries' == result['msg']
+        connection_mock.execute_operation.assert_not_called()
+
+    def test_module_should_fail_when_operation_executed_by_connection_fails(self, connection_mock):
+        connection_mock.execute_operation.side_effect = None
+        connection_mock.execute_operation.return_value = {
+            'error': {'type': 'FtdServerError', 'args': [{'error': 'foo'}, 500]}
+        }
+
+        result = self._run_module_with_fail_json({'operation': 'addTest'})
+
+        assert result['failed']
+        assert 'Server returned an error trying to execute addTest operation. Status code: 500. ' \
+               "Server response: {'error': 'foo'}" == result['msg']
+
+    def test_module_should_fail_naming_data_items_rejected_by_device(self, connection_mock):
+        reports = [
+            {'name': 'net1', 'status': 'created', 'object': {'id': '1', 'name': 'net1'}},
+            {'name': 'net2', 'status': 'failed', 'object': None, 'error': 'Status code: 422. Server response: {}'},
+            {'name': 'net3', 'status': 'failed', 'object': None, 'error': 'Status code: 422. Server response: {}'}
+        ]
+        connection_mock.execute_operation.side_effect = None
+        connection_mock.execute_operation.return_value = {'changed': True, 'response': reports, 'metrics': {}}
+
+        result = self._run_module_with_fail_json({'operation': 'upsertNetworkObject', 'data': [
+            {'name': 'net1'}, {'name': 'net2'}, {'name': 'net3'}
+        ]})
+
+        assert result['failed']
+        assert result['changed']
+        assert 'Failed to execute upsertNetworkObject operation for data items: net2, net3' == result['msg']
+        assert reports == result['response']
+
+    def test_module_should_raise_connection_errors(self, connection_mock):
+        connection_mock.execute_operation.side_effect = ConnectionError('Internal error', code=-32603)
+        set_module_args({'operation': 'addTest'})
+
+        with pytest.raises(ConnectionError):
+            self.module.main()
+
     def _run_module(self, module_args):
         set_module_args(module_args)
         with pytest.raises(AnsibleExitJson) as ex:
@@ -0,0 +1,130 @@
+from __future__ import absolute_import
+
+import pytest
+from ansible.module_utils import basic
+from ansible.module_utils.connection import ConnectionError
+from units.modules.utils import set_module_args, exit_json, fail_json, AnsibleFailJson, AnsibleExitJson
+
+from library import ftd_desired_state
+
+try:
+    from ansible.module_utils.common import FtdConfigurationError, FtdServerError
+except ImportError:
+    from module_utils.common import FtdConfigurationError, FtdServerError
+
+
+class TestFtdDesiredState(object):
+    module = ftd_desired_state
+
+    @pytest.fixture(autouse=True)
+    def module_mock(self, mocker):
+        return mocker.patch.multiple(basic.AnsibleModule, exit_json=exit_json, fail_json=fail_json)
+
+    @pytest.fixture(autouse=True)
+    def connection_mock(self, mocker):
+        connection_class_mock = mocker.patch('library.ftd_desired_state.Connection')
+        connection_instance = connection_class_mock.return_value
+        # the state is reached by the module itself unless a test sets the result of the connection plugin
+        connection_instance.apply_desired_state.side_effect = ConnectionError('Method not found', code=-32601)
+        return connection_instance
+
+    @pytest.fixture
+    def resource_mock(self, mocker):
+        resource_class_mock = mocker.patch('library.ftd_desired_state.DesiredStateResource')
+        return resource_class_mock.return_value
+
+    def test_module_should_apply_state_in_connection(self, connection_mock, resource_mock):
+        connection_mock.apply_desired_state.side_effect = None
+        connection_mock.apply_desired_state.return_value = {
+            'changed': True,
+            'plan': [{'action': 'create', 'model': 'NetworkObject', 'name': 'net'}],
+            'summary': {'create': 1, 'update': 0, 'delete': 0, 'unchanged': 2}
+        }
+
+        result = self._run_module({'state': {'NetworkObject': [{'name': 'net'}]}, 'prune': True,
+                                   'max_concurrent_requests': 8})
+
+        assert result['changed']
+        assert [{'action': 'create', 'model': 'NetworkObject', 'name': 'net'}] == result['plan']
+        assert {'create': 1, 'update': 0, 'delete': 0, 'unchanged': 2} == result['summary']
+        connection_mock.apply_desired_state.assert_called_once_with({'NetworkObject': [{'name': 'net'}]}, True,
+                                                                    False, 8)
+        resource_mock.run.assert_not_called()
+
+    def test_module_should_fail_when_state_applied_in_connection_fails(self, connection_mock):
+        connection_mock.apply_desired_state.side_effect = None
+        connection_mock.apply_desired_state.return_value = {
+            'error': {'type': 'FtdConfigurationError', 'args': ['Foo error.', None]}
+        }
+
+        result = self._run_module_with_fail_json({'state': {}})
+
+        assert 'Failed to bring objects to the desired state because of the configuration error: Foo error.' == \
+            result['msg']
+
+    def test_module_should_fail_with_executed_plan_when_write_fails(self, resource_mock):
+        plan = [
+            {'action': 'create', 'model': 'NetworkObject', 'name': 'net1', 'object': {'id': '1', 'name': 'net1'}},
+            {'action': 'create', 'model': 'NetworkObject', 'name': 'net2', 'object': None, 'error': 'Foo error.'}
+        ]
+        resource_mock.run.return_value = {
+            'changed': True, 'plan': plan, 'summary': {'create': 3, 'update': 0, 'delete': 0, 'unchanged': 0}
+        }
+
+        result = self._run_module_with_fail_json({'state': {}})
+
+        assert result['failed']
+        assert result['changed']
+        assert plan == result['plan']
+        assert {'create': 3, 'update': 0, 'delete': 0, 'unchanged': 0} == result['summary']
+        assert 'Failed to bring objects to the desired state. Writes failed for: NetworkObject "net2" (Foo error.)' \
+            == result['msg']
+
+    def test_module_should_apply_state_when_connection_cannot(self, resource_mock):
+        resource_mock.run.return_value = {
+            'changed': False, 'plan': [], 'summary': {'create': 0, 'update': 0, 'delete': 0, 'unchanged': 1}
+        }
+
+        result = self._run_module({'state': {'NetworkObject': [{'name': 'net'}]}, '_ansible_check_mode': True})
+
+        assert not result['changed']
+        assert [] == result['plan']
+        resource_mock.run.assert_called_once_with({'NetworkObject': [{'name': 'net'}]}, False, True)
+
+    def test_module_should_fail_when_configuration_error(self, resource_mock):
+        resource_mock.run.side_effect = FtdConfigurationError('Foo error.')
+
+        result = self._run_module_with_fail_json({'state': {}})
+
+        assert result['failed']
+        assert 'Failed to bring objects to the desired state because of the configuration error: Foo error.' == \
+            result['msg']
+
+    def test_module_should_fail_when_server_error(self, resource_mock):
+        resource_mock.run.side_effect = FtdServerError({'error': 'foo'}, 500)
+
+        result = self._run_module_with_fail_json({'state': {}})
+
+        assert result['failed']
+        assert 'Server returned an error trying to bring objects to the desired state. Status code: 500. ' \
+               "Server response: {'error': 'foo'}" == result['msg']
+
+    def test_module_should_fail_when_max_concurrent_requests_is_not_positive(self, resource_mock):
+        result = self._run_module_with_fail_json({'state': {}, 'max_concurrent_requests': 0})
+
+        assert result['failed']
+        assert 'Maximum number of concurrent requests must be a positive integer' == result['msg']
+        resource_mock.run.assert_not_called()
+
+    def _run_module(self, module_args):
+        set_module_args(module_args)
+        with pytest.raises(AnsibleExitJson) as ex:
+            self.module.main()
+        return ex.value.args[0]
+
+    def _run_module_with_fail_json(self, module_args):
+        set_module_args(module_args)
+        with pytest.raises(AnsibleFailJson) as exc:
+            self.module.main()
+        result = exc.value.args[0]
+        return result
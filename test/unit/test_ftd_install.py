@@ -2,6 +2,7 @@ from __future__ import absolute_import
 
 import pytest
 from ansible.module_utils import basic
+from ansible.module_utils.connection import ConnectionError
 from units.compat.mock import PropertyMock
 from units.modules.utils import set_module_args, exit_json, fail_json, AnsibleFailJson, AnsibleExitJson
 
@@ -70,7 +71,7 @@ class TestFtdInstall(object):
         assert "Kick Python module is required to run this module." in result['msg']
 
     def test_module_should_fail_when_platform_is_not_supported(self, config_resource_mock):
-        config_resource_mock.execute_operation.return_value = {'platformModel': 'nonSupportedModel'}
+        config_resource_mock.get_system_info.return_value = {'platformModel': 'nonSupportedModel'}
         module_params = dict(DEFAULT_MODULE_PARAMS)
         del module_params['device_model']
 
@@ -115,7 +116,7 @@ class TestFtdInstall(object):
         assert expected_msg == result['msg']
 
     def test_module_should_return_when_software_is_already_installed(self, config_resource_mock):
-        config_resource_mock.execute_operation.return_value = {
+        config_resource_mock.get_system_info.return_value = {
             'softwareVersion': '6.3.0-11',
             'platformModel': 'Cisco ASA5516-X Threat Defense'
         }
@@ -131,7 +132,7 @@ class TestFtdInstall(object):
         assert result['msg'] == 'FTD already has 6.3.0-11 version of software installed.'
 
     def test_module_should_proceed_if_software_is_already_installed_and_force_param_given(self, config_resource_mock):
-        config_resource_mock.execute_operation.return_value = {
+        config_resource_mock.get_system_info.return_value = {
             'softwareVersion': '6.3.0-11',
             'platformModel': 'Cisco ASA5516-X Threat Defense'
         }
@@ -147,13 +148,11 @@ class TestFtdInstall(object):
         assert result['changed']
         assert result['msg'] == 'Successfully installed FTD image 6.3.0-11 on the firewall device.'
 
-    def test_module_should_install_ftd_image(self, config_resource_mock, ftd_factory_mock):
-        config_resource_mock.execute_operation.side_effect = [
-            {
-                'softwareVersion': '6.2.3-11',
-                'platformModel': 'Cisco ASA5516-X Threat Defense'
-            }
-        ]
+    def test_module_should_install_ftd_image(self, config_resource_mock, ftd_factory_mock, connection_mock):
+        config_resource_mock.get_system_info.return_value = {
+            'softwareVersion': '6.2.3-11',
+            'platformModel': 'Cisco ASA5516-X Threat Defense'
+        }
         module_params = dict(DEFAULT_MODULE_PARAMS)
 
         set_module_args(module_params)
@@ -165,13 +164,28 @@ class TestFtdInstall(object):
         assert result['msg'] == 'Successfully installed FTD image 6.2.3-83 on the firewall device.'
         ftd_factory_mock.create.assert_called_once_with('Cisco ASA5516-X Threat Defense', DEFAULT_MODULE_PARAMS)
         ftd_factory_mock.create.return_value.install_ftd_image.assert_called_once_with(DEFAULT_MODULE_PARAMS)
+        connection_mock.invalidate_system_information.assert_called_once_with()
+
+    def test_module_should_install_ftd_image_when_connection_does_not_cache_system_info(self, config_resource_mock,
+                                                                                        connection_mock):
+        config_resource_mock.get_system_info.return_value = {
+            'softwareVersion': '6.2.3-11',
+            'platformModel': 'Cisco ASA5516-X Threat Defense'
+        }
+        connection_mock.invalidate_system_information.side_effect = ConnectionError('Method not found', code=-32601)
+
+        set_module_args(dict(DEFAULT_MODULE_PARAMS))
+        with pytest.raises(AnsibleExitJson) as ex:
+            self.module.main()
+
+        assert ex.value.args[0]['changed']
 
     def test_module_should_fill_management_ip_values_when_missing(self, config_resource_mock, ftd_factory_mock):
+        config_resource_mock.get_system_info.return_value = {
+            'softwareVersion': '6.3.0-11',
+            'platformModel': 'Cisco ASA5516-X Threat Defense'
+        }
         config_resource_mock.execute_operation.side_effect = [
-            {
-                'softwareVersion': '6.3.0-11',
-                'platformModel': 'Cisco ASA5516-X Threat Defense'
-            },
             {
                 'items': [{
                     'ipv4Address': '192.168.1.1',
@@ -199,11 +213,11 @@ class TestFtdInstall(object):
         ftd_factory_mock.create.return_value.install_ftd_image.assert_called_once_with(expected_module_params)
 
     def test_module_should_fill_dns_server_when_missing(self, config_resource_mock, ftd_factory_mock):
+        config_resource_mock.get_system_info.return_value = {
+            'softwareVersion': '6.3.0-11',
+            'platformModel': 'Cisco ASA5516-X Threat Defense'
+        }
         config_resource_mock.execute_operation.side_effect = [
-            {
-                'softwareVersion': '6.3.0-11',
-                'platformModel': 'Cisco ASA5516-X Threat Defense'
-            },
             {
                 'items': [{
                     'dnsServerGroup': {